@@ -1,12 +1,16 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import os
+import json
 import base64
 from dotenv import load_dotenv
 
-from src.utils.data import get_validators, get_proposals, get_validator_votes
-from src.utils.data import prepare_complete_votes_df, compile_voting_history, format_voting_history, create_similarity_matrix
+from src.utils.data import get_manifest, get_dataset_keys
+from src.utils.search import get_proposal_index
+from src.utils.views import build_views
+from src.utils.chains import get_chain
+from src.utils.warmup import get_chain_store, get_shared_vote_matrix, get_result_cache, served_chains
+from src.utils.export import export_chunks, export_stream, export_key, prepare_export, ExportTooLargeError, EXPORT_FORMATS
 
 load_dotenv('.env')
 
@@ -64,27 +68,32 @@ if __name__ == '__main__':
 
 
     # Define data caching functions
-    @st.cache_data
-    def load_validators():
-        return get_validators()
+    @st.cache_data(ttl=300)
+    def load_dataset_keys(chain):
+        # Only the small manifest is polled; datasets are cached by content-addressed key
+        return get_dataset_keys(get_manifest(chain), chain)
     
-    @st.cache_data
-    def load_proposals():
-        return pd.DataFrame(get_proposals())
+    # Process-wide stores, also filled by the warm-up phase when started via `python -m src.serve`
+    @st.cache_resource
+    def load_chain_store():
+        # Vote matrices of all chains, loaded on first request and evicted under a memory budget
+        return get_chain_store()
     
-    @st.cache_data
-    def load_votes(validators, proposals):
-        votes = get_validator_votes()
-        complete_votes = prepare_complete_votes_df(validators, proposals, votes)
-        return complete_votes
+    @st.cache_resource
+    def load_shared_vote_matrix(store_dir, chain):
+        # Worker processes on the same host attach to one memory-mapped copy
+        return get_shared_vote_matrix(store_dir, chain)
+    
+    @st.cache_resource
+    def load_result_cache():
+        # Shared across all sessions, bounded by a memory budget
+        return get_result_cache()
     
 
-    # Fetch datasets
-    validators = load_validators()
-    proposals = load_proposals()
-    votes_df = load_votes(validators, proposals)
+    # Chains served by this deployment, e.g. "osmosis,cosmoshub"
+    app_chains = served_chains()
     
-    proposals_df = pd.DataFrame(proposals)
+    result_cache = load_result_cache()
 
 
     # Add left and right margins
@@ -110,6 +119,23 @@ if __name__ == '__main__':
         with st.container():
             divider(1)
             
+            # Chain select box, only shown when serving multiple chains
+            if len(app_chains) > 1:
+                ccol1, _ = st.columns([3,9])
+                
+                with ccol1:
+                    chain = st.selectbox(label='Chain', options=app_chains, format_func=lambda x: get_chain(x)['name'])
+            else:
+                chain = app_chains[0]
+            
+            # Fetch datasets of the selected chain
+            if os.environ.get('SHARED_DATA_DIR'):
+                vote_matrix = load_shared_vote_matrix(os.path.join(os.environ['SHARED_DATA_DIR'], chain), chain).get()
+            else:
+                vote_matrix = load_chain_store().get(chain, load_dataset_keys(chain))
+            
+            validators = vote_matrix.validators
+            
             scol1, scol2 = st.columns([9,3])
             
             with scol1:
@@ -134,27 +160,38 @@ if __name__ == '__main__':
                                 with st.container():
                                     st.subheader('Voting History')
 
-                                    if len(validator_selection) >= 1:
-
-                                        # Table prep
-                                        voting_history_df = compile_voting_history(votes_df, proposals_df, validator_selection)
-                                        filtered_voting_history_df = voting_history_df.copy()
-
-                                        # Filter proposals
-                                        if proposals_filter_selection['id'] == 'ALL_PROPOSALS':
-                                            pass
-
-                                        elif proposals_filter_selection['id'] == 'AT_LEAST_1_VOTED':
-                                            filtered_voting_history_df = filtered_voting_history_df.loc[filtered_voting_history_df.notnull().mean(axis=1) > 0]
-
-                                        elif proposals_filter_selection['id'] == 'ALL_VOTED':
-                                            filtered_voting_history_df = filtered_voting_history_df.loc[filtered_voting_history_df.notnull().mean(axis=1) == 1]
-
-
-                                        formatted_voting_history_df = format_voting_history(filtered_voting_history_df, validator_selection)
+                                    # Proposal search inputs, applied to the cached table via the index of the current data version
+                                    proposal_query, id_range, date_range = '', None, (None, None)
 
+                                    if len(validator_selection) >= 1:
+                                        proposal_index = get_proposal_index(result_cache, vote_matrix)
+                                        pcol1, pcol2, pcol3 = st.columns([6,3,3])
+
+                                        with pcol1:
+                                            proposal_query = st.text_input(label='Search proposals', placeholder='Title words or proposal ID')
+
+                                        with pcol2:
+                                            min_id, max_id = int(min(vote_matrix.proposal_ids)), int(max(vote_matrix.proposal_ids))
+                                            id_range = st.slider(label='Proposal IDs', min_value=min_id, max_value=max(max_id, min_id+1), value=(min_id, max(max_id, min_id+1)))
+
+                                        with pcol3:
+                                            date_bounds = proposal_index.date_bounds()
+                                            if date_bounds is not None:
+                                                date_range = st.date_input(label='Submitted between', value=(date_bounds[0].date(), date_bounds[1].date()),
+                                                                           min_value=date_bounds[0].date(), max_value=date_bounds[1].date())
+                                                # Only the start date is set while a new range is being picked
+                                                date_range = tuple(date_range) if len(date_range) == 2 else (date_range[0], None)
+
+                                    # All tables and figures of this rerun (shared with the load-testing harness). Widgets
+                                    # further down the page are read from the session state, which already holds their new value
+                                    views = build_views(result_cache, vote_matrix, validator_selection, proposals_filter_selection['id'], chain,
+                                                        proposal_query, id_range, date_range,
+                                                        reference=st.session_state.get('similar_reference'),
+                                                        leaderboard_sort=st.session_state.get('leaderboard_sort', {'id':'outcome_alignment'})['id'])
+
+                                    if views['voting_history_df'] is not None:
                                         # Table output
-                                        st.dataframe(data=formatted_voting_history_df.style.applymap(highlight_vote), height=600, use_container_width=True)
+                                        st.dataframe(data=views['voting_history_df'].style.applymap(highlight_vote), height=600, use_container_width=True)
 
                                     else:
                                         st.markdown('Please select validators first.')
@@ -190,41 +227,113 @@ if __name__ == '__main__':
 
 
                                             # Scorecards
-                                            selected_names = [v['name'] for v in validator_selection]
-                                            num_proposals = filtered_voting_history_df.shape[0]
-                                            st.metric(label='Proposals', value=num_proposals, help=help_text__num_proposals)
+                                            summary = views['summary']
+                                            st.metric(label='Proposals', value=summary['num_proposals'], help=help_text__num_proposals)
                                             divider(1)
 
-                                            exact_same_votes = (filtered_voting_history_df.loc[:,selected_names].eq(filtered_voting_history_df.loc[:,selected_names[0]], axis=0).mean(axis=1)==1).sum()
-                                            st.metric(label='Exact Same Votes', value=exact_same_votes, help='The number of proposals where all selected validators voted exactly the same.')
+                                            st.metric(label='Exact Same Votes', value=summary['exact_same_votes'], help='The number of proposals where all selected validators voted exactly the same.')
                                             divider(1)
 
-                                            if num_proposals == 0:
-                                                intersection = 0
-                                            else:
-                                                intersection = exact_same_votes / num_proposals
-
-                                            st.metric(label='Intersection', value='{:.1%}'.format(intersection), help=help_text__intersection)
+                                            st.metric(label='Intersection', value='{:.1%}'.format(summary['intersection']), help=help_text__intersection)
 
 
                                         with vscol2:
                                             with st.container():
-                                                similarity_df = create_similarity_matrix(validator_selection, filtered_voting_history_df)
-                                                fig = px.imshow(similarity_df, text_auto=True,
-                                                                color_continuous_scale=px.colors.sequential.Greens,
-                                                                range_color=(0,100))
-                                                fig.update_layout(xaxis=dict(side='bottom', title=None),
-                                                                  yaxis=dict(side='left', title=None, showgrid=False),
-                                                                  height=min(800, 300+80*len(validator_selection)),
-                                                                  paper_bgcolor='rgba(0,0,0,0)',
-                                                                  plot_bgcolor='rgba(0,0,0,0)',
-                                                                  margin=dict(t=60,b=20,l=20,r=20)
-                                                                 )
-                                                st.plotly_chart(fig, use_container_width=True)
+                                                # Annotated for small selections, hover-only or rasterized for large ones
+                                                st.plotly_chart(json.loads(views['similarity_figure']), use_container_width=True)
 
                                     else:
                                         st.markdown('Please select multiple validators.')
 
+                                    # Nearest neighbours of one validator among all validators, via the approximate index
+                                    if len(validator_selection) >= 1:
+                                        with st.expander('Most similar validators'):
+                                            st.selectbox(label='Validator', options=validator_selection, format_func=lambda x: x['name'], key='similar_reference')
+                                            similar = views['similar_validators']
+                                            if len(similar) > 0:
+                                                st.dataframe(pd.DataFrame({'Validator': [x['name'] for x in similar],
+                                                                           'Similarity (%)': [x['similarity'] for x in similar]}),
+                                                             use_container_width=True)
+                                            else:
+                                                st.markdown('No validator with similar votes found.')
+
+
+                        # Validator leaderboard
+                        with st.container():
+
+                            divider(1)
+                            st.subheader('Validator Leaderboard')
+
+                            lcol1, _ = st.columns([3,9])
+
+                            with lcol1:
+                                leaderboard_sort_options = [
+                                    {'id':'outcome_alignment',  'label':'Outcome Alignment'},
+                                    {'id':'majority_alignment', 'label':'Majority Alignment'},
+                                    {'id':'participation',      'label':'Participation'},
+                                    {'id':'voting_power',       'label':'Voting Power'},
+                                ]
+                                st.selectbox(label='Rank by', options=leaderboard_sort_options, format_func=lambda x: x['label'], key='leaderboard_sort')
+
+                            # Metrics computed once per data version, shared across sessions
+                            leaderboard_df = views['leaderboard_df']
+
+                            # Columns can also be sorted by clicking their headers
+                            st.dataframe(data=leaderboard_df, height=400, use_container_width=True)
+
+
+                        # Data exports
+                        with st.container():
+
+                            divider(1)
+
+                            with st.expander('Export data'):
+                                ecol1, ecol2, ecol3 = st.columns([6,3,3])
+
+                                with ecol1:
+                                    export_options = [
+                                        {'id':'voting_history', 'all':False, 'label':'Voting history (selected validators)'},
+                                        {'id':'similarity',     'all':False, 'label':'Voting similarity (selected validators)'},
+                                        {'id':'voting_history', 'all':True,  'label':'Voting history (all validators, all proposals)'},
+                                        {'id':'raw_votes',      'all':True,  'label':'Raw votes (all validators)'},
+                                    ]
+                                    export_selection = st.selectbox(label='Dataset', options=export_options, format_func=lambda x: x['label'])
+
+                                with ecol2:
+                                    export_format = st.selectbox(label='Format', options=EXPORT_FORMATS, format_func=lambda x: x.upper())
+
+                                with ecol3:
+                                    divider(1)
+
+                                    if not export_selection['all'] and len(validator_selection) == 0:
+                                        st.markdown('Please select validators first.')
+
+                                    else:
+                                        # The payload is built on request only, then kept in the session until
+                                        # the data version or any input of the export changes
+                                        key = export_key(vote_matrix.version, export_selection, export_format,
+                                                         validator_selection, proposals_filter_selection['id'])
+                                        if st.session_state.get('export', {}).get('key') != key:
+                                            st.session_state.pop('export', None)
+
+                                        if st.button('Prepare download') and 'export' not in st.session_state:
+                                            if export_selection['all']:
+                                                chunks = export_chunks(vote_matrix, export_selection['id'])
+                                            else:
+                                                chunks = export_chunks(vote_matrix, export_selection['id'], validator_selection, proposals_filter_selection['id'])
+
+                                            # Stream the export to disk chunk by chunk, it is only read into memory once
+                                            # complete and within the size cap
+                                            try:
+                                                st.session_state['export'] = {'key': key, 'data': prepare_export(export_stream(chunks, export_format))}
+                                            except ExportTooLargeError as e:
+                                                st.markdown(str(e))
+
+                                        if 'export' in st.session_state:
+                                            st.download_button(label='Download', data=st.session_state['export']['data'],
+                                                               file_name=f"{export_selection['id']}.{export_format}",
+                                                               mime='text/csv' if export_format == 'csv' else 'application/octet-stream')
+
 
                         # App info and usage notes
                         with st.container():
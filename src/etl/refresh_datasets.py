@@ -3,18 +3,31 @@
 
 import json
 import gzip
+import io
 import os
+from functools import partial
 from dotenv import load_dotenv
 from src.utils.atomscan import get_validators
 from src.utils.flipside_crypto import query
 from src.utils.google_cloud_storage import upload_file_to_gcs
+from src.utils.local_storage import copy_file_to_local_storage
+from src.utils.data import read_json, read_gzip_json, MANIFEST_KEY
+from src.etl.validation import assert_valid_datasets, flatten_votes
+from src.etl.snapshot import strip_volatile_fields, publish_snapshot, SNAPSHOT_CACHE_CONTROL
+from src.etl.voting_power import refresh_voting_power, apply_voting_power
+from src.etl.vote_events import refresh_vote_events, nest_votes
+from src.utils.vote_events import write_vote_events
+from src.utils.chains import DEFAULT_CHAIN, get_chain, chain_object_key, render_sql, parse_chains
 
 load_dotenv('.env')
 
 
 def save_dict_to_gzip_json(dictionary, filename):
-    with gzip.open(filename, 'wt') as file:
-        json.dump(dictionary, file)
+    # Fixed gzip mtime and sorted keys, so that the file bytes only depend on the data
+    with open(filename, 'wb') as raw_file:
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw_file, mtime=0) as gzip_file:
+            with io.TextIOWrapper(gzip_file, encoding='utf-8') as file:
+                json.dump(dictionary, file, sort_keys=True)
         
         
 def read_sql_statement(file_path):
@@ -23,56 +36,132 @@ def read_sql_statement(file_path):
     return sql_statement
         
 
-def refresh_datasets(bucket_name, service_account_key):
+def refresh_datasets(bucket_name=None, service_account_key=None, local_storage_dir=None, chain=DEFAULT_CHAIN):
+    """Extracts, validates and publishes a new snapshot of all datasets of a chain.
+    
+    Datasets are uploaded to Google Cloud Storage, or to a local directory that stands
+    in for the bucket if `local_storage_dir` is given.
+    
+    """
+    
+    chain_config = get_chain(chain)
     
     SQL_FILE_PROPOSALS = 'src/sql/proposals.sql'
-    SQL_FILE_VOTES = 'src/sql/votes.sql'
+    SQL_FILE_VOTE_EVENTS = 'src/sql/vote_events.sql'
+    SQL_FILE_STAKING_DELTAS = 'src/sql/staking_deltas.sql'
+    
+    # Local files are laid out like the bucket, i.e. under the chain's data prefix
+    VALIDATORS_FILENAME = chain_object_key(chain, 'data/validators.json.gz')
+    PROPOSALS_FILENAME = chain_object_key(chain, 'data/proposals.json.gz')
+    VOTES_FILENAME = chain_object_key(chain, 'data/votes.json.gz')
+    VOTE_EVENTS_FILENAME = chain_object_key(chain, 'data/vote_events.json.gz')
+    VOTE_EVENTS_SEGMENT_FILENAME = chain_object_key(chain, 'data/vote_events_segment.parquet')
+    VOTING_POWER_FILENAME = chain_object_key(chain, 'data/voting_power.json.gz')
+    VOTING_POWER_HISTORY_FILENAME = chain_object_key(chain, 'data/voting_power_history.json.gz')
+    MANIFEST_FILENAME = chain_object_key(chain, MANIFEST_KEY)
     
-    VALIDATORS_FILENAME = 'data/validators.json.gz'
-    PROPOSALS_FILENAME = 'data/proposals.json.gz'
-    VOTES_FILENAME = 'data/votes.json.gz'
+    # Storage to publish to: cloud storage, or its local stand-in
+    if local_storage_dir is not None:
+        upload = partial(copy_file_to_local_storage, root_dir=local_storage_dir)
+        data_url = local_storage_dir
+    else:
+        upload = partial(upload_file_to_gcs, bucket_name=bucket_name, service_account_key=service_account_key)
+        data_url = f'https://storage.googleapis.com/{bucket_name}'
+
+    previous_manifest = read_json(f'{data_url}/{chain_object_key(chain, MANIFEST_KEY)}')
+    previous_datasets = (previous_manifest or {}).get('datasets', {})
     
-    # Extract validators list from Atomscan
-    validators = get_validators()
+    # Extract validators list from Atomscan (their voting power is replaced by the checkpoint below)
+    validators = get_validators(chain_config['lcd_url'])
     
     # Extract proposals list from Flipside
-    sql_stmt_proposals = read_sql_statement(SQL_FILE_PROPOSALS)
+    sql_stmt_proposals = render_sql(read_sql_statement(SQL_FILE_PROPOSALS), chain)
     proposals = query(sql_stmt_proposals, return_df=False)
     
-    # Extract votes dataset from Flipside
-    sql_stmt_votes = read_sql_statement(SQL_FILE_VOTES)
-    votes = query(sql_stmt_votes, return_df=False)
+    # Append vote events since the last refresh to the vote event log, and apply them to
+    # the votes of the previous snapshot
+    vote_events_index, votes = None, None
+    if 'vote_events' in previous_datasets and 'votes' in previous_datasets:
+        vote_events_index = read_gzip_json(f"{data_url}/{previous_datasets['vote_events']['object_key']}")
+        votes = flatten_votes(read_gzip_json(f"{data_url}/{previous_datasets['votes']['object_key']}"))
+    
+    sql_template_vote_events = read_sql_statement(SQL_FILE_VOTE_EVENTS)
+    vote_events_index, vote_events_segment_df, votes = refresh_vote_events(partial(query, return_df=False), sql_template_vote_events,
+                                                                           vote_events_index, votes, chain)
+    votes = nest_votes(votes)
+    
+    # Apply staking events since the last checkpoint to the voting power of the previous snapshot
+    checkpoint, voting_power_history = None, None
+    if 'voting_power' in previous_datasets and 'voting_power_history' in previous_datasets:
+        checkpoint = read_gzip_json(f"{data_url}/{previous_datasets['voting_power']['object_key']}")
+        voting_power_history = read_gzip_json(f"{data_url}/{previous_datasets['voting_power_history']['object_key']}")
+    
+    sql_template_staking_deltas = read_sql_statement(SQL_FILE_STAKING_DELTAS)
+    checkpoint, voting_power_history = refresh_voting_power(partial(query, return_df=False), sql_template_staking_deltas,
+                                                           checkpoint, voting_power_history, chain)
+    validators = apply_voting_power(validators, checkpoint)
+    
+    # Keep extraction timestamps out of the datasets and fix the row order,
+    # so that unchanged data produces identical files
+    proposals, extracted_at = strip_volatile_fields(proposals)
+    proposals = sorted(proposals, key=lambda x: x['id'])
+    
+    # Block publishing if any data quality check fails
+    assert_valid_datasets(validators, proposals, votes, chain_config['address_prefix'])
 
     # Save to local files
+    os.makedirs(os.path.dirname(MANIFEST_FILENAME), exist_ok=True)
     save_dict_to_gzip_json(validators, VALIDATORS_FILENAME)
     save_dict_to_gzip_json(proposals, PROPOSALS_FILENAME)
     save_dict_to_gzip_json(votes, VOTES_FILENAME)
+    save_dict_to_gzip_json(vote_events_index, VOTE_EVENTS_FILENAME)
+    save_dict_to_gzip_json(checkpoint, VOTING_POWER_FILENAME)
+    save_dict_to_gzip_json(voting_power_history, VOTING_POWER_HISTORY_FILENAME)
 
+    # Fixed names, for clients that do not read the manifest
+    upload(file=VALIDATORS_FILENAME, object_key=VALIDATORS_FILENAME)
+    upload(file=PROPOSALS_FILENAME, object_key=PROPOSALS_FILENAME)
+    upload(file=VOTES_FILENAME, object_key=VOTES_FILENAME)
 
-    # Upload files to cloud storage
-    upload_file_to_gcs(file=VALIDATORS_FILENAME,
-                       bucket_name=bucket_name,
-                       object_key=VALIDATORS_FILENAME,
-                       service_account_key=service_account_key)
+    # New vote event log segment, never overwritten
+    if len(vote_events_segment_df) > 0:
+        write_vote_events(vote_events_segment_df, VOTE_EVENTS_SEGMENT_FILENAME)
+        upload(file=VOTE_EVENTS_SEGMENT_FILENAME, object_key=vote_events_index['segments'][-1]['object_key'],
+               cache_control=SNAPSHOT_CACHE_CONTROL)
 
-    upload_file_to_gcs(file=PROPOSALS_FILENAME,
-                       bucket_name=bucket_name,
-                       object_key=PROPOSALS_FILENAME,
-                       service_account_key=service_account_key)
-
-    upload_file_to_gcs(file=VOTES_FILENAME,
-                       bucket_name=bucket_name,
-                       object_key=VOTES_FILENAME,
-                       service_account_key=service_account_key)
+    # Versioned snapshot objects, then the manifest that points to them
+    datasets = {'validators': {'file': VALIDATORS_FILENAME, 'row_count': len(validators)},
+                'proposals': {'file': PROPOSALS_FILENAME, 'row_count': len(proposals)},
+                'votes': {'file': VOTES_FILENAME, 'row_count': len(votes)},
+                'vote_events': {'file': VOTE_EVENTS_FILENAME, 'row_count': sum(s['row_count'] for s in vote_events_index['segments'])},
+                'voting_power': {'file': VOTING_POWER_FILENAME, 'row_count': len(checkpoint['balances'])},
+                'voting_power_history': {'file': VOTING_POWER_HISTORY_FILENAME, 'row_count': len(voting_power_history)}}
+    manifest = publish_snapshot(datasets, upload, MANIFEST_FILENAME, extracted_at, previous_manifest, chain)
+    
+    print(f"Snapshot {manifest['version']} of {chain} published.")
+    
+    return manifest
     
 
 if __name__ == '__main__':
     
     SERVICE_ACCOUNT_KEY = 'credentials/service_account_key.json'
     
-    # Load secrets from environment variables
-    gcs_bucket = os.environ['GCS_BUCKET']
+    # Comma-separated list of chains to refresh, e.g. "osmosis,cosmoshub" (default chain if unset or empty)
+    chains = parse_chains(os.environ.get('CHAINS'))
+    
+    # Publish to a local directory instead of the bucket, e.g. for development
+    local_storage_dir = os.environ.get('LOCAL_STORAGE_DIR')
+    
+    for chain in chains:
+        if local_storage_dir is not None:
+            refresh_datasets(local_storage_dir=local_storage_dir, chain=chain)
+            
+        else:
+            # Load secrets from environment variables
+            gcs_bucket = os.environ['GCS_BUCKET']
 
-    # Run ETL job
-    refresh_datasets(bucket_name=gcs_bucket,
-                     service_account_key=SERVICE_ACCOUNT_KEY)
\ No newline at end of file
+            # Run ETL job
+            refresh_datasets(bucket_name=gcs_bucket,
+                             service_account_key=SERVICE_ACCOUNT_KEY,
+                             chain=chain)
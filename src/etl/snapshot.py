@@ -0,0 +1,150 @@
+"""Versioned, content-addressed dataset snapshots with an atomically published manifest.
+
+Each dataset file is uploaded under a name derived from its content hash, so an
+object never changes once written. A small `data/manifest.json` listing the
+current object of every dataset is uploaded last: readers that follow the
+manifest always see a consistent snapshot, and can poll the manifest alone to
+find out which datasets changed.
+
+"""
+
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from src.utils.data import MANIFEST_KEY
+from src.utils.chains import DEFAULT_CHAIN, chain_object_key
+
+
+SNAPSHOT_PREFIX = 'data/snapshots'
+
+# Content-addressed objects never change, the manifest must always be revalidated
+SNAPSHOT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+MANIFEST_CACHE_CONTROL = 'no-cache, max-age=0'
+
+# Fields that change on every extraction and are therefore kept out of dataset contents
+VOLATILE_FIELDS = ('_extracted_at', '__row_index')
+
+
+def strip_volatile_fields(records: list) -> tuple:
+    """Removes per-extraction fields from records.
+
+    Returns
+    -------
+    records : list of dict
+        The records without volatile fields.
+
+    extracted_at : str or None
+        The latest `_extracted_at` value found.
+
+    """
+
+    extracted_at = max((str(r['_extracted_at']) for r in records if r.get('_extracted_at') is not None), default=None)
+    records = [{k:v for k,v in r.items() if k not in VOLATILE_FIELDS} for r in records]
+
+    return records, extracted_at
+
+
+def file_sha256(filename) -> str:
+    """Returns the SHA-256 hex digest of a file."""
+
+    h = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(2**20), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def snapshot_object_key(name: str, sha256: str, chain: str = DEFAULT_CHAIN) -> str:
+    """Returns the content-addressed object key of a dataset file."""
+    return chain_object_key(chain, f'{SNAPSHOT_PREFIX}/{name}-{sha256[:16]}.json.gz')
+
+
+def build_manifest(datasets: dict, extracted_at: str = None, chain: str = DEFAULT_CHAIN) -> dict:
+    """Builds the manifest of a snapshot.
+
+    Parameters
+    ----------
+    datasets : dict
+        Dataset name -> {'file': local path, 'row_count': int}.
+
+    extracted_at : str
+        The extraction timestamp of the snapshot.
+
+    chain : str
+        The chain of the datasets, which defines their object keys.
+
+    Returns
+    -------
+    manifest : dict
+
+    """
+
+    entries = {}
+    for name, dataset in sorted(datasets.items()):
+        sha256 = file_sha256(dataset['file'])
+        entries[name] = {'object_key': snapshot_object_key(name, sha256, chain),
+                         'sha256': sha256,
+                         'row_count': dataset['row_count'],
+                         'bytes': os.path.getsize(dataset['file'])}
+
+    # The snapshot version only changes when the content of a dataset changes
+    version = hashlib.sha256(''.join(e['sha256'] for e in entries.values()).encode('utf-8')).hexdigest()[:16]
+
+    manifest = {'version': version,
+                'chain': chain,
+                'extracted_at': extracted_at,
+                'published_at': datetime.now(timezone.utc).isoformat(),
+                'datasets': entries}
+
+    return manifest
+
+
+def publish_snapshot(datasets: dict, upload, manifest_filename: str, extracted_at: str = None,
+                     previous_manifest: dict = None, chain: str = DEFAULT_CHAIN) -> dict:
+    """Uploads the objects of a snapshot, then its manifest.
+
+    Parameters
+    ----------
+    datasets : dict
+        Dataset name -> {'file': local path, 'row_count': int}.
+
+    upload : callable
+        Called as `upload(file=..., object_key=..., cache_control=...)`, e.g. a partial of
+        `upload_file_to_gcs` or `copy_file_to_local_storage`.
+
+    manifest_filename : str
+        Local path where the manifest is written before being uploaded.
+
+    extracted_at : str
+        The extraction timestamp of the snapshot.
+
+    previous_manifest : dict
+        The currently published manifest, if any. Objects it already lists are not uploaded again.
+
+    chain : str
+        The chain of the datasets.
+
+    Returns
+    -------
+    manifest : dict
+
+    """
+
+    manifest = build_manifest(datasets, extracted_at, chain)
+    published_keys = {e['object_key'] for e in (previous_manifest or {}).get('datasets', {}).values()}
+
+    for name, entry in manifest['datasets'].items():
+        if entry['object_key'] not in published_keys:
+            upload(file=datasets[name]['file'], object_key=entry['object_key'], cache_control=SNAPSHOT_CACHE_CONTROL)
+
+    # The manifest goes last, so that it only ever references objects that already exist
+    with open(manifest_filename, 'w') as file:
+        json.dump(manifest, file, indent=2)
+
+    upload(file=manifest_filename, object_key=chain_object_key(chain, MANIFEST_KEY), cache_control=MANIFEST_CACHE_CONTROL)
+
+    return manifest
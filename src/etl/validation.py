@@ -0,0 +1,111 @@
+"""Data quality validation of extracted datasets, run before they are published"""
+
+
+import pandas as pd
+
+
+VALID_VOTES = ('YES', 'NO', 'NO WITH VETO', 'ABSTAIN')
+# Length of an operator address after its prefix: separator, 20-byte payload and checksum in bech32
+ADDRESS_DATA_LENGTH = 39
+ADDRESS_PREFIX = 'osmovaloper'
+
+
+class DataValidationError(ValueError):
+    """Raised when extracted datasets fail data quality checks."""
+
+    def __init__(self, failures: list):
+        self.failures = failures
+        details = '\n'.join(f"- {f['dataset']}: {f['rule']} ({f['count']} rows, e.g. {f['examples']})" for f in failures)
+        super().__init__(f'{len(failures)} data quality checks failed:\n{details}')
+
+
+def flatten_votes(votes: list) -> list:
+    """Flattens votes as extracted (one record per validator with a dict of votes) into one record per vote."""
+    return [{'validator_address': val.get('validator_address'),
+             'proposal_id': pid,
+             'vote': vote} for val in votes for pid, vote in val.get('votes').items()]
+
+
+def is_valid_address(addresses: pd.Series, address_prefix: str = ADDRESS_PREFIX) -> pd.Series:
+    """Flags well-formed validator operator addresses."""
+    addresses = addresses.astype('object')
+    return (addresses.map(type) == str) & (addresses.str.len() == len(address_prefix) + ADDRESS_DATA_LENGTH) & addresses.str.startswith(address_prefix, na=False)
+
+
+def is_non_empty_string(values: pd.Series) -> pd.Series:
+    """Flags non-blank strings."""
+    values = values.astype('object')
+    return (values.map(type) == str) & (values.str.len() > 0)
+
+
+def is_positive_integer(values: pd.Series) -> pd.Series:
+    """Flags positive integers (or integer strings)."""
+    numbers = pd.to_numeric(values, errors='coerce')
+    return numbers.notnull() & (numbers == numbers.round()) & (numbers > 0)
+
+
+def validate_datasets(validators: list, proposals: list, votes: list, address_prefix: str = ADDRESS_PREFIX) -> list:
+    """Checks all data quality rules on the datasets in a single vectorized pass.
+
+    Parameters
+    ----------
+    validators : list of dict
+        Validators with `address`, `name` and `voting_power`.
+
+    proposals : list of dict
+        Governance proposals with `id` and `title`.
+
+    votes : list of dict
+        Votes, either one record per vote (`validator_address`, `proposal_id`, `vote`)
+        or as extracted (`validator_address` and a dict of `votes` per proposal ID).
+
+    address_prefix : str
+        Expected prefix of validator operator addresses.
+
+    Returns
+    -------
+    failures : list of dict
+        One entry per failed rule, with the dataset, rule, number of offending rows and examples.
+        An empty list means all checks passed.
+
+    """
+
+    if len(votes) > 0 and 'votes' in votes[0]:
+        votes = flatten_votes(votes)
+
+    validators_df = pd.DataFrame(validators, columns=['address','name','voting_power'])
+    proposals_df = pd.DataFrame(proposals, columns=['id','title'])
+    votes_df = pd.DataFrame(votes, columns=['validator_address','proposal_id','vote'])
+
+    voting_power = pd.to_numeric(validators_df['voting_power'], errors='coerce')
+
+    # Each rule flags invalid rows, with the column to show as examples
+    rules = [
+        ('validators', 'valid addresses', ~is_valid_address(validators_df['address'], address_prefix), validators_df['address']),
+        ('validators', 'non-empty names', ~is_non_empty_string(validators_df['name']), validators_df['address']),
+        ('validators', 'unique addresses', validators_df['address'].duplicated(), validators_df['address']),
+        ('validators', 'unique names', validators_df['name'].duplicated(), validators_df['name']),
+        ('validators', 'sorted by descending voting power', voting_power.diff() > 0, validators_df['name']),
+        ('proposals', 'positive integer IDs', ~is_positive_integer(proposals_df['id']), proposals_df['id']),
+        ('proposals', 'unique IDs', proposals_df['id'].duplicated(), proposals_df['id']),
+        ('proposals', 'non-empty titles', ~is_non_empty_string(proposals_df['title']), proposals_df['id']),
+        ('votes', 'valid validator addresses', ~is_valid_address(votes_df['validator_address'], address_prefix), votes_df['validator_address']),
+        ('votes', 'positive integer proposal IDs', ~is_positive_integer(votes_df['proposal_id']), votes_df['proposal_id']),
+        ('votes', 'valid votes', ~votes_df['vote'].isin(VALID_VOTES), votes_df['vote']),
+    ]
+
+    failures = [{'dataset': dataset,
+                 'rule': rule,
+                 'count': int(invalid.sum()),
+                 'examples': examples[invalid].head(3).tolist()}
+                for dataset, rule, invalid, examples in rules if invalid.any()]
+
+    return failures
+
+
+def assert_valid_datasets(validators: list, proposals: list, votes: list, address_prefix: str = ADDRESS_PREFIX):
+    """Raises a DataValidationError if any data quality rule fails."""
+
+    failures = validate_datasets(validators, proposals, votes, address_prefix)
+    if len(failures) > 0:
+        raise DataValidationError(failures)
@@ -0,0 +1,171 @@
+"""Incremental extraction of governance vote events into the append-only vote event log.
+
+An index lists the log segments and the last processed block. Each refresh only
+queries the vote events after that block, appends them as a new segment, and
+applies them to the previous votes to derive the current votes.
+
+Rows can be ingested by the source after a refresh has already read their block.
+As for voting power, each refresh re-reads a window of `OVERLAP_BLOCKS` before the
+last processed block, and the index keeps the events logged within that window:
+events logged before are skipped, and a late event only changes the current vote
+if no event after it was logged for the same validator and proposal.
+
+"""
+
+
+import numpy as np
+import pandas as pd
+
+from src.etl.snapshot import strip_volatile_fields
+from src.etl.voting_power import OVERLAP_BLOCKS
+from src.utils.vote_events import encode_vote_events, apply_vote_events
+from src.utils.chains import DEFAULT_CHAIN, chain_object_key, render_sql
+
+
+SEGMENT_PREFIX = 'data/vote_events'
+
+
+def new_vote_events_index() -> dict:
+    """Returns the index of an empty vote event log."""
+    return {'last_block_id': 0,
+            'segments': [],
+            'recent_from_block_id': 0,
+            'recent_events': []}
+
+
+def segment_object_key(first_block_id: int, last_block_id: int, chain: str = DEFAULT_CHAIN) -> str:
+    """Returns the object key of the log segment covering a range of blocks."""
+    return chain_object_key(chain, f'{SEGMENT_PREFIX}/events-{first_block_id}-{last_block_id}.parquet')
+
+
+def query_from_block_id(index: dict) -> int:
+    """Returns the block after which to query vote events: the start of the overlap window,
+    but not before the events kept by the index (which older indexes do not have)."""
+    recent_from_block_id = index.get('recent_from_block_id', index['last_block_id'])
+    return max(int(index['last_block_id']) - OVERLAP_BLOCKS, int(recent_from_block_id))
+
+
+def event_key(event: dict) -> tuple:
+    """Returns the key identifying a vote event across refreshes."""
+    return event['validator_address'], int(event['proposal_id']), int(event['block_id']), event['tx_id']
+
+
+def dedupe_vote_events(index: dict, records: list) -> list:
+    """Returns the queried vote events that are not logged yet, each once."""
+
+    logged = {event_key(e) for e in index.get('recent_events', [])}
+
+    new_records = []
+    for r in records:
+        if event_key(r) not in logged:
+            logged.add(event_key(r))
+            new_records.append(r)
+
+    return new_records
+
+
+def latest_vote_events(index: dict, segment_df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the events of a new segment that come after every logged event of the same
+    validator and proposal, i.e. without the late events already overtaken by a later vote."""
+
+    logged_positions = {}
+    for e in index.get('recent_events', []):
+        key, position = (e['validator_address'], int(e['proposal_id'])), (int(e['block_id']), int(e['tx_index']))
+        logged_positions[key] = max(logged_positions.get(key, position), position)
+
+    is_latest = [(block_id, tx_index) > logged_positions.get((address, pid), (-1, -1))
+                 for address, pid, block_id, tx_index in zip(segment_df['validator_address'].astype(str), segment_df['proposal_id'],
+                                                             segment_df['block_id'], segment_df['tx_index'])]
+
+    return segment_df[np.array(is_latest, dtype=bool)]
+
+
+def keep_recent_events(index: dict, segment_df: pd.DataFrame, from_block_id: int) -> dict:
+    """Records the events of a new segment as logged, keeping those within the overlap
+    window of the (updated) index."""
+
+    new_events = [{'validator_address': address, 'proposal_id': int(pid), 'block_id': int(block_id),
+                   'tx_index': int(tx_index), 'tx_id': tx_id}
+                  for address, pid, block_id, tx_index, tx_id in zip(segment_df['validator_address'].astype(str), segment_df['proposal_id'],
+                                                                     segment_df['block_id'], segment_df['tx_index'], segment_df['tx_id'])]
+
+    # The logged events are known for every block after the queried one
+    recent_from_block_id = max(int(index['last_block_id']) - OVERLAP_BLOCKS, from_block_id)
+    recent_events = [e for e in index.get('recent_events', []) + new_events if e['block_id'] > recent_from_block_id]
+
+    return {**index,
+            'recent_from_block_id': recent_from_block_id,
+            'recent_events': sorted(recent_events, key=lambda x: (x['block_id'], x['tx_index']))}
+
+
+def nest_votes(votes: list) -> list:
+    """Groups votes (one record per vote) into one record per validator with a dict of votes per proposal ID,
+    i.e. the published format of the votes dataset."""
+
+    nested = {}
+    for v in votes:
+        nested.setdefault(v['validator_address'], {})[str(v['proposal_id'])] = v['vote']
+
+    return [{'validator_address': address, 'votes': nested[address]} for address in sorted(nested)]
+
+
+def refresh_vote_events(query, sql_template: str, index: dict = None, votes: list = None,
+                        chain: str = DEFAULT_CHAIN) -> tuple:
+    """Queries the vote events after the last processed block, and the overlap window before it,
+    and derives the current votes.
+
+    Parameters
+    ----------
+    query : callable
+        Runs a SQL statement and returns a list of records, e.g. a partial of the
+        Flipside `query` with `return_df=False`.
+
+    sql_template : str
+        The vote events SQL, with `{schema}` and `{from_block_id}` placeholders.
+
+    index : dict
+        The log index of the previous refresh. Defaults to a full refresh from genesis.
+
+    votes : list of dict
+        The votes of the previous refresh, one record per vote.
+
+    chain : str
+        The chain to query.
+
+    Returns
+    -------
+    index : dict
+        The updated log index, including the new segment if there are new events.
+
+    segment_df : pd.DataFrame
+        The new log segment, to be uploaded under the object key listed in the index.
+        Late events make it start before the last block of the previous segment.
+
+    votes : list of dict
+        The current votes, one record per vote.
+
+    """
+
+    index = index if index is not None else new_vote_events_index()
+    index = {**index, 'segments': list(index['segments'])}
+
+    from_block_id = query_from_block_id(index)
+    stmt = render_sql(sql_template, chain, from_block_id=from_block_id)
+    records, _ = strip_volatile_fields(query(stmt))
+
+    # Only events not logged yet form the new segment, and late ones may be overtaken by logged votes
+    segment_df = encode_vote_events(dedupe_vote_events(index, records))
+    votes = apply_vote_events(votes or [], latest_vote_events(index, segment_df))
+
+    if len(segment_df) > 0:
+        first_block_id = int(segment_df['block_id'].iloc[0])
+        last_block_id = int(segment_df['block_id'].iloc[-1])
+        index['segments'].append({'object_key': segment_object_key(first_block_id, last_block_id, chain),
+                                  'first_block_id': first_block_id,
+                                  'last_block_id': last_block_id,
+                                  'row_count': len(segment_df)})
+        index['last_block_id'] = max(int(index['last_block_id']), last_block_id)
+
+    index = keep_recent_events(index, segment_df, from_block_id)
+
+    return index, segment_df, votes
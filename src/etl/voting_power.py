@@ -0,0 +1,244 @@
+"""Incremental voting power of validators, from staking events since the last refresh.
+
+A checkpoint keeps the running balance of every validator and the last processed
+block. Each refresh only queries the staking events after that block, so its cost
+depends on new staking activity rather than on the length of the chain's history.
+The balances double as the current voting power, and the end-of-day balances of
+each refresh are appended to a voting power time series.
+
+Rows can be ingested by the source after a refresh has already read their block.
+Each refresh therefore re-reads a window of `OVERLAP_BLOCKS` before the last
+processed block, and the checkpoint keeps the deltas applied within that window:
+rows seen before are skipped, and a block whose total changed is corrected by
+the difference, in the balances and in the time series from that block's day on.
+
+"""
+
+
+import pandas as pd
+
+from src.etl.snapshot import strip_volatile_fields
+from src.utils.chains import DEFAULT_CHAIN, render_sql
+
+
+# Blocks re-read before the last processed block, about 2 hours at 6 seconds per block
+OVERLAP_BLOCKS = 1200
+
+
+def new_checkpoint() -> dict:
+    """Returns the checkpoint of a chain with no staking events processed yet."""
+    return {'last_block_id': 0,
+            'last_block_timestamp': None,
+            'balances': {},
+            'recent_from_block_id': 0,
+            'recent_deltas': []}
+
+
+def query_from_block_id(checkpoint: dict) -> int:
+    """Returns the block after which to query staking deltas: the start of the overlap window,
+    but not before the deltas kept by the checkpoint (which older checkpoints do not have)."""
+    recent_from_block_id = checkpoint.get('recent_from_block_id', checkpoint['last_block_id'])
+    return max(int(checkpoint['last_block_id']) - OVERLAP_BLOCKS, int(recent_from_block_id))
+
+
+def dedupe_staking_deltas(checkpoint: dict, deltas: list) -> list:
+    """Returns the part of queried staking deltas that has not been applied yet.
+
+    Deltas of blocks after the checkpoint are returned as they are. Deltas of the
+    overlap window that were already applied are dropped, unless late rows changed
+    their total, in which case only the difference is returned.
+
+    """
+
+    applied = {(d['validator_address'], d['block_id']): d['delta'] for d in checkpoint.get('recent_deltas', [])}
+
+    new_deltas = []
+    for d in deltas:
+        key = (d['validator_address'], d['block_id'])
+        if key not in applied:
+            new_deltas.append(d)
+        elif round(d['delta'] - applied[key], 6) != 0:
+            new_deltas.append({**d, 'delta': round(d['delta'] - applied[key], 6)})
+
+    return new_deltas
+
+
+def keep_recent_deltas(checkpoint: dict, deltas: list, from_block_id: int) -> dict:
+    """Records the staking deltas queried after `from_block_id` as applied, keeping those
+    within the overlap window of the (updated) checkpoint."""
+
+    applied = {(d['validator_address'], d['block_id']): d['delta'] for d in checkpoint.get('recent_deltas', [])}
+    applied.update({(d['validator_address'], d['block_id']): d['delta'] for d in deltas})
+
+    # The applied deltas are known for every block after the queried one
+    recent_from_block_id = max(int(checkpoint['last_block_id']) - OVERLAP_BLOCKS, from_block_id)
+    recent_deltas = [{'validator_address': address, 'block_id': block_id, 'delta': delta}
+                     for (address, block_id), delta in applied.items() if block_id > recent_from_block_id]
+
+    return {**checkpoint,
+            'recent_from_block_id': recent_from_block_id,
+            'recent_deltas': sorted(recent_deltas, key=lambda x: (x['block_id'], x['validator_address']))}
+
+
+def apply_staking_deltas(checkpoint: dict, deltas: list) -> tuple:
+    """Applies staking deltas on top of a checkpoint.
+
+    Parameters
+    ----------
+    checkpoint : dict
+        The last processed block and the running balance of every validator.
+
+    deltas : list of dict
+        Net change of delegated amount per validator per block, with `validator_address`,
+        `block_id`, `block_timestamp` and `delta`.
+
+    Returns
+    -------
+    checkpoint : dict
+        The updated checkpoint. The input checkpoint is left unchanged.
+
+    points : list of dict
+        The end-of-day voting power of every validator with staking activity, with
+        `date`, `validator_address` and `voting_power`.
+
+    """
+
+    checkpoint = {**checkpoint, 'balances': dict(checkpoint['balances'])}
+
+    if len(deltas) == 0:
+        return checkpoint, []
+
+    deltas_df = pd.DataFrame(deltas, columns=['validator_address','block_id','block_timestamp','delta'])
+    deltas_df = deltas_df.sort_values(['block_id','validator_address'], kind='stable')
+
+    # Running balance of each validator, starting from its balance at the checkpoint
+    opening_balances = deltas_df['validator_address'].map(checkpoint['balances']).fillna(0)
+    deltas_df['balance'] = (deltas_df.groupby('validator_address')['delta'].cumsum() + opening_balances).round(6)
+    deltas_df['date'] = pd.to_datetime(deltas_df['block_timestamp'], utc=True).dt.strftime('%Y-%m-%d')
+
+    end_of_day_df = deltas_df.groupby(['date','validator_address'], as_index=False).last()
+    points = [{'date': p['date'],
+               'validator_address': p['validator_address'],
+               'voting_power': max(0.0, p['balance'])}
+              for p in end_of_day_df.to_dict(orient='records')]
+
+    closing_balances = deltas_df.groupby('validator_address')['balance'].last()
+    checkpoint['balances'].update({k: float(v) for k,v in closing_balances.items()})
+    if int(deltas_df['block_id'].iloc[-1]) > checkpoint['last_block_id']:
+        checkpoint['last_block_id'] = int(deltas_df['block_id'].iloc[-1])
+        checkpoint['last_block_timestamp'] = str(deltas_df['block_timestamp'].iloc[-1])
+
+    return checkpoint, points
+
+
+def apply_late_staking_deltas(checkpoint: dict, history: list, deltas: list) -> tuple:
+    """Applies staking deltas of blocks that were already processed, i.e. late rows.
+
+    A late delta changes the balance of its validator from the end of its day on,
+    so it is added to every point of the time series at or after that day (a point
+    is inserted for that day if there is none). Inputs are left unchanged.
+
+    Returns
+    -------
+    checkpoint : dict
+        The checkpoint with corrected balances. Its last block is unchanged.
+
+    history : list of dict
+        The corrected voting power time series.
+
+    """
+
+    checkpoint = {**checkpoint, 'balances': dict(checkpoint['balances'])}
+    history = [dict(h) for h in history]
+
+    for d in sorted(deltas, key=lambda x: (x['block_id'], x['validator_address'])):
+        address = d['validator_address']
+        date = pd.to_datetime(d['block_timestamp'], utc=True).strftime('%Y-%m-%d')
+        points = [h for h in history if h['validator_address'] == address]
+
+        if not any(h['date'] == date for h in points):
+            # The voting power at the end of that day was the one of the last point before it
+            previous_points = [h for h in points if h['date'] < date]
+            opening = max(previous_points, key=lambda x: x['date'])['voting_power'] if len(previous_points) > 0 else 0.0
+            history.append({'date': date, 'validator_address': address, 'voting_power': opening})
+
+        for h in history:
+            if h['validator_address'] == address and h['date'] >= date:
+                h['voting_power'] = max(0.0, round(h['voting_power'] + d['delta'], 6))
+
+        checkpoint['balances'][address] = round(checkpoint['balances'].get(address, 0.0) + d['delta'], 6)
+
+    return checkpoint, sorted(history, key=lambda x: (x['date'], x['validator_address']))
+
+
+def merge_voting_power_history(history: list, points: list) -> list:
+    """Appends new points to a voting power time series, replacing points of the same day."""
+
+    new_keys = {(p['date'], p['validator_address']) for p in points}
+    history = [h for h in history if (h['date'], h['validator_address']) not in new_keys] + points
+
+    return sorted(history, key=lambda x: (x['date'], x['validator_address']))
+
+
+def refresh_voting_power(query, sql_template: str, checkpoint: dict = None, history: list = None,
+                         chain: str = DEFAULT_CHAIN) -> tuple:
+    """Queries the staking events after the checkpoint, and within its overlap window, and applies the new ones.
+
+    Parameters
+    ----------
+    query : callable
+        Runs a SQL statement and returns a list of records, e.g. a partial of the
+        Flipside `query` with `return_df=False`.
+
+    sql_template : str
+        The staking deltas SQL, with `{schema}` and `{from_block_id}` placeholders.
+
+    checkpoint : dict
+        The checkpoint of the previous refresh. Defaults to a full refresh from genesis.
+
+    history : list of dict
+        The voting power time series of the previous refresh.
+
+    chain : str
+        The chain to query.
+
+    Returns
+    -------
+    checkpoint : dict
+        The updated checkpoint, i.e. the current voting power.
+
+    history : list of dict
+        The updated voting power time series.
+
+    """
+
+    checkpoint = checkpoint if checkpoint is not None else new_checkpoint()
+
+    from_block_id = query_from_block_id(checkpoint)
+    stmt = render_sql(sql_template, chain, from_block_id=from_block_id)
+    deltas, _ = strip_volatile_fields(query(stmt))
+
+    # Late rows of blocks already processed correct the past, the others are applied in block order
+    new_deltas = dedupe_staking_deltas(checkpoint, deltas)
+    late_deltas = [d for d in new_deltas if d['block_id'] <= checkpoint['last_block_id']]
+    new_deltas = [d for d in new_deltas if d['block_id'] > checkpoint['last_block_id']]
+
+    updated_checkpoint, history = apply_late_staking_deltas(checkpoint, history or [], late_deltas)
+    updated_checkpoint, points = apply_staking_deltas(updated_checkpoint, new_deltas)
+    checkpoint = keep_recent_deltas(updated_checkpoint, deltas, from_block_id)
+    history = merge_voting_power_history(history, points)
+
+    return checkpoint, history
+
+
+def apply_voting_power(validators: list, checkpoint: dict) -> list:
+    """Sets the voting power of validators to their balance in a checkpoint, sorted by descending voting power.
+
+    Validators without staking events have no balance and get a voting power of 0.
+
+    """
+
+    validators = [{**v, 'voting_power': max(0.0, float(checkpoint['balances'].get(v['address'], 0.0)))}
+                  for v in validators]
+
+    return sorted(validators, key=lambda x: x['voting_power'], reverse=True)
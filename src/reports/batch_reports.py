@@ -0,0 +1,248 @@
+"""Computes comparison reports for many predefined validator groups in parallel.
+
+The datasets are loaded and encoded once, published to a temporary memory-mapped
+store, and every worker process of the pool attaches to that single copy.
+
+Groups file (json):
+
+    {
+        "filters": ["AT_LEAST_1_VOTED", "ALL_VOTED"],
+        "groups": [
+            {"name": "Our nodes vs peers", "validators": ["Cosmostation", "osmovaloper1..."]},
+            {"name": "Foundation set", "validators": ["..."], "filters": ["ALL_PROPOSALS"]}
+        ]
+    }
+
+Validators are referenced by name or address. `filters` at the top level is the
+default for groups that do not define their own.
+
+Usage:
+
+    python -m src.reports.batch_reports groups.json --output-dir reports --formats csv parquet html --chain osmosis
+
+"""
+
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.utils.data import get_datasets
+from src.utils.data import filter_voting_history, format_voting_history, create_similarity_matrix, summarize_voting_history
+from src.utils.data import PROPOSAL_FILTERS
+from src.utils.vote_matrix import VoteMatrix, encode_vote_matrix
+from src.utils.shared_store import publish_vote_matrix, attach_vote_matrix
+from src.utils.chains import CHAINS, DEFAULT_CHAIN
+
+load_dotenv('.env')
+
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'html')
+DEFAULT_FILTERS = ('AT_LEAST_1_VOTED',)
+
+# Vote matrix of the current worker process, attached by `init_worker`
+_vote_matrix = None
+
+
+def read_groups_file(file_path: str) -> list:
+    """Reads a groups file into a list of report definitions.
+
+    Returns
+    -------
+    reports : list of dict
+        One definition per group and filter, with keys `group`, `validators` and `filter`.
+
+    """
+
+    with open(file_path, 'r') as file:
+        config = json.load(file)
+
+    # Every group writes to the directory of its slug, which has to be its own
+    names_by_slug = {}
+    for group in config['groups']:
+        names_by_slug.setdefault(slugify(group['name']), []).append(group['name'])
+    invalid_list = [names for slug, names in names_by_slug.items() if len(names) > 1 or slug == '']
+    assert len(invalid_list) == 0, f'Group names without a distinct output directory found, e.g. {invalid_list[:1]}. Rename the groups.'
+
+    default_filters = config.get('filters', DEFAULT_FILTERS)
+    reports = [{'group': group['name'], 'validators': group['validators'], 'filter': proposals_filter}
+               for group in config['groups']
+               for proposals_filter in group.get('filters', default_filters)]
+
+    invalid_list = [r for r in reports if r['filter'] not in PROPOSAL_FILTERS]
+    assert len(invalid_list) == 0, f'Unknown proposals filters found, e.g. {invalid_list[:1]}. Expected one of: {PROPOSAL_FILTERS}'
+
+    return reports
+
+
+def resolve_validators(vote_matrix: VoteMatrix, references: list) -> list:
+    """Resolves validator names or addresses into validator records."""
+
+    validators = vote_matrix.validators
+    lookup = {v['address']: v for v in validators}
+    lookup.update({v['name']: v for v in validators})
+
+    unknown_list = [r for r in references if r not in lookup]
+    assert len(unknown_list) == 0, f'Unknown validators found: {unknown_list}.'
+
+    return [lookup[r] for r in references]
+
+
+def slugify(text: str) -> str:
+    """Converts a group name into a file-system friendly name."""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def init_worker(store_dir: str):
+    """Attaches a worker process to the shared vote matrix."""
+    global _vote_matrix
+    _vote_matrix = attach_vote_matrix(store_dir)
+
+
+def compute_report(report: dict, output_dir: str, formats: tuple, vote_matrix: VoteMatrix = None) -> dict:
+    """Computes a single report and writes its output files.
+
+    Parameters
+    ----------
+    report : dict
+        A report definition, as returned by `read_groups_file`.
+
+    output_dir : str
+        Root directory of the output files.
+
+    formats : tuple of str
+        Output formats, among `csv`, `parquet` and `html`.
+
+    vote_matrix : VoteMatrix
+        Defaults to the vote matrix attached by the worker process.
+
+    Returns
+    -------
+    summary : dict
+        The report's scorecards and timing.
+
+    """
+
+    start = time.perf_counter()
+    vote_matrix = vote_matrix or _vote_matrix
+
+    validator_selection = resolve_validators(vote_matrix, report['validators'])
+    voting_history_df = vote_matrix.compile_voting_history(validator_selection)
+    filtered_voting_history_df = filter_voting_history(voting_history_df, report['filter'])
+    formatted_voting_history_df = format_voting_history(filtered_voting_history_df, validator_selection)
+    similarity_df = create_similarity_matrix(validator_selection, filtered_voting_history_df)
+    summary = summarize_voting_history(filtered_voting_history_df, validator_selection)
+
+    report_dir = os.path.join(output_dir, slugify(report['group']), report['filter'].lower())
+    os.makedirs(report_dir, exist_ok=True)
+
+    if 'csv' in formats:
+        filtered_voting_history_df.to_csv(os.path.join(report_dir, 'voting_history.csv'))
+        similarity_df.to_csv(os.path.join(report_dir, 'similarity.csv'))
+
+    if 'parquet' in formats:
+        filtered_voting_history_df.to_parquet(os.path.join(report_dir, 'voting_history.parquet'))
+        similarity_df.to_parquet(os.path.join(report_dir, 'similarity.parquet'))
+
+    if 'html' in formats:
+        with open(os.path.join(report_dir, 'report.html'), 'w') as file:
+            file.write(f"<h1>{report['group']}</h1>\n<p>Proposals filter: {report['filter']}</p>\n")
+            file.write(pd.DataFrame([summary]).to_html(index=False))
+            file.write('\n<h2>Voting Similarity</h2>\n')
+            file.write(similarity_df.to_html(na_rep=''))
+            file.write('\n<h2>Voting History</h2>\n')
+            file.write(formatted_voting_history_df.to_html())
+
+    return {'group': report['group'],
+            'filter': report['filter'],
+            'num_validators': len(validator_selection),
+            **summary,
+            'output_dir': report_dir,
+            'seconds': time.perf_counter() - start}
+
+
+def run_batch_reports(reports: list, vote_matrix: VoteMatrix, output_dir: str, formats: tuple = OUTPUT_FORMATS,
+                      workers: int = None, verbose: bool = True) -> pd.DataFrame:
+    """Computes all reports across a process pool that shares one copy of the vote matrix.
+
+    Parameters
+    ----------
+    reports : list of dict
+        Report definitions, as returned by `read_groups_file`.
+
+    vote_matrix : VoteMatrix
+        The encoded datasets.
+
+    output_dir : str
+        Root directory of the output files.
+
+    formats : tuple of str
+        Output formats, among `csv`, `parquet` and `html`.
+
+    workers : int
+        Number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    summary_df : pd.DataFrame
+        One row of scorecards and timing per report, also written to `summary.csv`.
+
+    """
+
+    invalid_list = [f for f in formats if f not in OUTPUT_FORMATS]
+    assert len(invalid_list) == 0, f'Unknown output formats: {invalid_list}. Expected: {OUTPUT_FORMATS}'
+
+    # Fail fast on unknown validators before starting the pool
+    for r in reports: resolve_validators(vote_matrix, r['validators'])
+
+    start = time.perf_counter()
+    summaries = []
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        publish_vote_matrix(vote_matrix, store_dir)
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(store_dir,)) as executor:
+            futures = [executor.submit(compute_report, r, output_dir, tuple(formats)) for r in reports]
+
+            for idx, future in enumerate(as_completed(futures)):
+                summary = future.result()
+                summaries.append(summary)
+                if verbose:
+                    print(f"[{idx+1}/{len(reports)}] {summary['group']} / {summary['filter']} ({summary['seconds']:.2f}s)")
+
+    elapsed = time.perf_counter() - start
+
+    summary_df = pd.DataFrame(summaries).sort_values(['group','filter']).reset_index(drop=True)
+    os.makedirs(output_dir, exist_ok=True)
+    summary_df.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+
+    if verbose:
+        print(f'{len(reports)} reports computed in {elapsed:.2f}s '
+              f'(mean {summary_df["seconds"].mean():.3f}s, max {summary_df["seconds"].max():.3f}s per report).')
+
+    return summary_df
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Computes comparison reports for predefined validator groups.')
+    parser.add_argument('groups_file', help='Path of the groups json file.')
+    parser.add_argument('--output-dir', default='reports')
+    parser.add_argument('--formats', nargs='+', default=list(OUTPUT_FORMATS), choices=OUTPUT_FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--chain', default=DEFAULT_CHAIN, choices=list(CHAINS))
+    args = parser.parse_args()
+
+    reports = read_groups_file(args.groups_file)
+
+    load_start = time.perf_counter()
+    vote_matrix = encode_vote_matrix(*get_datasets(args.chain))
+    print(f'Datasets loaded in {time.perf_counter() - load_start:.2f}s.')
+
+    run_batch_reports(reports, vote_matrix, args.output_dir, args.formats, args.workers)
@@ -0,0 +1,38 @@
+"""Starts the app server after kicking off its warm-up, with readiness endpoints for orchestrators.
+
+The warm-up runs on a background thread of the server process, so the stores it
+fills are the ones the app reads. `GET /ready` on the readiness port answers 503
+until every served chain is warm, then 200; `GET /health` answers 200 while the
+process is up, and 503 once the warm-up has failed all its retries.
+
+Usage
+-----
+
+    python -m src.serve [--readiness-port 8502] [streamlit run options, e.g. --server.port 8501]
+
+"""
+
+
+import argparse
+import os
+import sys
+import threading
+
+from streamlit.web import cli as stcli
+
+from src.utils.warmup import warm_up, start_readiness_server
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Start the app with a warm-up phase and readiness endpoints.')
+    parser.add_argument('--readiness-port', type=int, default=int(os.environ.get('READINESS_PORT', 8502)))
+    parser.add_argument('--script', default='app.py')
+    args, streamlit_args = parser.parse_known_args()
+
+    start_readiness_server(args.readiness_port)
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+    # The Streamlit server runs on the main thread, in this process
+    sys.argv = ['streamlit', 'run', args.script, *streamlit_args]
+    sys.exit(stcli.main())
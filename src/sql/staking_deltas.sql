@@ -0,0 +1,28 @@
+WITH
+
+staking_legs AS (
+    SELECT validator_address, block_id, block_timestamp, amount / 1e6 AS delegated_amount
+    FROM {schema}.core.fact_staking
+    WHERE action IN ('delegate', 'redelegate')
+      AND block_id > {from_block_id}
+     UNION ALL
+    SELECT validator_address, block_id, block_timestamp, -amount / 1e6 AS delegated_amount
+    FROM {schema}.core.fact_staking
+    WHERE action IN ('undelegate')
+      AND block_id > {from_block_id}
+     UNION ALL
+    SELECT redelegate_source_validator_address, block_id, block_timestamp, -amount / 1e6 AS delegated_amount
+    FROM {schema}.core.fact_staking
+    WHERE action IN ('redelegate')
+      AND block_id > {from_block_id}
+)
+
+
+SELECT validator_address
+     , block_id
+     , block_timestamp
+     , sum(delegated_amount) AS delta
+     , CURRENT_TIMESTAMP AS _extracted_at
+FROM staking_legs
+GROUP BY 1, 2, 3
+ORDER BY block_id, validator_address
@@ -18,19 +18,19 @@ validator_metadata AS (
              , sum(delegated_amount) AS voting_power
              , row_number() OVER (order by voting_power desc) AS rank
         FROM ( SELECT validator_address, amount / 1e6 AS delegated_amount
-               FROM osmosis.core.fact_staking
+               FROM {schema}.core.fact_staking
                WHERE action IN ('delegate', 'redelegate')
                 UNION ALL
                SELECT validator_address, -amount / 1e6 AS delegated_amount
-               FROM osmosis.core.fact_staking
+               FROM {schema}.core.fact_staking
                WHERE action IN ('undelegate')
                 UNION ALL
                SELECT redelegate_source_validator_address, -amount / 1e6 AS delegated_amount
-               FROM osmosis.core.fact_staking
+               FROM {schema}.core.fact_staking
                WHERE action IN ('redelegate') )
         GROUP BY 1
     ) AS vp
-        LEFT JOIN osmosis.core.fact_validators AS fv
+        LEFT JOIN {schema}.core.fact_validators AS fv
             ON fv.address = vp.validator_address
         LEFT JOIN missing_labels AS ml
             ON ml.validator_address = vp.validator_address
@@ -0,0 +1,74 @@
+WITH
+
+validator_labels AS (
+    SELECT address AS validator_address
+         , account_address
+         , label AS name
+    FROM {schema}.core.fact_validators
+),
+
+
+validator_creation AS (
+    SELECT m.attribute_value AS validator_address
+         , tx.tx_from AS account_address
+         , m.block_timestamp AS created_at
+         , m.tx_id AS _create_tx_id
+    FROM {schema}.core.fact_msg_attributes AS m
+        LEFT JOIN {schema}.core.fact_transactions AS tx
+            ON tx.tx_id = m.tx_id
+    WHERE m.tx_succeeded = True
+      AND m.msg_type = 'create_validator'
+      AND m.attribute_key = 'validator'
+    QUALIFY row_number() OVER (partition by validator_address order by created_at asc) = 1
+),
+
+
+validators AS (
+    SELECT *
+    FROM (
+        SELECT validator_address, account_address
+        FROM validator_labels
+    
+        UNION ALL
+    
+        SELECT validator_address, account_address
+        FROM validator_creation
+    )
+    QUALIFY row_number() OVER (partition by validator_address order by validator_address) = 1
+),
+
+
+validator_vote_events AS (
+    SELECT v.validator_address
+         , gv.proposal_id
+         , dvo.description AS vote
+         , gv.block_id
+         , tx.tx_index
+         , gv.block_timestamp
+         , gv.tx_id
+    
+    FROM {schema}.core.fact_governance_votes AS gv
+        INNER JOIN validators AS v
+            ON v.account_address = gv.voter
+
+        LEFT JOIN {schema}.core.fact_transactions AS tx
+            ON tx.tx_id = gv.tx_id
+
+        LEFT JOIN {schema}.core.dim_vote_options AS dvo
+            ON dvo.vote_id = gv.vote_option
+
+    WHERE gv.tx_succeeded = True
+      AND gv.block_id > {from_block_id}
+)
+
+
+SELECT validator_address
+     , proposal_id::integer AS proposal_id
+     , vote
+     , block_id
+     , tx_index
+     , block_timestamp
+     , tx_id
+     , CURRENT_TIMESTAMP AS _extracted_at
+FROM validator_vote_events
+ORDER BY block_id, tx_index
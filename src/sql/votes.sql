@@ -1,10 +1,15 @@
+-- Full extract of the latest vote of every validator on every proposal.
+-- Parameterized template, rendered per chain with src.utils.chains.render_sql. The ETL
+-- extracts vote events incrementally instead (vote_events.sql); this query rebuilds the
+-- votes dataset from scratch, e.g. to check it after a correction.
+
 WITH
 
 validator_labels AS (
     SELECT address AS validator_address
          , account_address
          , label AS name
-    FROM osmosis.core.fact_validators
+    FROM {schema}.core.fact_validators
 ),
 
 
@@ -13,8 +18,8 @@ validator_creation AS (
          , tx.tx_from AS account_address
          , m.block_timestamp AS created_at
          , m.tx_id AS _create_tx_id
-    FROM osmosis.core.fact_msg_attributes AS m
-        LEFT JOIN osmosis.core.fact_transactions AS tx
+    FROM {schema}.core.fact_msg_attributes AS m
+        LEFT JOIN {schema}.core.fact_transactions AS tx
             ON tx.tx_id = m.tx_id
     WHERE m.tx_succeeded = True
       AND m.msg_type = 'create_validator'
@@ -47,11 +52,11 @@ validator_votes AS (
          , gv.tx_id
          , gv.block_timestamp
     
-    FROM osmosis.core.fact_governance_votes AS gv
+    FROM {schema}.core.fact_governance_votes AS gv
         INNER JOIN validators AS v
             ON v.account_address = gv.voter
 
-        LEFT JOIN osmosis.core.dim_vote_options AS dvo
+        LEFT JOIN {schema}.core.dim_vote_options AS dvo
             ON dvo.vote_id = gv.vote_option
 
     WHERE gv.tx_succeeded = True
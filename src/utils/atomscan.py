@@ -5,10 +5,10 @@ import requests
 from collections import Counter
 
 
-def get_validators() -> list:
+def get_validators(lcd_url: str = 'https://proxy.atomscan.com/osmo-lcd') -> list:
     """Fetches a complete list of validators from Atomscan API"""
     
-    URL = 'https://proxy.atomscan.com/osmo-lcd/cosmos/staking/v1beta1/validators'
+    URL = f'{lcd_url}/cosmos/staking/v1beta1/validators'
     PAGE_SIZE = 1000
     
     r = requests.get(URL, params={'pagination.limit':PAGE_SIZE})
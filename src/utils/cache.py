@@ -0,0 +1,211 @@
+"""In-memory result caching shared across app sessions"""
+
+
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from src.utils.data import filter_voting_history, create_similarity_matrix, build_display_labels
+from src.utils.vote_matrix import VoteMatrix
+
+
+def estimate_size(value) -> int:
+    """Estimates the memory footprint of a cached value in bytes."""
+
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k,v in value.items())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """A thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The memory budget of the cache. Least recently used entries are evicted
+        until the total estimated size of all entries fits within the budget.
+
+    sizeof : callable
+        Function that returns the size in bytes of a cached value.
+
+    """
+
+    def __init__(self, max_bytes: int, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns a cached value and marks it as most recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Adds a value to the cache, evicting least recently used entries if needed."""
+        size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+            # Values larger than the whole budget are not cached
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Removes a value from the cache."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, size = self._entries.pop(key)
+            self._bytes -= size
+            return value
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the usage statistics of the cache."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {'entries': len(self._entries),
+                    'bytes': self._bytes,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / requests if requests > 0 else 0.0}
+
+
+def get_display_labels(cache: LRUCache, vote_matrix: VoteMatrix) -> dict:
+    """Returns the display labels of all proposals and validators, built once per data version."""
+
+    key = ('display_labels', vote_matrix.version)
+    labels = cache.get(key)
+
+    if labels is None:
+        labels = build_display_labels(vote_matrix.proposal_ids, vote_matrix.proposal_titles, vote_matrix.names)
+        cache.put(key, labels)
+
+    return labels
+
+
+def make_comparison_key(data_version: str, validator_selection: list, proposals_filter: str) -> tuple:
+    """Creates a cache key that does not depend on the order of the validator selection."""
+    return (data_version, tuple(sorted(x['address'] for x in validator_selection)), proposals_filter)
+
+
+def reorder_similarity_matrix(similarity_df: pd.DataFrame, selected_names: list) -> pd.DataFrame:
+    """Reorders a similarity matrix by selection order, keeping only the lower triangle."""
+
+    # Restore the full symmetric matrix, then hide the upper triangle again in the new order
+    symmetric_df = similarity_df.combine_first(similarity_df.T)
+    reordered_df = symmetric_df.loc[selected_names, selected_names].copy()
+    reordered_df.columns.name = similarity_df.columns.name
+    reordered_df.index.name = similarity_df.index.name
+
+    mask = np.triu(np.ones(reordered_df.shape, dtype=bool), k=1)
+    reordered_df = reordered_df.mask(mask)
+
+    return reordered_df
+
+
+def compare_validators(cache: LRUCache, vote_matrix: VoteMatrix, validator_selection: list, proposals_filter: str) -> tuple:
+    """Returns the filtered voting history and similarity matrix of a selection, via the cache.
+
+    Results are computed and cached in a canonical order (sorted by validator address),
+    so that every permutation of the same selection shares one cache entry, and are
+    reordered by selection order on output.
+
+    Parameters
+    ----------
+    cache : LRUCache
+        The shared result cache.
+
+    vote_matrix : VoteMatrix
+        The encoded votes. Its version is part of the cache key, so entries computed
+        from other datasets are never returned.
+
+    validator_selection : list of dict
+        The list of validators selected in-app for comparison.
+
+    proposals_filter : str
+        One of `AT_LEAST_1_VOTED`, `ALL_VOTED` or `ALL_PROPOSALS`.
+
+    Returns
+    -------
+    filtered_voting_history_df : pd.DataFrame
+        The voting history, with columns in selection order.
+
+    similarity_df : pd.DataFrame or None
+        The similarity matrix in selection order, or None if less than 2 validators are selected.
+
+    """
+
+    key = make_comparison_key(vote_matrix.version, validator_selection, proposals_filter)
+    result = cache.get(key)
+
+    if result is None:
+        canonical_selection = sorted(validator_selection, key=lambda x: x['address'])
+        voting_history_df = vote_matrix.compile_voting_history(canonical_selection)
+        filtered_voting_history_df = filter_voting_history(voting_history_df, proposals_filter)
+
+        similarity_df = None
+        if len(canonical_selection) >= 2:
+            similarity_df = create_similarity_matrix(canonical_selection, filtered_voting_history_df)
+
+        result = (filtered_voting_history_df, similarity_df)
+        cache.put(key, result)
+
+    filtered_voting_history_df, similarity_df = result
+    selected_names = [x['name'] for x in validator_selection]
+
+    filtered_voting_history_df = filtered_voting_history_df.loc[:, selected_names]
+    if similarity_df is not None:
+        similarity_df = reorder_similarity_matrix(similarity_df, selected_names)
+
+    return filtered_voting_history_df, similarity_df
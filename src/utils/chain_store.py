@@ -0,0 +1,89 @@
+"""Vote matrices of several chains held in one process under a shared memory budget.
+
+A chain's vote matrix is loaded on its first request and then kept in an LRU cache
+bounded by the total size of the matrices, so serving many chains costs the memory
+of the most recently used ones only. A new data version of a chain replaces the
+previous one. Only the datasets a vote matrix is encoded from make a new version,
+so a refresh that only touched e.g. the voting power history keeps the matrix.
+
+"""
+
+
+import threading
+
+from src.utils.cache import LRUCache, estimate_size
+from src.utils.data import VOTE_MATRIX_DATASETS
+from src.utils.vote_matrix import VoteMatrix
+
+
+def vote_matrix_size(vote_matrix: VoteMatrix) -> int:
+    """Estimates the memory footprint of a vote matrix, including its metadata."""
+    return vote_matrix.nbytes + estimate_size(vote_matrix.metadata)
+
+
+class ChainStore:
+    """Lazily loaded vote matrices of several chains, evicted under a memory budget.
+
+    Parameters
+    ----------
+    load : callable
+        Called as `load(chain, dataset_keys)` to build the vote matrix of a chain.
+
+    max_bytes : int
+        The memory budget of all vote matrices. A matrix larger than the whole budget
+        is still returned, but loaded again on every request.
+
+    """
+
+    def __init__(self, load, max_bytes: int):
+        self.load = load
+        self._cache = LRUCache(max_bytes, sizeof=vote_matrix_size)
+        self._lock = threading.Lock()
+        self._chain_locks = {}
+        self._current_keys = {}
+
+    def _chain_lock(self, chain: str) -> threading.Lock:
+        with self._lock:
+            return self._chain_locks.setdefault(chain, threading.Lock())
+
+    def get(self, chain: str, dataset_keys: dict) -> VoteMatrix:
+        """Returns the vote matrix of a chain's datasets, loading it on first request.
+
+        Parameters
+        ----------
+        chain : str
+            The chain ID.
+
+        dataset_keys : dict
+            The object key of each dataset of the chain, as returned by `get_dataset_keys`.
+            Only the keys of `VOTE_MATRIX_DATASETS` identify the vote matrix.
+
+        """
+
+        key = (chain, tuple((name, dataset_keys.get(name)) for name in VOTE_MATRIX_DATASETS))
+        vote_matrix = self._cache.get(key)
+
+        if vote_matrix is None:
+            # Concurrent first requests for the same chain load it only once
+            with self._chain_lock(chain):
+                vote_matrix = self._cache.get(key) if key in self._cache else None
+
+                if vote_matrix is None:
+                    vote_matrix = self.load(chain, dataset_keys)
+
+                    previous_key = self._current_keys.get(chain)
+                    if previous_key is not None and previous_key != key:
+                        self._cache.pop(previous_key)
+
+                    self._cache.put(key, vote_matrix)
+                    self._current_keys[chain] = key
+
+        return vote_matrix
+
+    def chains(self) -> list:
+        """Lists the chains currently held in memory."""
+        return sorted({chain for chain, key in self._current_keys.items() if key in self._cache})
+
+    def stats(self) -> dict:
+        """Returns the usage statistics of the underlying cache."""
+        return self._cache.stats()
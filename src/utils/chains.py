@@ -0,0 +1,61 @@
+"""Registry of the Cosmos chains served by the app, and their data layout"""
+
+
+# Per chain: display name, Flipside schema, validator operator address prefix,
+# Atomscan LCD proxy, minimum proposal deposit, storage prefix of its datasets and
+# governance tally parameters (shares of the voting power, see `proposal_outcomes`)
+CHAINS = {
+    'osmosis': {'name': 'Osmosis',
+                'schema': 'osmosis',
+                'address_prefix': 'osmovaloper',
+                'lcd_url': 'https://proxy.atomscan.com/osmo-lcd',
+                'min_deposit': 500,
+                'data_prefix': 'data',
+                'tally_params': {'quorum': 0.2, 'threshold': 0.5, 'veto_threshold': 0.334}},
+    'cosmoshub': {'name': 'Cosmos Hub',
+                  'schema': 'cosmos',
+                  'address_prefix': 'cosmosvaloper',
+                  'lcd_url': 'https://proxy.atomscan.com/cosmoshub-lcd',
+                  'min_deposit': 250,
+                  'data_prefix': 'chains/cosmoshub/data',
+                  'tally_params': {'quorum': 0.4, 'threshold': 0.5, 'veto_threshold': 0.334}},
+    'axelar': {'name': 'Axelar',
+               'schema': 'axelar',
+               'address_prefix': 'axelarvaloper',
+               'lcd_url': 'https://proxy.atomscan.com/axelar-lcd',
+               'min_deposit': 2000,
+               'data_prefix': 'chains/axelar/data',
+               'tally_params': {'quorum': 0.334, 'threshold': 0.5, 'veto_threshold': 0.334}},
+}
+
+DEFAULT_CHAIN = 'osmosis'
+
+
+def get_chain(chain_id: str) -> dict:
+    """Returns the registry entry of a chain."""
+    assert chain_id in CHAINS, f'Unknown chain: {chain_id}. Expected one of: {list(CHAINS)}'
+    return CHAINS[chain_id]
+
+
+def parse_chains(value: str) -> list:
+    """Parses a comma-separated list of chain IDs, e.g. the `CHAINS` environment variable.
+    An unset or empty list falls back to the default chain."""
+    chains = [chain.strip() for chain in (value or '').split(',') if chain.strip()]
+    return chains if len(chains) > 0 else [DEFAULT_CHAIN]
+
+
+def chain_object_key(chain_id: str, object_key: str) -> str:
+    """Maps an object key of the default layout (under `data/`) to the layout of a chain.
+
+    Datasets of the default chain keep their original keys, so existing clients are unaffected.
+
+    """
+
+    assert object_key.startswith('data/'), f'Object keys are expected under data/, got: {object_key}'
+    return get_chain(chain_id)['data_prefix'] + object_key[len('data'):]
+
+
+def render_sql(sql_template: str, chain_id: str, **params) -> str:
+    """Fills in the chain parameters (`{chain}`, `{schema}`, `{min_deposit}`) and any other placeholder of a SQL template."""
+    chain = get_chain(chain_id)
+    return sql_template.format(chain=chain_id, schema=chain['schema'], min_deposit=chain['min_deposit'], **params)
@@ -0,0 +1,166 @@
+"""Similarity heatmaps that stay fast to build and render as the selection grows.
+
+Small selections get the annotated heatmap, with the score in every cell. Larger
+selections drop the annotations and show the validator names and score on hover
+instead, and very large selections are rasterized server-side into a PNG of at
+most `RASTER_MAX_PIXELS` per side, so the payload sent to the browser stays
+bounded. Figures are cached as JSON per data version, selection and filter.
+
+"""
+
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import sample_colorscale
+
+from src.utils.cache import LRUCache
+
+
+# Selection sizes (number of validators) above which the lighter rendering modes are used
+ANNOTATION_LIMIT = 25
+RASTER_LIMIT = 150
+
+# Maximum width and height of a rasterized heatmap, in pixels (i.e. blocks of validators)
+RASTER_MAX_PIXELS = 600
+
+COLORSCALE = px.colors.sequential.Greens
+MAX_HEIGHT = 800
+
+HOVER_TEMPLATE = '%{y} vs. %{x}<br>Similarity: %{z:.2f}%<extra></extra>'
+
+
+def heatmap_mode(num_validators: int) -> str:
+    """Returns the rendering mode of a selection size: `annotated`, `heatmap` or `raster`."""
+    if num_validators <= ANNOTATION_LIMIT:
+        return 'annotated'
+    if num_validators <= RASTER_LIMIT:
+        return 'heatmap'
+    return 'raster'
+
+
+def downsample(values: np.ndarray, max_size: int) -> np.ndarray:
+    """Averages square blocks of a matrix (ignoring NaNs) so that neither side exceeds `max_size`."""
+
+    block = int(np.ceil(max(values.shape) / max_size))
+    if block <= 1:
+        return values
+
+    # Pad to a multiple of the block size, then average each block
+    rows = int(np.ceil(values.shape[0] / block)) * block
+    cols = int(np.ceil(values.shape[1] / block)) * block
+    padded = np.full((rows, cols), np.nan)
+    padded[:values.shape[0], :values.shape[1]] = values
+
+    blocks = padded.reshape(rows // block, block, cols // block, block)
+    counts = (~np.isnan(blocks)).sum(axis=(1,3))
+    sums = np.nansum(blocks, axis=(1,3))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def colorize(values: np.ndarray, range_color: tuple = (0,100)) -> np.ndarray:
+    """Maps a matrix of scores to RGBA pixels of the colorscale, with transparent NaNs."""
+
+    # One color per integer score is indistinguishable from the continuous scale
+    palette_size = 101
+    palette = sample_colorscale(COLORSCALE, np.linspace(0, 1, palette_size), colortype='tuple')
+    palette = np.round(np.array(palette) * 255).astype(np.uint8)
+
+    scaled = (np.nan_to_num(values, nan=range_color[0]) - range_color[0]) / (range_color[1] - range_color[0])
+    positions = np.clip(np.round(scaled * (palette_size - 1)), 0, palette_size - 1).astype(int)
+
+    pixels = np.zeros(values.shape + (4,), dtype=np.uint8)
+    pixels[..., :3] = palette[positions]
+    pixels[..., 3] = np.where(np.isnan(values), 0, 255)
+
+    return pixels
+
+
+def build_similarity_heatmap(similarity_df: pd.DataFrame) -> go.Figure:
+    """Builds the similarity heatmap figure, in the rendering mode of the selection size.
+
+    Parameters
+    ----------
+    similarity_df : pd.DataFrame
+        The similarity matrix, as returned by `create_similarity_matrix`.
+
+    """
+
+    num_validators = len(similarity_df)
+    mode = heatmap_mode(num_validators)
+
+    if mode == 'annotated':
+        fig = px.imshow(similarity_df, text_auto=True, color_continuous_scale=COLORSCALE, range_color=(0,100))
+        height = min(MAX_HEIGHT, 300+80*num_validators)
+
+    elif mode == 'heatmap':
+        # No per-cell text, the names and score are shown on hover
+        fig = go.Figure(go.Heatmap(z=similarity_df.to_numpy(), x=list(similarity_df.columns), y=list(similarity_df.index),
+                                   colorscale=COLORSCALE, zmin=0, zmax=100, hoverongaps=False,
+                                   hovertemplate=HOVER_TEMPLATE))
+        fig.update_yaxes(autorange='reversed')
+        height = MAX_HEIGHT
+
+    else:
+        # Rendered as a PNG, averaged over blocks of validators beyond the pixel budget
+        pixels = colorize(downsample(similarity_df.to_numpy(), RASTER_MAX_PIXELS))
+        block = int(np.ceil(num_validators / pixels.shape[0]))
+        fig = px.imshow(pixels, binary_string=True, binary_format='png')
+        # Pixel coordinates as positions in the selection, so hover points to the validators of a block
+        fig.update_traces(x0=1, dx=block, y0=1, dy=block,
+                          hovertemplate='Validator #%{y} vs. #%{x}<extra></extra>')
+        fig.update_xaxes(showticklabels=False)
+        fig.update_yaxes(showticklabels=False)
+        height = MAX_HEIGHT
+
+    fig.update_layout(xaxis=dict(side='bottom', title=None),
+                      yaxis=dict(side='left', title=None, showgrid=False),
+                      height=height,
+                      paper_bgcolor='rgba(0,0,0,0)',
+                      plot_bgcolor='rgba(0,0,0,0)',
+                      margin=dict(t=60,b=20,l=20,r=20)
+                     )
+
+    return fig
+
+
+def make_figure_key(data_version: str, validator_selection: list, proposals_filter: str) -> tuple:
+    """Creates a cache key of a figure. The selection order is kept, since it is the order of the axes."""
+    return ('similarity_heatmap', data_version, tuple(x['address'] for x in validator_selection), proposals_filter)
+
+
+def get_similarity_heatmap(cache: LRUCache, data_version: str, validator_selection: list, proposals_filter: str,
+                           similarity_df: pd.DataFrame) -> str:
+    """Returns the similarity heatmap as plotly JSON, built once per data version, selection and filter.
+
+    Parameters
+    ----------
+    cache : LRUCache
+        The shared result cache.
+
+    data_version : str
+        The version of the vote matrix the similarity matrix was computed from.
+
+    validator_selection : list of dict
+        The list of validators selected in-app for comparison.
+
+    proposals_filter : str
+        One of `AT_LEAST_1_VOTED`, `ALL_VOTED` or `ALL_PROPOSALS`.
+
+    similarity_df : pd.DataFrame
+        The similarity matrix of the selection, in selection order.
+
+    """
+
+    key = make_figure_key(data_version, validator_selection, proposals_filter)
+    fig_json = cache.get(key)
+
+    if fig_json is None:
+        fig_json = pio.to_json(build_similarity_heatmap(similarity_df), validate=False)
+        cache.put(key, fig_json)
+
+    return fig_json
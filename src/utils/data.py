@@ -7,13 +7,26 @@ import json
 import os
 import pandas as pd
 import numpy as np
-from itertools import permutations
 from dotenv import load_dotenv
 
+from src.utils.vote_events import read_vote_events, concat_vote_events
+from src.utils.chains import DEFAULT_CHAIN, chain_object_key
+
 
 load_dotenv('.env')
 
 GCS_BUCKET = os.environ.get('GCS_BUCKET')
+DATA_URL = os.environ.get('DATA_URL', f'https://storage.googleapis.com/{GCS_BUCKET}')
+
+PROPOSAL_FILTERS = ('AT_LEAST_1_VOTED', 'ALL_VOTED', 'ALL_PROPOSALS')
+
+MANIFEST_KEY = 'data/manifest.json'
+DATASET_KEYS = {'validators': 'data/validators.json.gz',
+                'proposals': 'data/proposals.json.gz',
+                'votes': 'data/votes.json.gz'}
+
+# The datasets a vote matrix is encoded from; the others of a snapshot do not affect it
+VOTE_MATRIX_DATASETS = ('validators', 'proposals', 'votes')
 
 
 def read_gzip_json_from_api(url):
@@ -29,31 +42,91 @@ def read_gzip_json_from_api(url):
     return data
 
 
-def get_validators() -> list:
+def read_gzip_json(location):
+    """Reads a gzip-compressed json from an API or from a local file"""
+    if location.startswith(('http://', 'https://')):
+        return read_gzip_json_from_api(location)
+
+    with gzip.open(location, 'rt') as file:
+        data = json.load(file)
+
+    return data
+
+
+def read_json(location):
+    """Reads a json from an API or from a local file. Returns None if it does not exist."""
+    if location.startswith(('http://', 'https://')):
+        response = requests.get(location)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        with open(location, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def get_manifest(chain: str = DEFAULT_CHAIN) -> dict:
+    """Fetches the manifest of the latest published snapshot of a chain, or None if there is none."""
+    
+    URL = f'{DATA_URL}/{chain_object_key(chain, MANIFEST_KEY)}'
+    manifest = read_json(URL)
+    
+    return manifest
+
+
+def get_dataset_keys(manifest: dict = None, chain: str = DEFAULT_CHAIN) -> dict:
+    """Returns the object key of each dataset, from a snapshot manifest or the legacy fixed names of a chain."""
+    
+    if manifest is None:
+        return {name: chain_object_key(chain, key) for name, key in DATASET_KEYS.items()}
+    
+    return {name: entry['object_key'] for name, entry in manifest['datasets'].items()}
+
+
+def get_changed_datasets(previous_manifest: dict, manifest: dict, datasets: tuple = None) -> list:
+    """Lists the datasets whose content differs between two snapshot manifests.
+
+    Either manifest may also be given as its dataset keys, as returned by `get_dataset_keys`,
+    and the comparison restricted to some `datasets` (e.g. `VOTE_MATRIX_DATASETS`).
+
+    """
+    
+    as_keys = lambda m: get_dataset_keys(m) if 'datasets' in m else m
+    previous_keys = as_keys(previous_manifest) if previous_manifest is not None else {}
+    keys = as_keys(manifest)
+    
+    return [name for name, key in keys.items()
+            if (datasets is None or name in datasets) and previous_keys.get(name) != key]
+
+
+def get_validators(object_key: str = DATASET_KEYS['validators']) -> list:
     """Fetches a complete list of validators."""
     
-    URL = f'https://storage.googleapis.com/{GCS_BUCKET}/data/validators.json.gz'
-    validators = read_gzip_json_from_api(URL)
+    URL = f'{DATA_URL}/{object_key}'
+    validators = read_gzip_json(URL)
     
     return validators
 
 
-def get_proposals() -> dict:
-    """Fetches complete list of governance proposals."""
+def get_proposals(object_key: str = DATASET_KEYS['proposals'], fields: tuple = ('id','title')) -> dict:
+    """Fetches complete list of governance proposals, with the given fields (e.g. also `submitted_at`)."""
     
-    URL = f'https://storage.googleapis.com/{GCS_BUCKET}/data/proposals.json.gz'
-    proposals = read_gzip_json_from_api(URL)
-    proposals = [{'id':val.get('id'),
-                  'title':val.get('title')}
+    URL = f'{DATA_URL}/{object_key}'
+    proposals = read_gzip_json(URL)
+    proposals = [{field:val.get(field) for field in fields}
                   for val in proposals]
     return proposals
 
 
-def get_validator_votes() -> list:
+def get_validator_votes(object_key: str = DATASET_KEYS['votes']) -> list:
     """Extracts complete list of votes for all validators."""
     
-    URL = f'https://storage.googleapis.com/{GCS_BUCKET}/data/votes.json.gz'
-    votes = read_gzip_json_from_api(URL)
+    URL = f'{DATA_URL}/{object_key}'
+    votes = read_gzip_json(URL)
     votes = [{'validator_address':val.get('validator_address'),
               'proposal_id':int(pid),
               'vote':vote} for val in votes for pid,vote in val.get('votes').items()]
@@ -61,6 +134,28 @@ def get_validator_votes() -> list:
     return votes
 
 
+def get_vote_events(object_key: str) -> pd.DataFrame:
+    """Fetches the complete vote event log, from its index in a snapshot manifest."""
+    
+    URL = f'{DATA_URL}/{object_key}'
+    index = read_gzip_json(URL)
+    segments = [read_vote_events(f"{DATA_URL}/{s['object_key']}") for s in index['segments']]
+    
+    return concat_vote_events(segments)
+
+
+def get_datasets(chain: str = DEFAULT_CHAIN) -> tuple:
+    """Fetches validators, proposals and votes of a chain, all from the same published snapshot."""
+    
+    keys = get_dataset_keys(get_manifest(chain), chain)
+    
+    validators = get_validators(keys['validators'])
+    proposals = get_proposals(keys['proposals'])
+    votes = get_validator_votes(keys['votes'])
+    
+    return validators, proposals, votes
+
+
 def prepare_complete_votes_df(validators: list, proposals: list, votes: list) -> pd.DataFrame:
     """Merges and formats raw datasets."""
     
@@ -126,7 +221,112 @@ def compile_voting_history(votes_df: pd.DataFrame, proposals_df: pd.DataFrame,
     return voting_history_df
 
 
-def format_voting_history(voting_history_df: pd.DataFrame, validator_selection: list) -> pd.DataFrame:
+def filter_voting_history(voting_history_df: pd.DataFrame, proposals_filter: str) -> pd.DataFrame:
+    """Filters the proposals of a voting history table by the in-app filter setting.
+    
+    Parameters
+    ----------
+    voting_history_df : pd.DataFrame
+        A side-by-side table of votes for all selected validators across a set of
+        governance proposals.
+    
+    proposals_filter : str
+        One of `AT_LEAST_1_VOTED`, `ALL_VOTED` or `ALL_PROPOSALS`.
+    
+    Returns
+    -------
+    filtered_voting_history_df : pd.DataFrame
+    
+    """
+    
+    assert proposals_filter in PROPOSAL_FILTERS, f'Unknown proposals filter: {proposals_filter}'
+    
+    filtered_voting_history_df = voting_history_df.copy()
+    
+    if proposals_filter == 'AT_LEAST_1_VOTED':
+        filtered_voting_history_df = filtered_voting_history_df.loc[filtered_voting_history_df.notnull().mean(axis=1) > 0]
+    
+    elif proposals_filter == 'ALL_VOTED':
+        filtered_voting_history_df = filtered_voting_history_df.loc[filtered_voting_history_df.notnull().mean(axis=1) == 1]
+    
+    return filtered_voting_history_df
+
+
+def summarize_voting_history(voting_history_df: pd.DataFrame, validator_selection: list) -> dict:
+    """Calculates the summary scorecards of a (filtered) voting history table.
+    
+    Parameters
+    ----------
+    voting_history_df : pd.DataFrame
+        A side-by-side table of votes for all selected validators across a set of
+        governance proposals.
+    
+    validator_selection : list of dict
+        The list of validators selected in-app for comparison.
+    
+    Returns
+    -------
+    summary : dict
+        The number of proposals, the number of proposals where all selected validators
+        voted exactly the same, and the share of the latter among all proposals.
+    
+    """
+    
+    selected_names = [v['name'] for v in validator_selection]
+    num_proposals = voting_history_df.shape[0]
+    exact_same_votes = int((voting_history_df.loc[:,selected_names].eq(voting_history_df.loc[:,selected_names[0]], axis=0).mean(axis=1)==1).sum())
+    
+    if num_proposals == 0:
+        intersection = 0
+    else:
+        intersection = exact_same_votes / num_proposals
+    
+    return {'num_proposals': num_proposals,
+            'exact_same_votes': exact_same_votes,
+            'intersection': intersection}
+
+
+def format_validator_name(name: str) -> str:
+    """Pads or truncates a validator name to the width of a voting history column."""
+    return name.ljust(18) if len(name)<=18 else name[:15]+'...'
+
+
+def build_display_labels(proposal_ids: list, proposal_titles: list, validator_names: list) -> dict:
+    """Precomputes the voting history labels of all proposals and validators of a dataset.
+    
+    Parameters
+    ----------
+    proposal_ids : list of int
+        All proposal IDs.
+    
+    proposal_titles : list of str
+        All proposal titles, in the order of `proposal_ids`.
+    
+    validator_names : list of str
+        All validator names.
+    
+    Returns
+    -------
+    labels : dict
+        The proposal IDs in display order (latest to oldest), the (ID, Proposal) index
+        labels in the same order, and the column label of each validator name.
+    
+    """
+    
+    ids = pd.Series(proposal_ids).astype('str')
+    titles = pd.Series(proposal_titles, dtype='object').fillna('')
+    
+    proposal_index = pd.MultiIndex.from_arrays([ids.str.rjust(5), 'Prop #' + ids + ' - ' + titles], names=['ID','Proposal'])
+    proposal_index, order = proposal_index.sort_values(ascending=False, return_indexer=True)
+    
+    labels = {'proposal_ids': pd.Index(np.asarray(proposal_ids)[order]),
+              'proposal_index': proposal_index,
+              'validator_labels': {name: format_validator_name(name) for name in validator_names}}
+    
+    return labels
+
+
+def format_voting_history(voting_history_df: pd.DataFrame, validator_selection: list, labels: dict = None) -> pd.DataFrame:
     """Prepares a formatted DataFrame of validator voting history for display as an html table.
     
     Parameters
@@ -138,11 +338,18 @@ def format_voting_history(voting_history_df: pd.DataFrame, validator_selection:
     validator_selection : list of dict
         The list of validators selected in-app for comparison.
     
+    labels : dict
+        Precomputed display labels, as returned by `build_display_labels`. If given,
+        rows are ordered and labelled by index lookups instead of string formatting.
+    
     Returns
     -------
     formatted_df : pd.DataFrame
     
     """
+    
+    if labels is not None:
+        return format_voting_history_with_labels(voting_history_df, validator_selection, labels)
 
     formatted_df = voting_history_df.copy()
     
@@ -161,7 +368,7 @@ def format_voting_history(voting_history_df: pd.DataFrame, validator_selection:
     formatted_df = formatted_df[[v for v in selected_names if v in formatted_df.columns.tolist()]]
     
     # Truncate long validator names
-    formatted_df.columns = [v.ljust(18) if len(v)<=18 else v[:15]+'...' for v in formatted_df.columns]
+    formatted_df.columns = [format_validator_name(v) for v in formatted_df.columns]
     
     # Format blank cells
     formatted_df = formatted_df.fillna('-')
@@ -169,6 +376,28 @@ def format_voting_history(voting_history_df: pd.DataFrame, validator_selection:
     return formatted_df
 
 
+def format_voting_history_with_labels(voting_history_df: pd.DataFrame, validator_selection: list, labels: dict) -> pd.DataFrame:
+    """Same as `format_voting_history`, with the labels and proposal order looked up from precomputed labels."""
+    
+    # Display position of each row, latest proposal first
+    positions = labels['proposal_ids'].get_indexer(voting_history_df.index.get_level_values('id'))
+    assert (positions >= 0).all(), 'Voting history has proposals without display labels'
+    order = np.argsort(positions, kind='stable')
+    
+    # Order columns by selection order
+    selected_names = [x['name'] for x in validator_selection]
+    columns = [v for v in selected_names if v in voting_history_df.columns]
+    
+    formatted_df = voting_history_df[columns].iloc[order]
+    formatted_df.index = labels['proposal_index'][positions[order]]
+    formatted_df.columns = [labels['validator_labels'].get(v) or format_validator_name(v) for v in columns]
+    
+    # Format blank cells
+    formatted_df = formatted_df.fillna('-')
+    
+    return formatted_df
+
+
 def create_similarity_matrix(validator_selection: list, voting_history_df: pd.DataFrame) -> pd.DataFrame:
     """Calculates a voting similarity matrix for all pairs of validators among those selected.
     
@@ -189,33 +418,29 @@ def create_similarity_matrix(validator_selection: list, voting_history_df: pd.Da
     """
     
     
-    # List down all validator pairs
     selected_names = [x['name'] for x in validator_selection]
-    pairs = list(permutations(selected_names, 2))
-    similarity_scores = []
-
-    for p in pairs:
-        pair_votes = voting_history_df[[p[0],p[1]]]            
-        num_proposals = pair_votes.shape[0]
-        similarity = (pair_votes.iloc[:,0] == pair_votes.iloc[:,1]).mean()
-
-        similarity_scores.append({'validator_0':p[0],
-                                  'validator_1':p[1],
-                                  'num_proposals':num_proposals,
-                                  'similarity':similarity})
-
-    similarity_df = pd.DataFrame(similarity_scores)
-    similarity_df = similarity_df.pivot(index='validator_0', columns='validator_1', values='similarity')
-    similarity_df = similarity_df.loc[selected_names, selected_names]
-    similarity_df = similarity_df.fillna(0)
+    
+    # Encode votes as integers (-1 for no vote), then count matching votes of all pairs at once,
+    # one matrix product per vote option
+    codes, _ = pd.factorize(voting_history_df[selected_names].to_numpy().ravel())
+    codes = codes.reshape(-1, len(selected_names))
+    num_proposals = codes.shape[0]
+    
+    matches = np.zeros((len(selected_names), len(selected_names)))
+    for option in range(codes.max(initial=-1) + 1):
+        voted_option = (codes == option).astype(np.float64)
+        matches += voted_option.T @ voted_option
+    
+    similarity = matches / num_proposals if num_proposals > 0 else matches
+    
+    # Keep the lower triangle only
+    np.fill_diagonal(similarity, 1)
+    similarity[np.triu_indices(len(selected_names), k=1)] = np.nan
+    
+    similarity_df = pd.DataFrame(similarity, index=selected_names, columns=selected_names)
     similarity_df.columns.name = 'Validator A'
     similarity_df.index.name = 'Validator B'
 
-    n = similarity_df.shape[0]
-    for idx in range(n):
-        similarity_df.iloc[idx,idx] = 1
-        similarity_df.iloc[:idx,idx] = None
-
     similarity_df = (similarity_df * 100).round(2)
     
     return similarity_df
\ No newline at end of file
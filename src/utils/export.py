@@ -0,0 +1,309 @@
+"""Streaming exports of voting histories, similarity matrices and raw votes.
+
+Exports are produced as generators of small DataFrame chunks read straight from
+the encoded vote matrix, which are then encoded chunk by chunk into CSV or
+Parquet bytes and spooled to a temporary file. Memory use while exporting depends
+on the chunk size, not on the export size. This bound ends at the download
+handoff: Streamlit holds the whole payload in memory to serve it, so payloads are
+capped at `MAX_EXPORT_BYTES` and built once per `export_key`, on request.
+
+"""
+
+
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+from src.utils.data import PROPOSAL_FILTERS
+from src.utils.vote_matrix import VoteMatrix
+
+
+EXPORT_FORMATS = ('csv', 'parquet')
+EXPORT_DATASETS = ('voting_history', 'similarity', 'raw_votes')
+CHUNK_SIZE = 100
+
+# Largest payload kept for a download, e.g. the raw votes of ~350 validators on ~650 proposals are ~20 MB as CSV
+MAX_EXPORT_BYTES = 64 * 2**20
+
+
+class ExportTooLargeError(ValueError):
+    """Raised when an export exceeds the maximum payload size."""
+
+
+def filter_proposals_mask(vote_matrix: VoteMatrix, positions: np.ndarray, proposals_filter: str) -> np.ndarray:
+    """Returns a boolean mask of the proposals kept by a proposals filter for the given validators."""
+
+    assert proposals_filter in PROPOSAL_FILTERS, f'Unknown proposals filter: {proposals_filter}'
+
+    if proposals_filter == 'ALL_PROPOSALS':
+        return np.ones(len(vote_matrix.proposal_ids), dtype=bool)
+
+    voted = np.zeros(len(vote_matrix.proposal_ids), dtype=np.int64)
+    for start in range(0, len(positions), CHUNK_SIZE):
+        voted += (vote_matrix.votes[positions[start:start+CHUNK_SIZE]] > 0).sum(axis=0)
+
+    if proposals_filter == 'AT_LEAST_1_VOTED':
+        return voted > 0
+    return voted == len(positions)
+
+
+def voting_history_chunks(vote_matrix: VoteMatrix, validator_selection: list = None,
+                          proposals_filter: str = 'ALL_PROPOSALS', chunk_size: int = CHUNK_SIZE):
+    """Yields the voting history table in chunks of proposals.
+
+    Parameters
+    ----------
+    vote_matrix : VoteMatrix
+        The encoded votes.
+
+    validator_selection : list of dict
+        The validators to export. Defaults to all validators.
+
+    proposals_filter : str
+        One of `AT_LEAST_1_VOTED`, `ALL_VOTED` or `ALL_PROPOSALS`.
+
+    chunk_size : int
+        Number of proposals per chunk.
+
+    Yields
+    ------
+    chunk_df : pd.DataFrame
+        Proposal IDs and titles, then one column of votes per validator.
+
+    """
+
+    validator_selection = validator_selection if validator_selection is not None else vote_matrix.validators
+    positions = vote_matrix.validator_positions(validator_selection)
+    names = [vote_matrix.names[pos] for pos in positions]
+    proposal_positions = np.flatnonzero(filter_proposals_mask(vote_matrix, positions, proposals_filter))
+
+    # An empty export still yields one (empty) chunk, so that the output has a header
+    for start in range(0, max(len(proposal_positions), 1), chunk_size):
+        chunk = proposal_positions[start:start+chunk_size]
+        votes = vote_matrix.decode(vote_matrix.votes[np.ix_(positions, chunk)].T)
+
+        chunk_df = pd.DataFrame(votes, columns=names)
+        chunk_df.insert(0, 'title', [vote_matrix.proposal_titles[p] for p in chunk])
+        chunk_df.insert(0, 'id', [vote_matrix.proposal_ids[p] for p in chunk])
+
+        yield chunk_df
+
+
+def similarity_chunks(vote_matrix: VoteMatrix, validator_selection: list = None,
+                      proposals_filter: str = 'ALL_PROPOSALS', chunk_size: int = CHUNK_SIZE):
+    """Yields the similarity matrix in chunks of rows.
+
+    Scores are the same as `create_similarity_matrix`, i.e. the percentage of proposals
+    (after filtering) where both validators voted the same, with the upper triangle blank.
+
+    Yields
+    ------
+    chunk_df : pd.DataFrame
+        A `validator` column, then one column of scores per validator.
+
+    """
+
+    validator_selection = validator_selection if validator_selection is not None else vote_matrix.validators
+    positions = vote_matrix.validator_positions(validator_selection)
+    names = [vote_matrix.names[pos] for pos in positions]
+    proposal_mask = filter_proposals_mask(vote_matrix, positions, proposals_filter)
+    num_proposals = int(proposal_mask.sum())
+    votes = vote_matrix.votes[:, proposal_mask]
+
+    for start in range(0, len(positions), chunk_size):
+        rows = positions[start:start+chunk_size]
+
+        # Matching votes of this block of rows against all columns, one vote option at a time
+        matches = np.zeros((len(rows), len(positions)))
+        for option in range(1, int(votes.max(initial=0)) + 1):
+            matches += (votes[rows] == option).astype(np.float64) @ (votes[positions] == option).astype(np.float64).T
+
+        similarity = matches / num_proposals if num_proposals > 0 else matches
+        row_idx, col_idx = np.indices(similarity.shape)
+        row_idx += start
+        similarity[row_idx == col_idx] = 1
+        similarity[col_idx > row_idx] = np.nan
+
+        chunk_df = pd.DataFrame((similarity * 100).round(2), columns=names)
+        chunk_df.insert(0, 'validator', names[start:start+chunk_size])
+
+        yield chunk_df
+
+
+def raw_votes_chunks(vote_matrix: VoteMatrix, chunk_size: int = CHUNK_SIZE):
+    """Yields all votes as a long table, in chunks of validators.
+
+    Yields
+    ------
+    chunk_df : pd.DataFrame
+        Columns `validator_address`, `validator_name`, `proposal_id` and `vote`.
+
+    """
+
+    proposal_ids = np.asarray(vote_matrix.proposal_ids)
+
+    for start in range(0, len(vote_matrix.addresses), chunk_size):
+        rows, cols = np.nonzero(vote_matrix.votes[start:start+chunk_size])
+        rows += start
+
+        yield pd.DataFrame({'validator_address': [vote_matrix.addresses[r] for r in rows],
+                            'validator_name': [vote_matrix.names[r] for r in rows],
+                            'proposal_id': proposal_ids[cols],
+                            'vote': vote_matrix.decode(vote_matrix.votes[rows, cols])})
+
+
+def export_chunks(vote_matrix: VoteMatrix, dataset: str, validator_selection: list = None,
+                  proposals_filter: str = 'ALL_PROPOSALS', chunk_size: int = CHUNK_SIZE):
+    """Yields the chunks of one of the exportable datasets.
+
+    Parameters
+    ----------
+    dataset : str
+        One of `voting_history`, `similarity` or `raw_votes`.
+
+    validator_selection : list of dict
+        The validators to export. Defaults to all validators. Ignored for raw votes.
+
+    """
+
+    assert dataset in EXPORT_DATASETS, f'Unknown dataset: {dataset}. Expected one of: {EXPORT_DATASETS}'
+
+    if dataset == 'voting_history':
+        return voting_history_chunks(vote_matrix, validator_selection, proposals_filter, chunk_size)
+    elif dataset == 'similarity':
+        return similarity_chunks(vote_matrix, validator_selection, proposals_filter, chunk_size)
+    return raw_votes_chunks(vote_matrix, chunk_size)
+
+
+def to_csv_stream(chunks):
+    """Encodes DataFrame chunks into CSV bytes, one piece per chunk."""
+    for idx, chunk_df in enumerate(chunks):
+        yield chunk_df.to_csv(index=False, header=(idx == 0)).encode('utf-8')
+
+
+class _BufferSink(io.RawIOBase):
+    """A write-only file object whose written bytes are drained after each chunk."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer += b
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def to_parquet_stream(chunks):
+    """Encodes DataFrame chunks into Parquet bytes, one row group per chunk."""
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _BufferSink()
+    writer = None
+    schema = None
+
+    for chunk_df in chunks:
+        if writer is None:
+            # Columns without any value in the first chunk default to strings
+            schema = pa.Schema.from_pandas(chunk_df, preserve_index=False)
+            schema = pa.schema([pa.field(f.name, pa.string()) if f.type == pa.null() else f for f in schema])
+            writer = pq.ParquetWriter(sink, schema)
+
+        writer.write_table(pa.Table.from_pandas(chunk_df, schema=schema, preserve_index=False))
+        yield sink.drain()
+
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def export_stream(chunks, export_format: str):
+    """Encodes DataFrame chunks into a stream of bytes of the given format."""
+
+    assert export_format in EXPORT_FORMATS, f'Unknown export format: {export_format}. Expected one of: {EXPORT_FORMATS}'
+
+    if export_format == 'csv':
+        return to_csv_stream(chunks)
+    return to_parquet_stream(chunks)
+
+
+def write_stream(stream, file, max_bytes: int = None):
+    """Writes a stream of bytes to a path or binary file object, and returns the number of bytes written.
+    Raises `ExportTooLargeError` as soon as more than `max_bytes` (if set) are written."""
+
+    if isinstance(file, str):
+        with open(file, 'wb') as f:
+            return write_stream(stream, f, max_bytes)
+
+    num_bytes = 0
+    for data in stream:
+        file.write(data)
+        num_bytes += len(data)
+        if max_bytes is not None and num_bytes > max_bytes:
+            raise ExportTooLargeError(f'Export exceeds the maximum size of {max_bytes / 2**20:.0f} MB.')
+
+    return num_bytes
+
+
+@contextmanager
+def open_export(stream, max_bytes: int = None):
+    """Spools a stream of bytes to a named temporary file and yields it opened for reading.
+
+    The yielded file is an `io.BufferedReader`, one of the file types accepted by
+    `st.download_button`. The temporary file is removed on exit.
+
+    """
+
+    file = tempfile.NamedTemporaryFile(prefix='export-', delete=False)
+    try:
+        with file:
+            write_stream(stream, file, max_bytes)
+
+        with open(file.name, 'rb') as export_file:
+            yield export_file
+    finally:
+        os.remove(file.name)
+
+
+def prepare_export(stream, max_bytes: int = MAX_EXPORT_BYTES) -> bytes:
+    """Builds the payload of a download from a stream of bytes, spooled to disk until it is complete.
+
+    Raises `ExportTooLargeError` if the payload exceeds `max_bytes`, before it is read into memory.
+
+    """
+
+    with open_export(stream, max_bytes) as file:
+        return file.read()
+
+
+def export_key(version: str, dataset: dict, export_format: str, validator_selection: list, proposals_filter: str) -> tuple:
+    """Returns the key of an export payload: the data version and the inputs the export depends on.
+
+    Parameters
+    ----------
+    dataset : dict
+        The export option, with the dataset `id` and whether it covers `all` validators,
+        in which case the validator selection and proposals filter do not matter.
+
+    """
+
+    if dataset['all']:
+        return version, dataset['id'], True, export_format
+
+    return version, dataset['id'], False, export_format, tuple(v['address'] for v in validator_selection), proposals_filter
@@ -7,7 +7,7 @@ from google.cloud import storage
 from pandas import to_datetime
 
 
-def upload_file_to_gcs(file, bucket_name, object_key, service_account_key):
+def upload_file_to_gcs(file, bucket_name, object_key, service_account_key, cache_control=None):
     """Uploads a file to Google Cloud Storage.
 
     Parameters
@@ -24,6 +24,9 @@ def upload_file_to_gcs(file, bucket_name, object_key, service_account_key):
     service_account_key :dict
         The service account JSON key file.
         
+    cache_control : str
+        Optional Cache-Control metadata of the uploaded object.
+        
     Returns
     -------
     None
@@ -41,6 +44,7 @@ def upload_file_to_gcs(file, bucket_name, object_key, service_account_key):
 
     # Create a blob object
     blob = bucket.blob(object_key)
+    blob.cache_control = cache_control
 
     # Upload the file
     blob.upload_from_filename(file)
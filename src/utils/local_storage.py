@@ -0,0 +1,42 @@
+"""Local filesystem stand-in for cloud storage, e.g. for tests and local development"""
+
+
+import os
+import shutil
+
+
+def copy_file_to_local_storage(file, root_dir, object_key, cache_control=None):
+    """Copies a file into a local directory laid out like a storage bucket.
+
+    Parameters
+    ----------
+    file : str
+        The local path of the file to upload.
+        
+    root_dir : str
+        The directory that stands in for the bucket.
+        
+    object_key : str
+        The name to give the uploaded file in the bucket.
+        
+    cache_control : str
+        Ignored, accepted for compatibility with `upload_file_to_gcs`.
+        
+    Returns
+    -------
+    None
+    
+    """
+    
+    if object_key is None:
+        object_key = file.split('/')[-1]
+    
+    destination = os.path.join(root_dir, object_key)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    
+    # Copy to a temporary file first so that readers never see a partial object
+    tmp_destination = f'{destination}.tmp-{os.getpid()}'
+    shutil.copyfile(file, tmp_destination)
+    os.replace(tmp_destination, destination)
+
+    print(f"File {file} uploaded to {root_dir}/{object_key}.")
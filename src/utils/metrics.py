@@ -0,0 +1,157 @@
+"""Per-validator alignment metrics with proposal outcomes and the voting power majority.
+
+Proposal tallies are weighted by the voting power of validators, one matrix-vector
+product per vote option over the encoded vote matrix, and all validators are scored
+in a single vectorized pass. Since delegators who override their validator's vote
+are not part of the datasets, outcomes are estimated from validator votes only.
+
+"""
+
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cache import LRUCache
+from src.utils.chains import DEFAULT_CHAIN, get_chain
+from src.utils.vote_matrix import VoteMatrix, VOTE_LABELS, VOTE_CODES
+
+
+def weighted_tallies(vote_matrix: VoteMatrix) -> np.ndarray:
+    """Tallies the voting power behind each vote option of every proposal.
+
+    Returns
+    -------
+    tallies : np.ndarray
+        A float64 array of shape (n_vote_options, n_proposals), indexed by vote code.
+        The row of code 0 (no vote) is the voting power that did not vote.
+
+    """
+
+    tallies = np.zeros((len(VOTE_LABELS), len(vote_matrix.proposal_ids)))
+    for option in range(1, len(VOTE_LABELS)):
+        tallies[option] = (vote_matrix.votes == option).T.astype(np.float64) @ vote_matrix.voting_power
+
+    tallies[0] = vote_matrix.voting_power.sum() - tallies[1:].sum(axis=0)
+
+    return tallies
+
+
+def proposal_outcomes(tallies: np.ndarray, quorum: float, threshold: float, veto_threshold: float) -> np.ndarray:
+    """Applies the governance tally rules to weighted tallies, with the tally parameters of a chain
+    (`tally_params` in the chain registry).
+
+    Parameters
+    ----------
+    tallies : np.ndarray
+        Weighted tallies, as returned by `weighted_tallies`.
+
+    quorum : float
+        Minimum share of the total voting power that has to vote.
+
+    threshold : float
+        Minimum share of YES among non-abstaining votes to pass.
+
+    veto_threshold : float
+        Share of NO WITH VETO among all votes that vetoes a proposal.
+
+    Returns
+    -------
+    outcomes : np.ndarray
+        One of `PASSED`, `REJECTED`, `VETOED` or `NO QUORUM` per proposal.
+
+    """
+
+    turnout = tallies[1:].sum(axis=0)
+    non_abstain = turnout - tallies[VOTE_CODES['ABSTAIN']]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yes_share = np.where(non_abstain > 0, tallies[VOTE_CODES['YES']] / non_abstain, 0)
+        veto_share = np.where(turnout > 0, tallies[VOTE_CODES['NO WITH VETO']] / turnout, 0)
+
+    outcomes = np.where(yes_share > threshold, 'PASSED', 'REJECTED').astype(object)
+    outcomes[veto_share > veto_threshold] = 'VETOED'
+    outcomes[turnout < quorum * tallies.sum(axis=0)] = 'NO QUORUM'
+
+    return outcomes
+
+
+def compute_validator_metrics(vote_matrix: VoteMatrix, chain: str = DEFAULT_CHAIN) -> pd.DataFrame:
+    """Scores every validator against proposal outcomes and the voting power majority.
+
+    Parameters
+    ----------
+    vote_matrix : VoteMatrix
+        The encoded votes, with the voting power of each validator.
+
+    chain : str
+        The chain of the vote matrix, whose tally parameters decide proposal outcomes.
+
+    Returns
+    -------
+    metrics_df : pd.DataFrame
+        One row per validator with its number of votes and:
+        - `participation`: the share of all proposals voted on,
+        - `outcome_alignment`: the share of votes on decided proposals that were YES on
+          passed proposals, or NO / NO WITH VETO on rejected or vetoed ones,
+        - `majority_alignment`: the share of votes that matched the option with the most
+          voting power behind it.
+        Shares are NaN for validators without any such vote.
+
+    """
+
+    votes = vote_matrix.votes
+    tallies = weighted_tallies(vote_matrix)
+    outcomes = proposal_outcomes(tallies, **get_chain(chain)['tally_params'])
+
+    # Option with the most voting power behind it (0 if no voting power voted)
+    majority = np.where(tallies[1:].sum(axis=0) > 0, tallies[1:].argmax(axis=0) + 1, 0)
+
+    passed = outcomes == 'PASSED'
+    decided = outcomes != 'NO QUORUM'
+    voted = votes > 0
+    voted_against = (votes == VOTE_CODES['NO']) | (votes == VOTE_CODES['NO WITH VETO'])
+
+    outcome_aligned = ((votes == VOTE_CODES['YES']) & passed) | (voted_against & ~passed)
+    num_votes = voted.sum(axis=1)
+    num_decided_votes = (voted & decided).sum(axis=1)
+    num_majority_votes = (voted & (majority > 0)).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        metrics_df = pd.DataFrame({
+            'address': vote_matrix.addresses,
+            'name': vote_matrix.names,
+            'voting_power': vote_matrix.voting_power,
+            'num_votes': num_votes,
+            'participation': num_votes / max(len(vote_matrix.proposal_ids), 1),
+            'outcome_alignment': (outcome_aligned & decided).sum(axis=1) / num_decided_votes,
+            'majority_alignment': ((votes == majority) & (majority > 0)).sum(axis=1) / num_majority_votes,
+        })
+
+    return metrics_df
+
+
+def get_validator_metrics(cache: LRUCache, vote_matrix: VoteMatrix, chain: str = DEFAULT_CHAIN) -> pd.DataFrame:
+    """Returns the validator metrics, computed once per chain and data version.
+
+    Parameters
+    ----------
+    cache : LRUCache
+        The result cache. The chain and the vote matrix version are part of the cache
+        key, so a data refresh never returns stale metrics.
+
+    vote_matrix : VoteMatrix
+        The encoded votes.
+
+    chain : str
+        The chain of the vote matrix.
+
+    """
+
+    key = ('validator_metrics', chain, vote_matrix.version)
+    metrics_df = cache.get(key)
+
+    if metrics_df is None:
+        metrics_df = compute_validator_metrics(vote_matrix, chain)
+        cache.put(key, metrics_df)
+
+    return metrics_df
@@ -0,0 +1,206 @@
+"""Indexed search of governance proposals by title, ID range and submission date.
+
+The index is built once per data version: an inverted index from title tokens to
+proposal positions, and sorted arrays of proposal IDs and submission timestamps.
+A search then costs a few binary searches and set intersections instead of a scan
+of all titles, and returns a mask over the proposals in vote matrix order.
+
+"""
+
+
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+from src.utils.cache import LRUCache
+from src.utils.vote_matrix import VoteMatrix
+
+
+def to_utc_timestamp(value) -> pd.Timestamp:
+    """Converts a date, datetime or string to a UTC timestamp, assuming UTC for naive values."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def tokenize(text: str) -> list:
+    """Splits a text into lowercase alphanumeric tokens."""
+    return re.findall(r'[a-z0-9]+', (text or '').lower())
+
+
+class ProposalIndex:
+    """Search index over the proposals of a vote matrix.
+
+    Parameters
+    ----------
+    proposal_ids : list of int
+        Proposal IDs, in vote matrix order.
+
+    titles : list of str
+        Proposal titles, in vote matrix order.
+
+    submitted_at : list of str
+        Submission timestamps, in vote matrix order. Proposals without a timestamp
+        never match a date range.
+
+    """
+
+    def __init__(self, proposal_ids: list, titles: list, submitted_at: list):
+        self.size = len(proposal_ids)
+        self.proposal_ids = np.asarray(proposal_ids, dtype=np.int64)
+
+        # Inverted index: sorted vocabulary, with the sorted positions of the proposals containing each token
+        postings = {}
+        for pos, title in enumerate(titles):
+            for token in set(tokenize(title)):
+                postings.setdefault(token, []).append(pos)
+        self.vocabulary = sorted(postings)
+        self.postings = [np.asarray(postings[token], dtype=np.int32) for token in self.vocabulary]
+
+        self._id_order = np.argsort(self.proposal_ids, kind='stable')
+        self._sorted_ids = self.proposal_ids[self._id_order]
+
+        timestamps = pd.to_datetime(pd.Series(submitted_at, dtype=object), utc=True, errors='coerce')
+        dated = np.flatnonzero(timestamps.notna().to_numpy())
+        timestamps_ns = timestamps.iloc[dated].astype('int64').to_numpy()
+        self._date_order = dated[np.argsort(timestamps_ns, kind='stable')]
+        self._sorted_dates = np.sort(timestamps_ns)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory footprint of the index arrays and vocabulary."""
+        return (sum(p.nbytes for p in self.postings) + sum(len(t) + 49 for t in self.vocabulary)
+                + self.proposal_ids.nbytes + self._id_order.nbytes + self._sorted_ids.nbytes
+                + self._date_order.nbytes + self._sorted_dates.nbytes)
+
+    def _token_positions(self, token: str) -> np.ndarray:
+        # All vocabulary entries starting with the token, i.e. prefix match
+        start = bisect_left(self.vocabulary, token)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(token):
+            end += 1
+
+        if end == start:
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate(self.postings[start:end]))
+
+    def _mask(self, positions: np.ndarray) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return mask
+
+    def match_title(self, query: str) -> np.ndarray:
+        """Returns a mask of the proposals whose title contains all query tokens, each as a word prefix.
+        The query can also be an exact proposal ID."""
+
+        tokens = tokenize(query)
+        if len(tokens) == 0:
+            return np.ones(self.size, dtype=bool)
+
+        positions = None
+        for token in sorted(tokens, key=len, reverse=True):
+            token_positions = self._token_positions(token)
+            positions = token_positions if positions is None else np.intersect1d(positions, token_positions, assume_unique=True)
+            if len(positions) == 0:
+                break
+
+        mask = self._mask(positions)
+        if len(tokens) == 1 and tokens[0].isdigit():
+            mask |= self.proposal_ids == int(tokens[0])
+
+        return mask
+
+    def match_id_range(self, min_id: int = None, max_id: int = None) -> np.ndarray:
+        """Returns a mask of the proposals with an ID within the (inclusive) range."""
+        start = 0 if min_id is None else np.searchsorted(self._sorted_ids, min_id, side='left')
+        end = self.size if max_id is None else np.searchsorted(self._sorted_ids, max_id, side='right')
+        return self._mask(self._id_order[start:end])
+
+    def match_date_range(self, start_date=None, end_date=None) -> np.ndarray:
+        """Returns a mask of the proposals submitted within the (inclusive) date range."""
+
+        start = 0
+        if start_date is not None:
+            start_ns = to_utc_timestamp(start_date).value
+            start = np.searchsorted(self._sorted_dates, start_ns, side='left')
+
+        end = len(self._sorted_dates)
+        if end_date is not None:
+            # Dates without a time include the whole day
+            end_ns = (to_utc_timestamp(end_date).normalize() + pd.Timedelta(days=1)).value
+            end = np.searchsorted(self._sorted_dates, end_ns, side='left')
+
+        return self._mask(self._date_order[start:end])
+
+    def search(self, query: str = '', id_range: tuple = None, date_range: tuple = None) -> np.ndarray:
+        """Returns a mask of the proposals matching all given criteria.
+
+        Parameters
+        ----------
+        query : str
+            Words (or word prefixes) that the title must contain, or a proposal ID.
+
+        id_range : tuple of int
+            Minimum and maximum proposal ID, inclusive. Either can be None.
+
+        date_range : tuple of date
+            First and last submission date, inclusive. Either can be None.
+
+        Returns
+        -------
+        mask : np.ndarray
+            A boolean array over the proposals, in vote matrix order.
+
+        """
+
+        mask = self.match_title(query)
+        if id_range is not None:
+            mask &= self.match_id_range(*id_range)
+        if date_range is not None and tuple(date_range) != (None, None):
+            mask &= self.match_date_range(*date_range)
+
+        return mask
+
+    def matching_ids(self, mask: np.ndarray) -> np.ndarray:
+        """Returns the IDs of the proposals selected by a mask."""
+        return self.proposal_ids[mask]
+
+    def date_bounds(self) -> tuple:
+        """Returns the first and last submission timestamps, or None if no proposal has one."""
+        if len(self._sorted_dates) == 0:
+            return None
+        return (pd.Timestamp(self._sorted_dates[0], tz='UTC'), pd.Timestamp(self._sorted_dates[-1], tz='UTC'))
+
+
+def build_proposal_index(vote_matrix: VoteMatrix) -> ProposalIndex:
+    """Builds the search index over the proposals of a vote matrix."""
+    return ProposalIndex(vote_matrix.proposal_ids, vote_matrix.proposal_titles, vote_matrix.proposal_submitted_at)
+
+
+def get_proposal_index(cache: LRUCache, vote_matrix: VoteMatrix) -> ProposalIndex:
+    """Returns the proposal search index, built once per data version.
+
+    Parameters
+    ----------
+    cache : LRUCache
+        The result cache. The vote matrix version is part of the cache key, so a data
+        refresh never returns a stale index.
+
+    vote_matrix : VoteMatrix
+        The encoded votes.
+
+    """
+
+    key = ('proposal_index', vote_matrix.version)
+    index = cache.get(key)
+
+    if index is None:
+        index = build_proposal_index(vote_matrix)
+        cache.put(key, index)
+
+    return index
+
+
+def filter_by_proposals(voting_history_df: pd.DataFrame, proposal_ids) -> pd.DataFrame:
+    """Keeps the rows of a voting history (indexed by proposal `id` and `title`) with the given proposal IDs."""
+    return voting_history_df[voting_history_df.index.get_level_values('id').isin(proposal_ids)]
@@ -0,0 +1,301 @@
+"""Vote matrix shared across worker processes through memory-mapped files.
+
+One process materializes the encoded vote matrix and its dictionaries into a
+versioned directory of a store (ideally on a RAM-backed filesystem such as
+`/dev/shm`), then atomically points the store's `CURRENT` file to it. Every
+other worker attaches to the current version read-only and zero-copy, so the
+operating system keeps a single copy of the data in memory for all of them.
+
+Layout of a store directory:
+
+    CURRENT                  <- name of the current version
+    LOCK                     <- pid of the process materializing the first version, while it runs
+    <version>/votes.npy
+    <version>/has_votes.npy
+    <version>/voting_power.npy
+    <version>/metadata.json
+
+"""
+
+
+import json
+import os
+import shutil
+import threading
+import time
+import numpy as np
+
+from src.utils.vote_matrix import VoteMatrix
+
+
+CURRENT_FILENAME = 'CURRENT'
+ARRAY_NAMES = ('votes', 'has_votes', 'voting_power')
+
+
+def get_current_version(store_dir: str):
+    """Returns the current version of a store, or None if nothing has been published yet."""
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILENAME), 'r') as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def publish_vote_matrix(vote_matrix: VoteMatrix, store_dir: str) -> str:
+    """Writes a vote matrix to the store and makes it the current version.
+
+    Parameters
+    ----------
+    vote_matrix : VoteMatrix
+        The vote matrix to publish. Its version names the version directory.
+
+    store_dir : str
+        The store directory.
+
+    Returns
+    -------
+    version : str
+
+    """
+
+    version = vote_matrix.version
+    version_dir = os.path.join(store_dir, version)
+    os.makedirs(store_dir, exist_ok=True)
+
+    if not os.path.isdir(version_dir):
+        # Write to a temporary directory first so that readers never see partial files
+        tmp_dir = f'{version_dir}.tmp-{os.getpid()}-{threading.get_ident()}'
+        os.makedirs(tmp_dir)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), getattr(vote_matrix, name))
+        with open(os.path.join(tmp_dir, 'metadata.json'), 'w') as file:
+            json.dump(vote_matrix.metadata, file)
+
+        try:
+            os.rename(tmp_dir, version_dir)
+        except OSError:
+            # Another process published the same version concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Swap the current version atomically
+    tmp_current = os.path.join(store_dir, f'{CURRENT_FILENAME}.tmp-{os.getpid()}-{threading.get_ident()}')
+    with open(tmp_current, 'w') as file:
+        file.write(version)
+    os.replace(tmp_current, os.path.join(store_dir, CURRENT_FILENAME))
+
+    return version
+
+
+def attach_vote_matrix(store_dir: str, version: str = None) -> VoteMatrix:
+    """Attaches to a published vote matrix, read-only and memory-mapped.
+
+    Parameters
+    ----------
+    store_dir : str
+        The store directory.
+
+    version : str
+        The version to attach to. Defaults to the current version.
+
+    Returns
+    -------
+    vote_matrix : VoteMatrix
+
+    """
+
+    version = version or get_current_version(store_dir)
+    assert version is not None, f'No vote matrix has been published to {store_dir}.'
+
+    version_dir = os.path.join(store_dir, version)
+    arrays = {name: np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+    with open(os.path.join(version_dir, 'metadata.json'), 'r') as file:
+        metadata = json.load(file)
+
+    return VoteMatrix(arrays['votes'], arrays['has_votes'], arrays['voting_power'], metadata)
+
+
+def prune_versions(store_dir: str, keep: int = 2):
+    """Deletes all but the most recent versions of a store, never deleting the current one.
+
+    Workers still attached to a deleted version keep reading their mapping until they
+    swap to the current version.
+
+    """
+
+    current = get_current_version(store_dir)
+    version_dirs = [d for d in os.listdir(store_dir)
+                    if os.path.isdir(os.path.join(store_dir, d)) and '.tmp-' not in d]
+    version_dirs = sorted(version_dirs, key=lambda d: os.path.getmtime(os.path.join(store_dir, d)), reverse=True)
+
+    for d in version_dirs[keep:]:
+        if d != current:
+            shutil.rmtree(os.path.join(store_dir, d), ignore_errors=True)
+
+
+def _acquire_lock(lock_file: str) -> bool:
+    """Creates the lock file with the pid of this process in it, atomically. Returns False if it exists."""
+
+    tmp_lock = f'{lock_file}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp_lock, 'w') as file:
+        file.write(str(os.getpid()))
+
+    try:
+        # Unlike creating the lock file and then writing to it, nobody ever sees a lock without an owner
+        os.link(tmp_lock, lock_file)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        os.remove(tmp_lock)
+
+
+def _lock_owner(lock_file: str):
+    """Returns the pid written into a lock file, or None if there is no (readable) lock."""
+    try:
+        with open(lock_file, 'r') as file:
+            return int(file.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, under another user
+        return True
+    return True
+
+
+def _break_lock(lock_file: str, owner: int):
+    """Removes the lock of a dead owner. Moving the lock aside first makes sure that a lock
+    taken in the meantime by a live process is restored rather than removed."""
+
+    stale_lock = f'{lock_file}.stale-{os.getpid()}-{threading.get_ident()}'
+    try:
+        os.rename(lock_file, stale_lock)
+    except FileNotFoundError:
+        return
+
+    try:
+        if _lock_owner(stale_lock) != owner:
+            os.link(stale_lock, lock_file)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(stale_lock)
+
+
+def materialize_once(store_dir: str, build, timeout: float = 600, poll_interval: float = 0.5) -> str:
+    """Builds and publishes the vote matrix in exactly one of several competing processes.
+
+    The first process to create the store's lock file calls `build()` and publishes the
+    result; the others wait until a version is current. The lock file holds the pid of
+    its owner: if the owner fails without publishing, a waiter takes the lock and builds
+    instead, and the lock of an owner that died without removing it is broken.
+
+    Parameters
+    ----------
+    store_dir : str
+        The store directory.
+
+    build : callable
+        Returns a new VoteMatrix, e.g. by downloading and encoding the datasets.
+
+    timeout : float
+        Maximum number of seconds to wait for another process to publish.
+
+    Returns
+    -------
+    version : str
+
+    """
+
+    os.makedirs(store_dir, exist_ok=True)
+    lock_file = os.path.join(store_dir, 'LOCK')
+    deadline = time.monotonic() + timeout
+
+    while True:
+        version = get_current_version(store_dir)
+        if version is not None:
+            return version
+
+        if _acquire_lock(lock_file):
+            try:
+                # The previous owner may have published just before releasing the lock
+                return get_current_version(store_dir) or publish_vote_matrix(build(), store_dir)
+            finally:
+                os.remove(lock_file)
+
+        owner = _lock_owner(lock_file)
+        if owner is not None and not _is_running(owner):
+            _break_lock(lock_file, owner)
+            continue
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'Timed out waiting for a vote matrix to be published to {store_dir}.')
+        time.sleep(poll_interval)
+
+
+class SharedVoteMatrix:
+    """A handle to the current vote matrix of a store that follows version swaps.
+
+    Parameters
+    ----------
+    store_dir : str
+        The store directory.
+
+    build : callable
+        Called (in one process only) to materialize the vote matrix if the store is empty.
+
+    check_interval : float
+        Minimum number of seconds between checks for a new current version.
+
+    """
+
+    def __init__(self, store_dir: str, build=None, check_interval: float = 5.0):
+        self.store_dir = store_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+
+        if get_current_version(store_dir) is None:
+            assert build is not None, f'No vote matrix has been published to {store_dir}.'
+            materialize_once(store_dir, build)
+
+        self._vote_matrix = attach_vote_matrix(store_dir)
+
+    def get(self) -> VoteMatrix:
+        """Returns the current vote matrix, re-attaching if a new version has been published."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                version = get_current_version(self.store_dir)
+                if version is not None and version != self._vote_matrix.version:
+                    self._vote_matrix = attach_vote_matrix(self.store_dir, version)
+            return self._vote_matrix
+
+
+if __name__ == '__main__':
+
+    # Refreshes a host's store of a chain from the bucket, e.g. on a schedule after each data refresh.
+    # Usage: python -m src.utils.shared_store [shared_data_dir] [chain]
+    import sys
+    from src.utils.data import get_datasets
+    from src.utils.vote_matrix import encode_vote_matrix
+    from src.utils.chains import DEFAULT_CHAIN
+
+    shared_data_dir = sys.argv[1] if len(sys.argv) > 1 else os.environ['SHARED_DATA_DIR']
+    chain = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CHAIN
+
+    # One store per chain, as attached by the app
+    store_dir = os.path.join(shared_data_dir, chain)
+
+    vote_matrix = encode_vote_matrix(*get_datasets(chain))
+    version = publish_vote_matrix(vote_matrix, store_dir)
+    prune_versions(store_dir)
+
+    print(f'Vote matrix {version} published to {store_dir}.')
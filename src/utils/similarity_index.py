@@ -0,0 +1,332 @@
+"""Nearest-neighbour search of validators by voting behaviour.
+
+Up to `EXACT_SCAN_MAX_VALIDATORS` validators, which covers every chain served today,
+the most similar validators are found by an exact scan of the agreement with all
+validators of the chain. Larger vote matrices, e.g. with the validators of past
+years, are searched with an approximate index instead.
+
+Every validator is represented by its set of votes, one token per (proposal,
+option). MinHash signatures estimate the Jaccard similarity of two vote sets, and
+locality-sensitive hashing over bands of the signatures finds the candidates of a
+query without comparing it against every validator. Candidates are then re-ranked
+by their exact agreement, the score of `create_similarity_matrix`.
+
+Recall is tuned with the number of bands and rows per band: a pair of validators
+with Jaccard similarity `s` becomes a candidate with probability
+`1 - (1 - s**rows)**bands`. More bands (or fewer rows) raise recall at the cost of
+more candidates per query.
+
+The index is updated incrementally: new votes are merged into a signature with an
+element-wise minimum, and a validator whose votes changed is re-indexed on its own.
+A new data version re-indexes only the validators whose votes differ from the
+previous version.
+
+"""
+
+
+import zlib
+import numpy as np
+
+from src.utils.cache import LRUCache
+from src.utils.vote_matrix import VoteMatrix
+from src.utils.chains import DEFAULT_CHAIN
+
+
+# Mersenne prime of the universal hash functions, small enough for int64 products
+HASH_PRIME = 2**31 - 1
+
+DEFAULT_BANDS = 64
+DEFAULT_ROWS = 3
+
+# Above this number of validators, candidates come from the index rather than from all validators
+EXACT_SCAN_MAX_VALIDATORS = 2000
+
+
+def vote_tokens(proposal_ids, options) -> np.ndarray:
+    """Encodes votes as integer tokens, distinct per proposal and vote option (as coded in `VOTE_CODES`)."""
+    tokens = (np.asarray(proposal_ids, dtype=np.int64) * 8 + np.asarray(options, dtype=np.int64)) * 1_000_003
+    return tokens % HASH_PRIME
+
+
+def mix_tokens(tokens: np.ndarray) -> np.ndarray:
+    """Scrambles tokens with the splitmix64 finalizer. Linear hash functions alone are biased
+    on arithmetic progressions, such as the tokens of consecutive proposal IDs."""
+
+    x = np.asarray(tokens).astype(np.uint64)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xbf58476d1ce4e5b9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94d049bb133111eb)
+    x ^= x >> np.uint64(31)
+
+    return (x % np.uint64(HASH_PRIME)).astype(np.int64)
+
+
+def candidate_probability(similarity: float, bands: int, rows: int) -> float:
+    """Returns the probability that a pair with the given Jaccard similarity is a candidate."""
+    return 1 - (1 - similarity**rows)**bands
+
+
+class MinHashLSH:
+    """MinHash signatures of token sets, with an LSH index over bands of the signatures.
+
+    Parameters
+    ----------
+    bands : int
+        Number of bands, i.e. hash tables. More bands increase recall.
+
+    rows : int
+        Number of signature values per band. More rows increase precision.
+
+    seed : int
+        Seed of the hash functions. Indexes can only be compared with the same seed.
+
+    """
+
+    def __init__(self, bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS, seed: int = 0):
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, HASH_PRIME, self.num_perm, dtype=np.int64)
+        self._b = rng.integers(0, HASH_PRIME, self.num_perm, dtype=np.int64)
+
+        self.signatures = {}
+        self._digests = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, key):
+        return key in self.signatures
+
+    @property
+    def nbytes(self) -> int:
+        """The memory footprint of the signatures and bucket entries (approximate)."""
+        return len(self.signatures) * (self.num_perm * 8 + self.bands * (self.rows * 8 + 100))
+
+    def minhash(self, tokens: np.ndarray) -> np.ndarray:
+        """Returns the MinHash signature of a set of tokens. An empty set has the maximum signature."""
+
+        tokens = np.unique(mix_tokens(tokens))
+        if len(tokens) == 0:
+            return np.full(self.num_perm, HASH_PRIME, dtype=np.int64)
+
+        return ((self._a[:,None] * tokens[None,:] + self._b[:,None]) % HASH_PRIME).min(axis=1)
+
+    def copy(self) -> 'MinHashLSH':
+        """Returns an independent copy of the index, e.g. to update it while the original is being queried."""
+        index = MinHashLSH.__new__(MinHashLSH)
+        index.__dict__.update(self.__dict__)
+        index.signatures = dict(self.signatures)
+        index._digests = dict(self._digests)
+        index._buckets = [{band_key: set(bucket) for band_key, bucket in band.items()} for band in self._buckets]
+        return index
+
+    def _band_keys(self, signature: np.ndarray) -> list:
+        return [signature[i*self.rows:(i+1)*self.rows].tobytes() for i in range(self.bands)]
+
+    def _unbucket(self, key):
+        for band, band_key in enumerate(self._band_keys(self.signatures[key])):
+            bucket = self._buckets[band].get(band_key)
+            bucket.discard(key)
+            if len(bucket) == 0:
+                del self._buckets[band][band_key]
+
+    def _set_signature(self, key, signature: np.ndarray):
+        if key in self.signatures:
+            if np.array_equal(self.signatures[key], signature):
+                return
+            self._unbucket(key)
+
+        self.signatures[key] = signature
+
+        # Validators without votes are kept out of the buckets, they are similar to nobody
+        if signature[0] < HASH_PRIME:
+            for band, band_key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def add(self, key, tokens: np.ndarray):
+        """Adds tokens to the set of a key. The signature of the union is the element-wise minimum,
+        so new votes are indexed without the previous ones."""
+        signature = self.minhash(tokens)
+        if key in self.signatures:
+            signature = np.minimum(self.signatures[key], signature)
+        self._set_signature(key, signature)
+        self._digests.pop(key, None)
+
+    def replace(self, key, tokens: np.ndarray):
+        """Replaces the set of a key, e.g. when votes were changed rather than added.
+        Does nothing if the set is unchanged."""
+
+        tokens = np.unique(np.asarray(tokens, dtype=np.int64))
+        digest = zlib.crc32(tokens.tobytes())
+        if key in self.signatures and self._digests.get(key) == digest:
+            return
+
+        self._set_signature(key, self.minhash(tokens))
+        self._digests[key] = digest
+
+    def remove(self, key):
+        """Removes a key from the index."""
+        if key in self.signatures:
+            self._unbucket(key)
+            del self.signatures[key]
+            self._digests.pop(key, None)
+
+    def candidates(self, key) -> set:
+        """Returns the keys sharing at least one band with a key, excluding itself."""
+
+        signature = self.signatures[key]
+        if signature[0] == HASH_PRIME:
+            return set()
+
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates |= self._buckets[band].get(band_key, set())
+        candidates.discard(key)
+
+        return candidates
+
+    def estimate_similarity(self, key, other_key) -> float:
+        """Estimates the Jaccard similarity of the sets of two keys."""
+        return float(np.mean(self.signatures[key] == self.signatures[other_key]))
+
+    def most_similar(self, key, k: int = 10) -> list:
+        """Returns up to `k` candidates of a key with their estimated Jaccard similarity, most similar first."""
+
+        candidates = sorted(self.candidates(key), key=str)
+        if len(candidates) == 0:
+            return []
+
+        matches = np.stack([self.signatures[c] for c in candidates]) == self.signatures[key]
+        estimates = matches.mean(axis=1)
+        top = np.argsort(-estimates, kind='stable')[:k]
+
+        return [(candidates[i], float(estimates[i])) for i in top]
+
+
+def index_vote_matrix(index: MinHashLSH, vote_matrix: VoteMatrix, addresses: list = None) -> MinHashLSH:
+    """(Re-)indexes the votes of validators of a vote matrix, keyed by address.
+
+    Parameters
+    ----------
+    index : MinHashLSH
+        The index of the chain's votes, to update.
+
+    vote_matrix : VoteMatrix
+        The encoded votes of the chain.
+
+    addresses : list of str
+        The validators to re-index, e.g. the ones of a new vote event segment.
+        Defaults to all validators, in which case validators that are no longer
+        in the vote matrix are removed. Validators with unchanged votes are
+        skipped either way.
+
+    """
+
+    if addresses is None:
+        addresses = vote_matrix.addresses
+        for key in [key for key in index.signatures if vote_matrix.position(key) is None]:
+            index.remove(key)
+
+    proposal_ids = np.asarray(vote_matrix.proposal_ids, dtype=np.int64)
+
+    for address in addresses:
+        pos = vote_matrix.position(address)
+        if pos is None:
+            index.remove(address)
+            continue
+
+        row = vote_matrix.votes[pos]
+        voted = np.flatnonzero(row)
+        index.replace(address, vote_tokens(proposal_ids[voted], row[voted]))
+
+    return index
+
+
+def agreement(vote_matrix: VoteMatrix, address: str, other_addresses: list) -> np.ndarray:
+    """Returns the exact share of all proposals where a validator and each other validator
+    voted the same option, in percent as in `create_similarity_matrix` with `ALL_PROPOSALS`."""
+
+    row = vote_matrix.votes[vote_matrix.position(address)]
+    others = vote_matrix.votes[[vote_matrix.position(a) for a in other_addresses]]
+    same = (others == row) & (row != 0)
+
+    return (same.mean(axis=1) * 100).round(2) if len(vote_matrix.proposal_ids) > 0 else np.zeros(len(other_addresses))
+
+
+def find_similar_validators(index: MinHashLSH, vote_matrix: VoteMatrix, address: str, k: int = 10) -> list:
+    """Returns the validators most similar to one, ranked by exact agreement.
+
+    Parameters
+    ----------
+    index : MinHashLSH
+        The index of the chain's votes, as returned by `get_similarity_index`. If None,
+        all validators with votes are candidates, otherwise the LSH candidates.
+
+    vote_matrix : VoteMatrix
+        The encoded votes of the chain.
+
+    address : str
+        The validator to find similar validators of.
+
+    k : int
+        The maximum number of validators to return.
+
+    Returns
+    -------
+    similar : list of dict
+        Up to `k` validators, with `address`, `name` and `similarity`, most similar first.
+
+    """
+
+    if index is not None:
+        candidates = [other for other in index.candidates(address) if vote_matrix.position(other) is not None]
+    else:
+        # Validators without votes are similar to nobody, as in the index
+        voted = (vote_matrix.votes != 0).any(axis=1)
+        candidates = [other for other, other_voted in zip(vote_matrix.addresses, voted) if other_voted and other != address] \
+                     if voted[vote_matrix.position(address)] else []
+
+    if len(candidates) == 0:
+        return []
+
+    similarities = agreement(vote_matrix, address, candidates)
+    top = sorted(range(len(candidates)), key=lambda i: (-similarities[i], candidates[i]))[:k]
+
+    return [{'address': candidates[i],
+             'name': vote_matrix.names[vote_matrix.position(candidates[i])],
+             'similarity': float(similarities[i])}
+            for i in top]
+
+
+def get_similarity_index(cache: LRUCache, vote_matrix: VoteMatrix, chain: str = DEFAULT_CHAIN,
+                         bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS) -> MinHashLSH:
+    """Returns the similarity index of a chain's votes, updated once per data version.
+
+    A new data version updates a copy of the previous version's index, so only the
+    validators whose votes changed are hashed again, and sessions still holding the
+    previous index are unaffected.
+
+    Returns None up to `EXACT_SCAN_MAX_VALIDATORS` validators, where scanning all of
+    them is exact and about as fast as querying the index.
+
+    """
+
+    if vote_matrix.shape[0] <= EXACT_SCAN_MAX_VALIDATORS:
+        return None
+
+    key = ('similarity_index', chain, bands, rows)
+    entry = cache.get(key)
+
+    if entry is not None and entry[0] == vote_matrix.version:
+        return entry[1]
+
+    index = entry[1].copy() if entry is not None else MinHashLSH(bands, rows)
+    index = index_vote_matrix(index, vote_matrix)
+    cache.put(key, (vote_matrix.version, index))
+
+    return index
@@ -0,0 +1,111 @@
+"""The data and figures of one app rerun, computed from the widget values of a session.
+
+Every rerun of the app calls `build_views` with the current selection, filters and
+search inputs, then only renders what it returns. The load-testing harness calls the
+same function, so that it measures the work of an actual rerun: the cached comparison,
+the proposal search, the formatted table, the scorecards, the similarity heatmap, the
+most similar validators and the leaderboard.
+
+"""
+
+
+import pandas as pd
+
+from src.utils.cache import LRUCache, compare_validators, get_display_labels
+from src.utils.charts import get_similarity_heatmap
+from src.utils.chains import DEFAULT_CHAIN
+from src.utils.data import format_voting_history, summarize_voting_history
+from src.utils.metrics import get_validator_metrics
+from src.utils.search import get_proposal_index, filter_by_proposals
+from src.utils.similarity_index import get_similarity_index, find_similar_validators
+from src.utils.vote_matrix import VoteMatrix
+
+
+LEADERBOARD_SORT_KEYS = ('outcome_alignment', 'majority_alignment', 'participation', 'voting_power')
+
+
+def build_leaderboard(metrics_df: pd.DataFrame, sort_by: str = 'outcome_alignment') -> pd.DataFrame:
+    """Returns the leaderboard table of the validator metrics, ranked by one of `LEADERBOARD_SORT_KEYS`."""
+
+    assert sort_by in LEADERBOARD_SORT_KEYS, f'Unknown leaderboard sort key: {sort_by}. Expected one of: {LEADERBOARD_SORT_KEYS}'
+
+    leaderboard_df = metrics_df.sort_values(sort_by, ascending=False, na_position='last')
+    leaderboard_df = pd.DataFrame({'Validator': leaderboard_df['name'],
+                                   'Voting Power': leaderboard_df['voting_power'].round(0),
+                                   'Votes': leaderboard_df['num_votes'],
+                                   'Participation (%)': (leaderboard_df['participation'] * 100).round(1),
+                                   'Outcome Alignment (%)': (leaderboard_df['outcome_alignment'] * 100).round(1),
+                                   'Majority Alignment (%)': (leaderboard_df['majority_alignment'] * 100).round(1)})
+    leaderboard_df.index = range(1, len(leaderboard_df) + 1)
+
+    return leaderboard_df
+
+
+def build_views(result_cache: LRUCache, vote_matrix: VoteMatrix, validator_selection: list, proposals_filter: str,
+                chain: str = DEFAULT_CHAIN, proposal_query: str = '', id_range: tuple = None, date_range: tuple = None,
+                reference: dict = None, leaderboard_sort: str = 'outcome_alignment') -> dict:
+    """Computes the tables and figures of one app rerun.
+
+    Parameters
+    ----------
+    result_cache : LRUCache
+        The cache shared by all sessions.
+
+    vote_matrix : VoteMatrix
+        The encoded votes of the chain.
+
+    validator_selection : list of dict
+        The selected validators.
+
+    proposals_filter : str
+        One of `AT_LEAST_1_VOTED`, `ALL_VOTED` or `ALL_PROPOSALS`.
+
+    chain : str
+        The chain of the vote matrix.
+
+    proposal_query, id_range, date_range
+        The proposal search inputs, as in `ProposalIndex.search`.
+
+    reference : dict
+        The validator to find the most similar validators of. Defaults to the first
+        selected validator, also if it is no longer selected.
+
+    leaderboard_sort : str
+        One of `LEADERBOARD_SORT_KEYS`.
+
+    Returns
+    -------
+    views : dict
+        `voting_history_df` (formatted, None without a selection), `summary` and
+        `similarity_figure` (plotly JSON, both None with fewer than 2 validators),
+        `similar_validators` (None without a selection) and `leaderboard_df`.
+
+    """
+
+    views = {'voting_history_df': None, 'summary': None, 'similarity_figure': None, 'similar_validators': None}
+
+    if len(validator_selection) >= 1:
+        filtered_voting_history_df, similarity_df = compare_validators(result_cache, vote_matrix, validator_selection, proposals_filter)
+
+        # Proposal search, applied to the cached table via the index of the current data version
+        proposal_index = get_proposal_index(result_cache, vote_matrix)
+        proposal_mask = proposal_index.search(proposal_query, id_range=id_range, date_range=date_range)
+        searched_voting_history_df = filter_by_proposals(filtered_voting_history_df, proposal_index.matching_ids(proposal_mask))
+
+        views['voting_history_df'] = format_voting_history(searched_voting_history_df, validator_selection,
+                                                           labels=get_display_labels(result_cache, vote_matrix))
+
+        if len(validator_selection) >= 2:
+            views['summary'] = summarize_voting_history(filtered_voting_history_df, validator_selection)
+            views['similarity_figure'] = get_similarity_heatmap(result_cache, vote_matrix.version, validator_selection,
+                                                                proposals_filter, similarity_df)
+
+        selected_addresses = [v['address'] for v in validator_selection]
+        if reference is None or reference['address'] not in selected_addresses:
+            reference = validator_selection[0]
+        views['similar_validators'] = find_similar_validators(get_similarity_index(result_cache, vote_matrix, chain), vote_matrix,
+                                                              reference['address'], k=10)
+
+    views['leaderboard_df'] = build_leaderboard(get_validator_metrics(result_cache, vote_matrix, chain), leaderboard_sort)
+
+    return views
@@ -0,0 +1,158 @@
+"""Append-only log of all governance vote events, including votes changed during a voting period.
+
+The log is a pandas DataFrame of integer-encoded columns (validator addresses as a
+categorical, vote options as int8 codes, block IDs and timestamps as int64), stored
+as Parquet segments. Each data refresh appends one segment of new events, and the
+current votes are derived from the previous votes plus the new segment only.
+
+"""
+
+
+import numpy as np
+import pandas as pd
+
+from src.utils.vote_matrix import VOTE_LABELS, VOTE_CODES
+
+
+def encode_vote_events(records: list) -> pd.DataFrame:
+    """Encodes extracted vote events into the columnar log format.
+
+    Parameters
+    ----------
+    records : list of dict
+        Vote events with `validator_address`, `proposal_id`, `vote`, `block_id`,
+        `tx_index` (the position of the transaction in its block), `block_timestamp`
+        and `tx_id`.
+
+    Returns
+    -------
+    events_df : pd.DataFrame
+        The encoded events, in execution order.
+
+    """
+
+    records_df = pd.DataFrame(records, columns=['validator_address','proposal_id','vote','block_id','tx_index','block_timestamp','tx_id'])
+
+    invalid_list = records_df.loc[~records_df['vote'].isin(list(VOTE_CODES)), 'vote'].drop_duplicates().tolist()
+    assert len(invalid_list) == 0, f'Unknown vote options found: {invalid_list}. Expected one of: {list(VOTE_CODES)}'
+
+    events_df = pd.DataFrame({'validator_address': records_df['validator_address'].astype('category'),
+                              'proposal_id': records_df['proposal_id'].astype(np.int32),
+                              'option': records_df['vote'].map(VOTE_CODES).astype(np.int8),
+                              'block_id': records_df['block_id'].astype(np.int64),
+                              'tx_index': records_df['tx_index'].astype(np.int32),
+                              'block_timestamp': pd.to_datetime(records_df['block_timestamp'], utc=True),
+                              'tx_id': records_df['tx_id'].astype(str)})
+
+    # Transaction IDs are hashes, the execution order within a block is the position of the transaction
+    return events_df.sort_values(['block_id','tx_index'], kind='stable').reset_index(drop=True)
+
+
+def concat_vote_events(segments: list) -> pd.DataFrame:
+    """Concatenates log segments into a single log, in execution order (a segment can hold
+    events of earlier blocks that were ingested late)."""
+
+    if len(segments) == 0:
+        return encode_vote_events([])
+
+    events_df = pd.concat(segments, ignore_index=True)
+    events_df['validator_address'] = events_df['validator_address'].astype('category')
+
+    return events_df.sort_values(['block_id','tx_index'], kind='stable').reset_index(drop=True)
+
+
+def write_vote_events(events_df: pd.DataFrame, filename: str):
+    """Writes a log segment as a Parquet file."""
+    events_df.to_parquet(filename, index=False)
+
+
+def read_vote_events(location: str) -> pd.DataFrame:
+    """Reads a log segment from an API or from a local file."""
+
+    events_df = pd.read_parquet(location)
+
+    # Segments written before the position of transactions was extracted
+    if 'tx_index' not in events_df.columns:
+        events_df.insert(events_df.columns.get_loc('block_id') + 1, 'tx_index', np.int32(0))
+
+    return events_df
+
+
+def decode_options(options) -> np.ndarray:
+    """Decodes vote option codes into vote labels."""
+    labels = np.array([np.nan if label is None else label for label in VOTE_LABELS], dtype=object)
+    return labels[np.asarray(options, dtype=np.int64)]
+
+
+def latest_votes(events_df: pd.DataFrame) -> list:
+    """Returns the current vote of every validator on every proposal, i.e. its last vote event.
+
+    Returns
+    -------
+    votes : list of dict
+        One record per vote, in the same format as `get_validator_votes`.
+
+    """
+
+    latest_df = events_df.drop_duplicates(['validator_address','proposal_id'], keep='last')
+
+    return [{'validator_address': address, 'proposal_id': int(pid), 'vote': vote}
+            for address, pid, vote in zip(latest_df['validator_address'].astype(str),
+                                          latest_df['proposal_id'],
+                                          decode_options(latest_df['option']))]
+
+
+def apply_vote_events(votes: list, events_df: pd.DataFrame) -> list:
+    """Derives the current votes from the previous votes and the events logged since.
+
+    Parameters
+    ----------
+    votes : list of dict
+        The previous votes, one record per vote.
+
+    events_df : pd.DataFrame
+        The vote events after the previous votes, e.g. the last log segment.
+
+    Returns
+    -------
+    votes : list of dict
+        The current votes, sorted by validator and proposal.
+
+    """
+
+    new_votes = latest_votes(events_df)
+    new_keys = {(v['validator_address'], v['proposal_id']) for v in new_votes}
+
+    votes = [{**v, 'proposal_id': int(v['proposal_id'])} for v in votes]
+    votes = [v for v in votes if (v['validator_address'], v['proposal_id']) not in new_keys] + new_votes
+
+    return sorted(votes, key=lambda x: (x['validator_address'], x['proposal_id']))
+
+
+def vote_flips(events_df: pd.DataFrame) -> pd.DataFrame:
+    """Lists the votes changed by validators during a voting period.
+
+    Parameters
+    ----------
+    events_df : pd.DataFrame
+        The vote event log.
+
+    Returns
+    -------
+    flips_df : pd.DataFrame
+        One row per changed vote, with the validator, proposal, previous and new vote,
+        and the block timestamp and transaction of the change.
+
+    """
+
+    previous_options = events_df.groupby(['validator_address','proposal_id'], observed=True)['option'].shift()
+    flipped = previous_options.notnull() & (previous_options != events_df['option'])
+
+    flips_df = pd.DataFrame({'validator_address': events_df.loc[flipped, 'validator_address'].astype(str),
+                             'proposal_id': events_df.loc[flipped, 'proposal_id'],
+                             'from_vote': decode_options(previous_options[flipped]),
+                             'to_vote': decode_options(events_df.loc[flipped, 'option']),
+                             'block_timestamp': events_df.loc[flipped, 'block_timestamp'],
+                             'tx_id': events_df.loc[flipped, 'tx_id']})
+
+    return flips_df.reset_index(drop=True)
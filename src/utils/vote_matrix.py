@@ -0,0 +1,172 @@
+"""Integer-encoded vote matrix of all validators across all governance proposals"""
+
+
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+
+# Vote options are encoded as small integers, with 0 for "has not voted"
+VOTE_LABELS = (None, 'YES', 'NO', 'NO WITH VETO', 'ABSTAIN')
+VOTE_CODES = {label: code for code, label in enumerate(VOTE_LABELS) if label is not None}
+NO_VOTE = 0
+
+
+class VoteMatrix:
+    """A validator x proposal matrix of encoded votes, plus the dictionaries to decode it.
+
+    Parameters
+    ----------
+    votes : np.ndarray
+        An int8 array of shape (n_validators, n_proposals) of encoded votes.
+
+    has_votes : np.ndarray
+        A boolean array flagging validators that have voting data.
+
+    voting_power : np.ndarray
+        A float64 array of the voting power of each validator.
+
+    metadata : dict
+        Validator addresses and names, proposal IDs, titles and submission timestamps, in matrix order.
+
+    """
+
+    def __init__(self, votes: np.ndarray, has_votes: np.ndarray, voting_power: np.ndarray, metadata: dict):
+        self.votes = votes
+        self.has_votes = has_votes
+        self.voting_power = voting_power
+        self.metadata = metadata
+        self.addresses = metadata['addresses']
+        self.names = metadata['names']
+        self.proposal_ids = metadata['proposal_ids']
+        self.proposal_titles = metadata['proposal_titles']
+        self.proposal_submitted_at = metadata.get('proposal_submitted_at', [None] * len(self.proposal_ids))
+        self.version = metadata['version']
+        self._positions = {address: idx for idx, address in enumerate(self.addresses)}
+
+    @property
+    def shape(self) -> tuple:
+        return self.votes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.votes.nbytes + self.has_votes.nbytes + self.voting_power.nbytes
+
+    @property
+    def validators(self) -> list:
+        """The list of validators, in the same format as `get_validators`."""
+        return [{'address': address, 'name': name, 'voting_power': float(vp)}
+                for address, name, vp in zip(self.addresses, self.names, self.voting_power)]
+
+    @property
+    def proposals_df(self) -> pd.DataFrame:
+        """The table of governance proposals (IDs and titles)."""
+        return pd.DataFrame({'id': self.proposal_ids, 'title': self.proposal_titles})
+
+    def validator_positions(self, validator_selection: list) -> np.ndarray:
+        """Returns the matrix rows of the selected validators."""
+        return np.array([self._positions[x['address']] for x in validator_selection], dtype=np.int64)
+
+    def position(self, address: str) -> int:
+        """Returns the matrix row of a validator, or None if it is not in the matrix."""
+        return self._positions.get(address)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Decodes an array of vote codes into vote labels (NaN for no vote)."""
+        labels = np.array([np.nan if label is None else label for label in VOTE_LABELS], dtype=object)
+        return labels[codes]
+
+    def compile_voting_history(self, validator_selection: list) -> pd.DataFrame:
+        """Prepares a table of votes per governance proposal for all selected validators.
+
+        Equivalent to `src.utils.data.compile_voting_history`, but reads the encoded
+        matrix instead of merging and pivoting the table of all votes.
+
+        Parameters
+        ----------
+        validator_selection : list of dict
+            The list of validators selected in-app for comparison.
+
+        Returns
+        -------
+        voting_history_df : pd.DataFrame
+            A side-by-side table of votes for all selected validators across all
+            governance proposals.
+
+        """
+
+        positions = self.validator_positions(validator_selection)
+        selected_names = [self.names[pos] for pos in positions]
+
+        # Validators with voting data come first (sorted by name), then the ones without
+        voted = sorted({name for name, pos in zip(selected_names, positions) if self.has_votes[pos]})
+        missing = [name for name, pos in zip(selected_names, positions) if not self.has_votes[pos]]
+
+        name_positions = dict(zip(selected_names, positions))
+        columns = {name: self.decode(self.votes[name_positions[name]]) for name in voted}
+        columns.update({name: np.full(len(self.proposal_ids), np.nan) for name in missing})
+
+        index = pd.MultiIndex.from_arrays([self.proposal_ids, self.proposal_titles], names=['id','title'])
+        voting_history_df = pd.DataFrame(columns, index=index)
+
+        return voting_history_df
+
+
+def encode_vote_matrix(validators: list, proposals: list, votes: list) -> VoteMatrix:
+    """Encodes the raw datasets into a vote matrix.
+
+    Parameters
+    ----------
+    validators : list of dict
+        Validators, as returned by `get_validators`. Defines the row order.
+
+    proposals : list of dict
+        Governance proposals, as returned by `get_proposals`, optionally with `submitted_at`.
+        Defines the column order.
+
+    votes : list of dict
+        Votes per validator per proposal, as returned by `get_validator_votes`.
+
+    Returns
+    -------
+    vote_matrix : VoteMatrix
+
+    """
+
+    addresses = [v['address'] for v in validators]
+    proposal_ids = [int(p['id']) for p in proposals]
+    proposal_titles = [p['title'] for p in proposals]
+
+    validators_index = pd.Index(addresses)
+    proposals_index = pd.Index(proposal_ids)
+
+    votes_df = pd.DataFrame(votes, columns=['validator_address','proposal_id','vote'])
+    rows = validators_index.get_indexer(votes_df['validator_address'])
+    cols = proposals_index.get_indexer(votes_df['proposal_id'])
+    codes = votes_df['vote'].map(VOTE_CODES).fillna(NO_VOTE).to_numpy(dtype=np.int8)
+
+    # Votes of unknown validators or on unknown proposals are dropped
+    known = (rows >= 0) & (cols >= 0)
+
+    matrix = np.zeros((len(addresses), len(proposal_ids)), dtype=np.int8)
+    matrix[rows[known], cols[known]] = codes[known]
+
+    has_votes = np.zeros(len(addresses), dtype=bool)
+    has_votes[rows[rows >= 0]] = True
+
+    voting_power = np.array([v.get('voting_power', 0.0) for v in validators], dtype=np.float64)
+
+    metadata = {'addresses': addresses,
+                'names': [v['name'] for v in validators],
+                'proposal_ids': proposal_ids,
+                'proposal_titles': proposal_titles,
+                'proposal_submitted_at': [p.get('submitted_at') for p in proposals]}
+
+    h = hashlib.sha1()
+    h.update(matrix.tobytes())
+    h.update(voting_power.tobytes())
+    h.update(json.dumps(metadata).encode('utf-8'))
+    metadata['version'] = h.hexdigest()[:12]
+
+    return VoteMatrix(matrix, has_votes, voting_power, metadata)
@@ -0,0 +1,218 @@
+"""Process-wide data stores, a warm-up phase that fills them, and readiness reporting.
+
+The vote matrices and the result cache live at module level, so they are shared
+by every script run of the Streamlit server and by the warm-up thread started
+before it (see `src.serve`). The warm-up fetches the datasets of every served
+chain concurrently, encodes them and builds the derived structures of the
+interactive path, so the first visitor of a new process does not wait for them.
+Readiness is reported over HTTP for orchestrators: not ready until warm, and not
+healthy once the warm-up has given up.
+
+"""
+
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.data import get_manifest, get_dataset_keys
+from src.utils.data import get_validators, get_proposals, get_validator_votes
+from src.utils.cache import LRUCache, get_display_labels
+from src.utils.chain_store import ChainStore
+from src.utils.chains import parse_chains
+from src.utils.metrics import get_validator_metrics
+from src.utils.search import get_proposal_index
+from src.utils.similarity_index import get_similarity_index
+from src.utils.shared_store import SharedVoteMatrix
+from src.utils.vote_matrix import VoteMatrix, encode_vote_matrix
+
+
+_lock = threading.Lock()
+_stores = {}
+_status = {'state': 'cold', 'chains': {}, 'started_at': None, 'ready_at': None, 'error': None, 'failed_attempts': 0}
+
+# Attempts to warm a chain, e.g. while the bucket is unreachable, waiting 5, 10, 20, ... seconds in between
+WARM_UP_ATTEMPTS = 5
+WARM_UP_BACKOFF_SECONDS = 5
+
+
+def served_chains() -> list:
+    """Returns the chains served by this deployment, from the `CHAINS` environment variable (default chain if unset or empty)."""
+    return parse_chains(os.environ.get('CHAINS'))
+
+
+def fetch_datasets(dataset_keys: dict) -> tuple:
+    """Downloads the validators, proposals and votes datasets concurrently.
+
+    Parameters
+    ----------
+    dataset_keys : dict
+        The object key of each dataset, as returned by `get_dataset_keys`.
+
+    Returns
+    -------
+    validators, proposals, votes : list of dict
+
+    """
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        validators = executor.submit(get_validators, dataset_keys['validators'])
+        proposals = executor.submit(get_proposals, dataset_keys['proposals'], fields=('id','title','submitted_at'))
+        votes = executor.submit(get_validator_votes, dataset_keys['votes'])
+
+        return validators.result(), proposals.result(), votes.result()
+
+
+def build_vote_matrix(chain: str, dataset_keys: dict) -> VoteMatrix:
+    """Fetches the datasets of a chain and encodes them. Raw datasets are only held while encoding,
+    the vote matrix in the chain store is all that remains of them."""
+    return encode_vote_matrix(*fetch_datasets(dataset_keys))
+
+
+def _get_store(name: str, create):
+    with _lock:
+        if name not in _stores:
+            _stores[name] = create()
+        return _stores[name]
+
+
+def get_chain_store() -> ChainStore:
+    """Returns the process-wide vote matrices of all chains, bounded by `CHAIN_STORE_MB` (default 512)."""
+    return _get_store('chain_store', lambda: ChainStore(load=build_vote_matrix,
+                                                          max_bytes=int(os.environ.get('CHAIN_STORE_MB', 512)) * 2**20))
+
+
+def get_result_cache() -> LRUCache:
+    """Returns the process-wide result cache, bounded by `RESULT_CACHE_MB` (default 256)."""
+    return _get_store('result_cache', lambda: LRUCache(max_bytes=int(os.environ.get('RESULT_CACHE_MB', 256)) * 2**20))
+
+
+def get_shared_vote_matrix(store_dir: str, chain: str) -> SharedVoteMatrix:
+    """Returns the process-wide handle to a chain's shared vote matrix store, materializing it if empty."""
+    build = lambda: build_vote_matrix(chain, get_dataset_keys(get_manifest(chain), chain))
+    return _get_store(('shared_vote_matrix', store_dir), lambda: SharedVoteMatrix(store_dir, build=build))
+
+
+def get_vote_matrix(chain: str, dataset_keys: dict = None) -> VoteMatrix:
+    """Returns the current vote matrix of a chain, from the shared store if `SHARED_DATA_DIR` is set."""
+
+    if os.environ.get('SHARED_DATA_DIR'):
+        return get_shared_vote_matrix(os.path.join(os.environ['SHARED_DATA_DIR'], chain), chain).get()
+
+    dataset_keys = dataset_keys if dataset_keys is not None else get_dataset_keys(get_manifest(chain), chain)
+    return get_chain_store().get(chain, dataset_keys)
+
+
+def warm_chain(chain: str) -> dict:
+    """Loads the vote matrix of a chain and builds the per-version structures of the interactive path.
+
+    Returns
+    -------
+    timing : dict
+        The data version and the seconds spent loading and building.
+
+    """
+
+    start = time.perf_counter()
+    vote_matrix = get_vote_matrix(chain)
+    loaded = time.perf_counter()
+
+    result_cache = get_result_cache()
+    get_display_labels(result_cache, vote_matrix)
+    get_proposal_index(result_cache, vote_matrix)
+    get_validator_metrics(result_cache, vote_matrix, chain)
+    get_similarity_index(result_cache, vote_matrix, chain)
+
+    return {'version': vote_matrix.version,
+            'load_seconds': round(loaded - start, 3),
+            'build_seconds': round(time.perf_counter() - loaded, 3)}
+
+
+def warm_chain_with_retries(chain: str, attempts: int = WARM_UP_ATTEMPTS, backoff_seconds: float = WARM_UP_BACKOFF_SECONDS) -> dict:
+    """Warms a chain, retrying with exponential backoff. The error of the last attempt is raised."""
+
+    for attempt in range(attempts):
+        try:
+            return warm_chain(chain)
+        except Exception as e:
+            with _lock:
+                _status.update({'error': repr(e), 'failed_attempts': _status['failed_attempts'] + 1})
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_seconds * 2**attempt)
+
+
+def warm_up(chains: list = None, attempts: int = WARM_UP_ATTEMPTS, backoff_seconds: float = WARM_UP_BACKOFF_SECONDS) -> dict:
+    """Warms all served chains concurrently and marks the process ready once all are warm.
+
+    Each chain is retried with exponential backoff, the process staying not ready
+    in the meantime. Once a chain has failed all its attempts, the state is `failed`
+    with the error in the status, and `/health` answers 503 so that a liveness probe
+    can restart the process. Nothing restarts it otherwise: the app keeps serving,
+    loading the datasets on the first visit.
+
+    """
+
+    chains = chains if chains is not None else served_chains()
+
+    with _lock:
+        _status.update({'state': 'warming', 'started_at': time.time(), 'error': None, 'failed_attempts': 0})
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(chains)) as executor:
+            timings = dict(zip(chains, executor.map(partial(warm_chain_with_retries, attempts=attempts, backoff_seconds=backoff_seconds), chains)))
+    except Exception as e:
+        with _lock:
+            _status.update({'state': 'failed', 'error': repr(e)})
+        raise
+
+    with _lock:
+        _status.update({'state': 'ready', 'chains': timings, 'ready_at': time.time()})
+
+    return readiness()
+
+
+def readiness() -> dict:
+    """Returns the warm-up status of the process. It is ready once `state` is `ready`."""
+    with _lock:
+        return {**_status, 'ready': _status['state'] == 'ready', 'chains': dict(_status['chains'])}
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    """Serves `/ready` (200 once warm, 503 before) and `/health` (200 while the process is up, 503 once the warm-up failed)."""
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+
+        if path == '/ready':
+            status = readiness()
+            code = 200 if status['ready'] else 503
+        elif path == '/health':
+            failed = readiness()['state'] == 'failed'
+            status, code = {'alive': True, 'warm_up_failed': failed}, 503 if failed else 200
+        else:
+            status, code = {'error': 'Not found'}, 404
+
+        body = json.dumps(status).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Probes every few seconds would flood the server logs
+        pass
+
+
+def start_readiness_server(port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serves the readiness endpoints on a daemon thread."""
+
+    server = ThreadingHTTPServer((host, port), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
@@ -0,0 +1,100 @@
+"""Benchmark of voting history formatting, with and without precomputed display labels.
+
+Formatting runs on every rerun of every session. Without labels, it builds the
+proposal labels, sorts the proposals and pads the validator names with string
+operations each time; with labels built once per data version, it orders and
+labels the rows by index lookups.
+
+Usage
+-----
+
+    python -m tests.benchmarks.bench_format_voting_history --proposals 1000 5000 --selection 5 50
+
+"""
+
+
+import argparse
+import random
+import statistics
+import string
+import time
+
+from src.utils.data import build_display_labels, format_voting_history, filter_voting_history
+from src.utils.vote_matrix import encode_vote_matrix, VOTE_LABELS
+
+
+def generate_vote_matrix(n_validators: int, n_proposals: int, participation: float = 0.6, seed: int = 0):
+    """Encodes a synthetic vote matrix with random titles and votes."""
+
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(500)]
+
+    validators = [{'address': f'osmovaloper1{i:038d}', 'name': f'Validator with a long name {i:04d}', 'voting_power': rng.random()}
+                  for i in range(n_validators)]
+    proposals = [{'id': i, 'title': ' '.join(rng.choices(words, k=rng.randint(3, 12)))} for i in range(1, n_proposals+1)]
+    votes = [{'validator_address': v['address'], 'proposal_id': p['id'], 'vote': rng.choice(VOTE_LABELS[1:])}
+             for v in validators for p in proposals if rng.random() < participation]
+
+    return validators, encode_vote_matrix(validators, proposals, votes)
+
+
+def time_calls(func, repeat: int) -> float:
+    """Returns the median duration of a call in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def run(n_proposals_list: list, selection_sizes: list, n_validators: int = 150, repeat: int = 20) -> list:
+    """Times `format_voting_history` with and without labels, for each dataset size and selection size.
+
+    Returns
+    -------
+    results : list of dict
+        One record per dataset size and selection size, with durations in milliseconds.
+
+    """
+
+    results = []
+
+    for n_proposals in n_proposals_list:
+        validators, vote_matrix = generate_vote_matrix(n_validators, n_proposals)
+
+        start = time.perf_counter()
+        labels = build_display_labels(vote_matrix.proposal_ids, vote_matrix.proposal_titles, vote_matrix.names)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        for selection_size in selection_sizes:
+            selection = validators[:selection_size]
+            voting_history_df = filter_voting_history(vote_matrix.compile_voting_history(selection), 'AT_LEAST_1_VOTED')
+
+            # Both paths must produce the same table
+            assert format_voting_history(voting_history_df, selection).equals(format_voting_history(voting_history_df, selection, labels))
+
+            results.append({'proposals': n_proposals,
+                            'selection': selection_size,
+                            'formatting_ms': time_calls(lambda: format_voting_history(voting_history_df, selection), repeat),
+                            'labels_ms': time_calls(lambda: format_voting_history(voting_history_df, selection, labels), repeat),
+                            'build_labels_ms': build_ms})
+
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark voting history formatting with and without precomputed labels.')
+    parser.add_argument('--proposals', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--selection', type=int, nargs='+', default=[5, 50])
+    parser.add_argument('--validators', type=int, default=150)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.proposals, args.selection, args.validators, args.repeat)
+
+    print(f"{'proposals':>10} {'selection':>10} {'formatting (ms)':>16} {'labels (ms)':>12} {'speedup':>8} {'build once (ms)':>16}")
+    for r in results:
+        print(f"{r['proposals']:>10} {r['selection']:>10} {r['formatting_ms']:>16.2f} {r['labels_ms']:>12.2f} "
+              f"{r['formatting_ms'] / r['labels_ms']:>7.1f}x {r['build_labels_ms']:>16.2f}")
@@ -0,0 +1,128 @@
+"""Benchmark of the approximate similarity index against exact all-pairs agreement.
+
+Validators are generated in voting blocs: each follows its bloc's position on most
+proposals and votes at random otherwise. For a sample of query validators, the
+top-k of the index (LSH candidates re-ranked by exact agreement) is compared with
+the exact top-k over all validators.
+
+Reported per (bands, rows) setting: recall@k, candidates per query as a share of
+all validators, query latency (p50/p95) and build time. Exact top-k ties count as
+hits, so recall is the share of returned validators at least as similar as the
+exact k-th one.
+
+Usage
+-----
+
+    python -m tests.benchmarks.bench_similarity_index --validators 5000 --proposals 1000 --settings 32x4 64x3 64x2
+
+"""
+
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from src.utils.similarity_index import MinHashLSH, index_vote_matrix, find_similar_validators
+from src.utils.vote_matrix import encode_vote_matrix, VOTE_LABELS
+
+
+def generate_vote_matrix(n_validators: int, n_proposals: int, n_blocs: int = 20, loyalty: float = 0.85, seed: int = 0):
+    """Encodes a synthetic vote matrix of validators voting in blocs, with varying participation."""
+
+    rng = np.random.default_rng(seed)
+    bloc_positions = rng.integers(1, 5, (n_blocs, n_proposals))
+    blocs = rng.integers(0, n_blocs, n_validators)
+    participation = rng.uniform(0.3, 1.0, n_validators)
+
+    validators = [{'address': f'osmovaloper1{i:038d}', 'name': f'Validator {i:05d}', 'voting_power': 1.0} for i in range(n_validators)]
+    proposals = [{'id': i, 'title': f'Proposal {i}'} for i in range(1, n_proposals+1)]
+
+    votes = []
+    for i, v in enumerate(validators):
+        voted = np.flatnonzero(rng.random(n_proposals) < participation[i])
+        options = np.where(rng.random(len(voted)) < loyalty, bloc_positions[blocs[i], voted], rng.integers(1, 5, len(voted)))
+        votes += [{'validator_address': v['address'], 'proposal_id': int(p)+1, 'vote': VOTE_LABELS[o]} for p, o in zip(voted, options)]
+
+    return encode_vote_matrix(validators, proposals, votes)
+
+
+def exact_agreement(vote_matrix, positions: np.ndarray) -> np.ndarray:
+    """Agreement of the query validators with all validators, one matrix product per vote option."""
+    votes = vote_matrix.votes
+    matches = np.zeros((len(positions), votes.shape[0]))
+    for option in range(1, 5):
+        voted_option = (votes == option).astype(np.float32)
+        matches += voted_option[positions] @ voted_option.T
+    return (matches / votes.shape[1] * 100).round(2)
+
+
+def run(vote_matrix, settings: list, k: int = 10, n_queries: int = 200, seed: int = 0) -> list:
+    """Measures recall@k and latency of the index for each (bands, rows) setting.
+
+    Returns
+    -------
+    results : list of dict
+        One record per setting.
+
+    """
+
+    rng = np.random.default_rng(seed)
+    n_validators = vote_matrix.shape[0]
+    positions = rng.choice(n_validators, min(n_queries, n_validators), replace=False)
+
+    start = time.perf_counter()
+    exact = exact_agreement(vote_matrix, positions)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(positions)
+
+    results = []
+    for bands, rows in settings:
+        start = time.perf_counter()
+        index = index_vote_matrix(MinHashLSH(bands, rows), vote_matrix)
+        build_s = time.perf_counter() - start
+
+        recalls, latencies, num_candidates = [], [], []
+        for q, pos in enumerate(positions):
+            address = vote_matrix.addresses[pos]
+
+            start = time.perf_counter()
+            similar = find_similar_validators(index, vote_matrix, address, k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            scores = np.delete(exact[q], pos)
+            kth_score = np.sort(scores)[::-1][k-1]
+            recalls.append(sum(s['similarity'] >= kth_score for s in similar) / k)
+            num_candidates.append(len(index.candidates(address)))
+
+        results.append({'bands': bands,
+                        'rows': rows,
+                        'recall': statistics.mean(recalls),
+                        'candidates': statistics.mean(num_candidates) / n_validators,
+                        'p50_ms': float(np.percentile(latencies, 50)),
+                        'p95_ms': float(np.percentile(latencies, 95)),
+                        'build_s': build_s,
+                        'exact_ms': exact_ms})
+
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the approximate similarity index against exact agreement.')
+    parser.add_argument('--validators', type=int, default=5000)
+    parser.add_argument('--proposals', type=int, default=1000)
+    parser.add_argument('--settings', nargs='+', default=['32x4', '64x3', '64x2'], help='Bands x rows settings, e.g. 32x4')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    vote_matrix = generate_vote_matrix(args.validators, args.proposals)
+    settings = [tuple(int(x) for x in s.split('x')) for s in args.settings]
+    results = run(vote_matrix, settings, args.k, args.queries)
+
+    print(f"{args.validators} validators, {args.proposals} proposals, exact query (one row vs. all): {results[0]['exact_ms']:.2f} ms")
+    print(f"{'bands':>6} {'rows':>5} {'recall@' + str(args.k):>10} {'candidates':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'build (s)':>10}")
+    for r in results:
+        print(f"{r['bands']:>6} {r['rows']:>5} {r['recall']:>10.3f} {r['candidates']:>10.1%} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['build_s']:>10.2f}")
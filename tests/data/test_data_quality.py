@@ -1,18 +1,6 @@
-import pytest
-from src.utils.data import get_validators, get_proposals, get_validator_votes
+from src.etl.validation import validate_datasets
 
-
-@pytest.fixture
-def validators():
-    return get_validators()
-
-@pytest.fixture
-def proposals():
-    return get_proposals()
-
-@pytest.fixture
-def votes():
-    return get_validator_votes()
+# Datasets are loaded once per session (see tests/fixtures/datasets.py)
 
 
 # Validators
@@ -58,3 +46,10 @@ def test__get_validator_votes__vote__is_valid(votes):
     VALID_VOTES = ('YES','NO', 'NO WITH VETO','ABSTAIN')
     invalid_list = [v for v in votes if v['vote'] not in VALID_VOTES]
     assert len(invalid_list) == 0, f'Invalid votes found, e.g. {invalid_list[:3]}.'
+
+
+
+# All rules at once
+def test__validate_datasets__no_failures(validators, proposals, votes):
+    failures = validate_datasets(validators, proposals, votes)
+    assert len(failures) == 0, f'Data quality checks failed: {failures}'
@@ -0,0 +1,31 @@
+"""Published datasets, downloaded once per test session and shared by the data quality and integration suites.
+
+This module only defines the fixtures: the suites that need them import them into their
+conftest, so that unit and load test runs never touch the network. Each importing conftest
+registers its own fixtures, hence the downloads themselves are cached here.
+
+"""
+
+from functools import lru_cache
+
+import pytest
+from src.utils.data import get_validators, get_proposals, get_validator_votes
+
+
+@lru_cache(maxsize=None)
+def load_dataset(name: str) -> list:
+    """Downloads a published dataset, once per process."""
+    return {'validators': get_validators, 'proposals': get_proposals, 'votes': get_validator_votes}[name]()
+
+
+@pytest.fixture(scope='session')
+def validators():
+    return load_dataset('validators')
+
+@pytest.fixture(scope='session')
+def proposals():
+    return load_dataset('proposals')
+
+@pytest.fixture(scope='session')
+def votes():
+    return load_dataset('votes')
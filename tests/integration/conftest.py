@@ -0,0 +1,3 @@
+"""Session-scoped published datasets, see tests/fixtures/datasets.py."""
+
+from tests.fixtures.datasets import validators, proposals, votes
@@ -1,20 +1,6 @@
 """Checks if data extraction functions are able to extract data."""
 
-import pytest
-from src.utils.data import get_validators, get_proposals, get_validator_votes
-
-
-@pytest.fixture
-def validators():
-    return get_validators()
-
-@pytest.fixture
-def proposals():
-    return get_proposals()
-
-@pytest.fixture
-def votes():
-    return get_validator_votes()
+# Datasets are loaded once per session (see tests/fixtures/datasets.py)
 
 
 # Validators
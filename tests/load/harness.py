@@ -0,0 +1,303 @@
+"""Concurrent-session load-testing harness for the Streamlit app.
+
+Streamlit executes every rerun of every browser session as a script run on a
+thread inside the single server process. This harness reproduces that model:
+N simulated sessions run on N threads of one process, each performing a
+realistic sequence of multiselect / filter / search interactions, and each
+interaction calls `build_views`, the function that computes all tables and
+figures of an app rerun, through a result cache shared by all sessions as in
+the app. The datasets are served from a local stand-in (gzip json files in the
+published layout) so that runs are reproducible and do not touch the production
+bucket.
+
+The reported rerun latency is therefore the in-process compute latency of a rerun
+(`compute_p50_ms`, ...): the rendering by Streamlit, the websocket round trip and
+the delta messages to the browser are not included.
+
+With `--app-url`, every session also requests the static page of a running app
+(`static_page_p95_ms`), which does not include script reruns.
+
+Usage
+-----
+Generate a local dataset, start the app against it, then run the harness:
+
+    python -m tests.load.harness generate --data-dir load_data
+    DATA_URL=load_data streamlit run app.py &
+    python -m tests.load.harness run --data-dir load_data --sessions 1 2 4 8 16 \\
+        --app-url http://localhost:8501 --app-pid <PID>
+
+"""
+
+
+import argparse
+import gzip
+import json
+import os
+import random
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from src.utils import data
+from src.utils.data import PROPOSAL_FILTERS
+from src.utils.cache import LRUCache
+from src.utils.views import build_views, LEADERBOARD_SORT_KEYS
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+VOTE_OPTIONS = ('YES', 'NO', 'NO WITH VETO', 'ABSTAIN')
+VOTE_WEIGHTS = (0.75, 0.08, 0.02, 0.15)
+
+
+def generate_local_datasets(data_dir, n_validators=350, n_proposals=650, participation=0.6, seed=0):
+    """Writes a synthetic dataset in the published bucket layout.
+
+    Parameters
+    ----------
+    data_dir : str
+        The local directory that stands in for the bucket root.
+
+    n_validators : int
+        Number of validators to generate.
+
+    n_proposals : int
+        Number of governance proposals to generate.
+
+    participation : float
+        Average share of proposals each validator has voted on.
+
+    seed : int
+        Random seed.
+
+    Returns
+    -------
+    None
+
+    """
+
+    rng = random.Random(seed)
+    extracted_at = datetime.now(timezone.utc).isoformat()
+    alphabet = string.ascii_lowercase + string.digits
+
+    validators = [{'address': 'osmovaloper1' + ''.join(rng.choices(alphabet, k=38)),
+                   'name': f'Validator {i:04d}',
+                   'voting_power': float(10_000_000 / (i + 1))}
+                  for i in range(n_validators)]
+
+    first_submitted_at = datetime(2021, 6, 18, tzinfo=timezone.utc).timestamp()
+    proposals = [{'id': i, 'title': f'Proposal {i}: ' + ' '.join(rng.choices(['Upgrade', 'Incentives', 'Pool', 'Fee', 'Community', 'Spend', 'Parameter', 'Change'], k=4)),
+                  'submitted_at': datetime.fromtimestamp(first_submitted_at + i * 86400, timezone.utc).isoformat(),
+                  '_extracted_at': extracted_at}
+                 for i in range(1, n_proposals + 1)]
+
+    votes = []
+    for val in validators:
+        # Validator participation varies around the average
+        rate = min(1.0, max(0.0, rng.gauss(participation, 0.2)))
+        val_votes = {str(p['id']): rng.choices(VOTE_OPTIONS, weights=VOTE_WEIGHTS)[0]
+                     for p in proposals if rng.random() < rate}
+        if len(val_votes) > 0:
+            votes.append({'validator_address': val['address'], 'votes': val_votes, '_extracted_at': extracted_at})
+
+    os.makedirs(os.path.join(data_dir, 'data'), exist_ok=True)
+    for name, records in (('validators', validators), ('proposals', proposals), ('votes', votes)):
+        with gzip.open(os.path.join(data_dir, 'data', f'{name}.json.gz'), 'wt') as file:
+            json.dump(records, file)
+
+
+def load_local_datasets(data_dir):
+    """Loads the datasets through the app's data loaders, pointed at a local directory, and encodes them."""
+
+    data_url, data.DATA_URL = data.DATA_URL, data_dir
+    try:
+        validators = data.get_validators()
+        proposals = data.get_proposals(fields=('id','title','submitted_at'))
+        votes = data.get_validator_votes()
+    finally:
+        data.DATA_URL = data_url
+
+    vote_matrix = encode_vote_matrix(validators, proposals, votes)
+
+    return vote_matrix.validators, vote_matrix
+
+
+def rerun(result_cache, vote_matrix, validator_selection, proposals_filter, **inputs):
+    """Executes the data and figure work of a single app rerun, as the app does, via `build_views`."""
+    return build_views(result_cache, vote_matrix, validator_selection, proposals_filter, **inputs)
+
+
+def simulate_session(validators, vote_matrix, result_cache, n_steps, seed, think_time=0.0, max_selected=12):
+    """Simulates one user session and returns the latency (in seconds) of each rerun.
+
+    Validators are picked with a popularity bias towards the top of the list (the
+    multiselect is ordered by voting power), occasionally removed, and the proposals
+    filter, the proposal search and the leaderboard ranking are changed from time to time.
+
+    """
+
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(validators))]
+    words = sorted({word for title in vote_matrix.proposal_titles for word in str(title).split()})
+    selection = []
+    proposals_filter = PROPOSAL_FILTERS[0]
+    inputs = {'proposal_query': '', 'leaderboard_sort': LEADERBOARD_SORT_KEYS[0]}
+    latencies = []
+
+    for step in range(n_steps):
+        action = rng.random()
+
+        if step == 0:
+            pass  # Initial page load
+        elif action < 0.5 and len(selection) < max_selected:
+            choice = rng.choices(validators, weights=weights)[0]
+            if choice not in selection:
+                selection = selection + [choice]
+        elif action < 0.65 and len(selection) > 0:
+            removed = rng.choice(selection)
+            selection = [v for v in selection if v is not removed]
+        elif action < 0.8:
+            proposals_filter = rng.choice(PROPOSAL_FILTERS)
+        elif action < 0.95:
+            # Search by a title word, or clear the search
+            inputs['proposal_query'] = rng.choice(words) if len(words) > 0 and rng.random() < 0.7 else ''
+        else:
+            inputs['leaderboard_sort'] = rng.choice(LEADERBOARD_SORT_KEYS)
+
+        start = time.perf_counter()
+        rerun(result_cache, vote_matrix, selection, proposals_filter, **inputs)
+        latencies.append(time.perf_counter() - start)
+
+        if think_time > 0:
+            time.sleep(rng.expovariate(1 / think_time))
+
+    return latencies
+
+
+def get_process_memory(pid='self'):
+    """Returns the resident set size of a process in MB (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def probe_app(app_url):
+    """Returns the latency (in seconds) of a request for the static page of a running app.
+
+    This is the HTML shell and script bundle only: Streamlit runs the script over a
+    websocket once the page is loaded, so app reruns are not part of this latency.
+    Its growth under load shows how busy the server is with the simulated sessions.
+
+    """
+    start = time.perf_counter()
+    response = requests.get(app_url, timeout=30)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def run_load_level(validators, vote_matrix, result_cache, n_sessions, n_steps, think_time=0.0, app_url=None, app_pid=None, seed=0):
+    """Runs N concurrent sessions and summarizes the in-process compute latency and throughput of reruns, and memory.
+
+    Returns
+    -------
+    report : dict
+
+    """
+
+    probe_latencies = []
+    lock = threading.Lock()
+
+    def session(idx):
+        if app_url is not None:
+            latency = probe_app(app_url)
+            with lock:
+                probe_latencies.append(latency)
+        return simulate_session(validators, vote_matrix, result_cache, n_steps, seed=seed + idx, think_time=think_time)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+        results = list(executor.map(session, range(n_sessions)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([x for r in results for x in r]) * 1000
+
+    report = {'sessions': n_sessions,
+              'reruns': len(latencies),
+              'compute_p50_ms': float(np.percentile(latencies, 50)),
+              'compute_p95_ms': float(np.percentile(latencies, 95)),
+              'compute_p99_ms': float(np.percentile(latencies, 99)),
+              'compute_throughput_rps': len(latencies) / elapsed,
+              'harness_rss_mb': get_process_memory(),
+              'cache_hit_rate': result_cache.stats()['hit_rate']}
+
+    if app_url is not None:
+        report['static_page_p95_ms'] = float(np.percentile(np.array(probe_latencies) * 1000, 95))
+
+    if app_pid is not None:
+        report['app_rss_mb'] = get_process_memory(app_pid)
+
+    return report
+
+
+def run_load_test(data_dir, session_levels=(1, 2, 4, 8, 16), n_steps=20, think_time=0.0, app_url=None, app_pid=None,
+                  result_cache_mb=256):
+    """Runs the load test at increasing levels of concurrency, with one result cache shared by all sessions as in the app."""
+
+    validators, vote_matrix = load_local_datasets(data_dir)
+    result_cache = LRUCache(max_bytes=result_cache_mb * 2**20)
+
+    reports = [run_load_level(validators, vote_matrix, result_cache, n, n_steps, think_time, app_url, app_pid)
+               for n in session_levels]
+
+    return reports
+
+
+def format_report(reports):
+    """Formats load test reports as a text table."""
+    return pd.DataFrame(reports).set_index('sessions').round(1).to_string()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Generate a local dataset stand-in.')
+    generate_parser.add_argument('--data-dir', default='load_data')
+    generate_parser.add_argument('--validators', type=int, default=350)
+    generate_parser.add_argument('--proposals', type=int, default=650)
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    run_parser = subparsers.add_parser('run', help='Run the load test.')
+    run_parser.add_argument('--data-dir', default='load_data')
+    run_parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    run_parser.add_argument('--steps', type=int, default=20, help='Reruns per session.')
+    run_parser.add_argument('--think-time', type=float, default=0.0, help='Mean seconds between interactions.')
+    run_parser.add_argument('--app-url', default=None, help='URL of a locally running app, to probe its static page latency.')
+    run_parser.add_argument('--app-pid', default=None, help='PID of the app server, to report its memory.')
+    run_parser.add_argument('--result-cache-mb', type=int, default=256, help='Size of the result cache shared by all sessions (RESULT_CACHE_MB of the app).')
+    run_parser.add_argument('--output', default=None, help='Optional path of a json report.')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        generate_local_datasets(args.data_dir, args.validators, args.proposals, seed=args.seed)
+        print(f'Local datasets written to {args.data_dir}/data')
+
+    elif args.command == 'run':
+        reports = run_load_test(args.data_dir, args.sessions, args.steps, args.think_time, args.app_url, args.app_pid,
+                                args.result_cache_mb)
+        print(format_report(reports))
+
+        if args.output is not None:
+            with open(args.output, 'w') as file:
+                json.dump(reports, file, indent=2)
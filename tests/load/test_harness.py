@@ -0,0 +1,25 @@
+"""Smoke tests for the load-testing harness (small scale, no running app required)."""
+
+import pytest
+from tests.load.harness import generate_local_datasets, run_load_test
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    generate_local_datasets(str(tmp_path), n_validators=30, n_proposals=40)
+    return str(tmp_path)
+
+@pytest.fixture
+def reports(data_dir):
+    return run_load_test(data_dir, session_levels=(1, 3), n_steps=4)
+
+
+def test__load_test__one_report_per_level(reports):
+    assert [r['sessions'] for r in reports] == [1, 3]
+
+def test__load_test__rerun_count(reports):
+    assert [r['reruns'] for r in reports] == [4, 12]
+
+def test__load_test__ordered_percentiles(reports):
+    invalid_list = [r for r in reports if not r['compute_p50_ms'] <= r['compute_p95_ms'] <= r['compute_p99_ms']]
+    assert len(invalid_list) == 0
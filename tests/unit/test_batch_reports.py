@@ -0,0 +1,67 @@
+import os
+import json
+import pytest
+import pandas as pd
+from src.utils.vote_matrix import encode_vote_matrix
+from src.reports.batch_reports import read_groups_file
+from src.reports.batch_reports import run_batch_reports
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators):
+    proposals = pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+    votes = pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def groups_file(tmp_path, validators):
+    config = {'filters': ['AT_LEAST_1_VOTED', 'ALL_VOTED'],
+              'groups': [{'name': 'Top 5', 'validators': [v['name'] for v in validators[:5]]},
+                         {'name': 'By address', 'validators': [v['address'] for v in validators[5:8]], 'filters': ['ALL_PROPOSALS']}]}
+    file_path = str(tmp_path / 'groups.json')
+    with open(file_path, 'w') as file:
+        json.dump(config, file)
+    return file_path
+
+@pytest.fixture
+def reports(groups_file):
+    return read_groups_file(groups_file)
+
+@pytest.fixture
+def summary_df(reports, vote_matrix, tmp_path):
+    return run_batch_reports(reports, vote_matrix, str(tmp_path / 'out'), formats=('csv','parquet','html'), workers=2, verbose=False)
+
+
+def test__read_groups_file__one_report_per_group_and_filter(reports):
+    assert [(r['group'], r['filter']) for r in reports] == [('Top 5','AT_LEAST_1_VOTED'), ('Top 5','ALL_VOTED'), ('By address','ALL_PROPOSALS')]
+
+@pytest.mark.parametrize('names', [['Top 10', 'top-10'], ['Top 10', 'Top 10'], ['!!!']])
+def test__read_groups_file__colliding_output_directories(tmp_path, validators, names):
+    config = {'groups': [{'name': name, 'validators': [validators[0]['name']]} for name in names]}
+    file_path = str(tmp_path / 'groups.json')
+    with open(file_path, 'w') as file:
+        json.dump(config, file)
+
+    with pytest.raises(AssertionError):
+        read_groups_file(file_path)
+
+def test__batch_reports__summary_row_count(summary_df, reports):
+    assert summary_df.shape[0] == len(reports)
+
+def test__batch_reports__output_files(summary_df):
+    FILENAMES = ('voting_history.csv', 'similarity.csv', 'voting_history.parquet', 'similarity.parquet', 'report.html')
+    invalid_list = [d for d in summary_df['output_dir'] if not all(os.path.exists(os.path.join(d, f)) for f in FILENAMES)]
+    assert len(invalid_list) == 0
+
+def test__batch_reports__similarity_shape(summary_df):
+    row = summary_df.loc[summary_df['group'] == 'Top 5'].iloc[0]
+    similarity_df = pd.read_parquet(os.path.join(row['output_dir'], 'similarity.parquet'))
+    assert similarity_df.shape == (5, 5)
+
+def test__batch_reports__unknown_validator(vote_matrix, tmp_path):
+    with pytest.raises(AssertionError):
+        run_batch_reports([{'group': 'x', 'validators': ['not a validator'], 'filter': 'ALL_VOTED'}], vote_matrix, str(tmp_path), verbose=False)
@@ -0,0 +1,90 @@
+import pytest
+import pandas as pd
+from src.utils.data import prepare_complete_votes_df
+from src.utils.data import compile_voting_history
+from src.utils.data import filter_voting_history
+from src.utils.data import create_similarity_matrix
+from src.utils.cache import LRUCache
+from src.utils.cache import compare_validators
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def complete_votes_df(validators, proposals, votes):
+    return prepare_complete_votes_df(validators, proposals, votes)
+
+@pytest.fixture
+def proposals_df(proposals):
+    return pd.DataFrame(proposals)
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def validator_selection(validators):
+    return [validators[3], validators[0], validators[4], validators[1]]
+
+@pytest.fixture
+def cache():
+    return LRUCache(max_bytes=2**24)
+
+
+def test__lru_cache__evicts_least_recently_used():
+    cache = LRUCache(max_bytes=300, sizeof=lambda x: 100)
+    for key in 'abc': cache.put(key, key)
+    cache.get('a')
+    cache.put('d', 'd')
+    assert 'a' in cache and 'b' not in cache and len(cache) == 3
+
+def test__lru_cache__skips_oversized_values():
+    cache = LRUCache(max_bytes=100, sizeof=lambda x: 1000)
+    cache.put('a', 'a')
+    assert len(cache) == 0
+
+def test__lru_cache__hit_rate():
+    cache = LRUCache(max_bytes=1000)
+    cache.put('a', 1)
+    cache.get('a'); cache.get('a'); cache.get('b'); cache.get('a')
+    assert cache.stats()['hit_rate'] == 0.75
+
+def test__compare_validators__matches_uncached(cache, vote_matrix, complete_votes_df, proposals_df, validator_selection):
+    voting_history_df = compile_voting_history(complete_votes_df, proposals_df, validator_selection)
+    filtered_df = filter_voting_history(voting_history_df, 'AT_LEAST_1_VOTED')
+    expected_df = create_similarity_matrix(validator_selection, filtered_df)
+    _, similarity_df = compare_validators(cache, vote_matrix, validator_selection, 'AT_LEAST_1_VOTED')
+    pd.testing.assert_frame_equal(similarity_df, expected_df, check_names=False)
+
+def test__compare_validators__history_matches_uncached(cache, vote_matrix, complete_votes_df, proposals_df, validator_selection):
+    voting_history_df = compile_voting_history(complete_votes_df, proposals_df, validator_selection)
+    expected_df = filter_voting_history(voting_history_df, 'ALL_VOTED')
+    filtered_df, _ = compare_validators(cache, vote_matrix, validator_selection, 'ALL_VOTED')
+    pd.testing.assert_frame_equal(filtered_df, expected_df.loc[:, filtered_df.columns], check_names=False)
+
+def test__compare_validators__order_independent_key(cache, vote_matrix, validator_selection):
+    compare_validators(cache, vote_matrix, validator_selection, 'ALL_PROPOSALS')
+    _, similarity_df = compare_validators(cache, vote_matrix, validator_selection[::-1], 'ALL_PROPOSALS')
+    assert cache.stats()['hits'] == 1
+    assert similarity_df.index.tolist() == [x['name'] for x in validator_selection[::-1]]
+
+def test__compare_validators__keyed_by_data_version(cache, vote_matrix, validators, proposals, votes, validator_selection):
+    updated_vote_matrix = encode_vote_matrix(validators, proposals, votes[1:])
+    compare_validators(cache, vote_matrix, validator_selection, 'ALL_PROPOSALS')
+    compare_validators(cache, updated_vote_matrix, validator_selection, 'ALL_PROPOSALS')
+    assert cache.stats()['hits'] == 0
+
+def test__compare_validators__single_validator(cache, vote_matrix, validator_selection):
+    _, similarity_df = compare_validators(cache, vote_matrix, validator_selection[:1], 'ALL_PROPOSALS')
+    assert similarity_df is None
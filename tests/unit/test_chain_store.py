@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+import pandas as pd
+from src.utils.chain_store import ChainStore
+from src.utils.chain_store import vote_matrix_size
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def vote_matrix():
+    validators = pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+    proposals = pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+    votes = pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def loads(vote_matrix):
+    # Records every load of a chain's datasets
+    loaded = []
+    def load(chain, dataset_keys):
+        loaded.append((chain, dataset_keys['votes']))
+        return vote_matrix
+    load.loaded = loaded
+    return load
+
+def dataset_keys(chain, version='v1'):
+    return {name: f'chains/{chain}/data/{name}-{version}.json.gz' for name in ('validators', 'proposals', 'votes')}
+
+
+def test__chain_store__loads_lazily_once(loads, vote_matrix):
+    store = ChainStore(load=loads, max_bytes=10 * vote_matrix_size(vote_matrix))
+    assert loads.loaded == []
+    store.get('osmosis', dataset_keys('osmosis'))
+    store.get('osmosis', dataset_keys('osmosis'))
+    assert len(loads.loaded) == 1
+
+def test__chain_store__memory_budget(loads, vote_matrix):
+    store = ChainStore(load=loads, max_bytes=int(2.5 * vote_matrix_size(vote_matrix)))
+    for chain in ['chain1', 'chain2', 'chain3', 'chain4']:
+        store.get(chain, dataset_keys(chain))
+    assert store.chains() == ['chain3', 'chain4'] and store.stats()['bytes'] <= store.stats()['max_bytes']
+
+def test__chain_store__lru_eviction(loads, vote_matrix):
+    store = ChainStore(load=loads, max_bytes=int(2.5 * vote_matrix_size(vote_matrix)))
+    store.get('chain1', dataset_keys('chain1'))
+    store.get('chain2', dataset_keys('chain2'))
+    store.get('chain1', dataset_keys('chain1'))
+    store.get('chain3', dataset_keys('chain3'))
+    assert store.chains() == ['chain1', 'chain3']
+
+def test__chain_store__new_version_replaces_previous(loads, vote_matrix):
+    store = ChainStore(load=loads, max_bytes=10 * vote_matrix_size(vote_matrix))
+    store.get('osmosis', dataset_keys('osmosis', 'v1'))
+    store.get('osmosis', dataset_keys('osmosis', 'v2'))
+    assert store.stats()['entries'] == 1 and len(loads.loaded) == 2
+
+def test__chain_store__other_datasets_keep_version(loads, vote_matrix):
+    store = ChainStore(load=loads, max_bytes=10 * vote_matrix_size(vote_matrix))
+    store.get('osmosis', {**dataset_keys('osmosis'), 'voting_power': 'voting_power-v1.json.gz'})
+    store.get('osmosis', {**dataset_keys('osmosis'), 'voting_power': 'voting_power-v2.json.gz'})
+    assert len(loads.loaded) == 1
+
+def test__chain_store__concurrent_first_requests(vote_matrix):
+    loaded = []
+    def slow_load(chain, dataset_keys):
+        loaded.append(chain)
+        time.sleep(0.05)
+        return vote_matrix
+    store = ChainStore(load=slow_load, max_bytes=10 * vote_matrix_size(vote_matrix))
+    threads = [threading.Thread(target=store.get, args=('osmosis', dataset_keys('osmosis'))) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert loaded == ['osmosis']
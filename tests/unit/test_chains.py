@@ -0,0 +1,42 @@
+import glob
+import pytest
+from src.utils.chains import CHAINS
+from src.utils.chains import get_chain
+from src.utils.chains import chain_object_key
+from src.utils.chains import render_sql
+from src.utils.chains import parse_chains
+
+
+def test__get_chain__unknown():
+    with pytest.raises(AssertionError):
+        get_chain('unknown-chain')
+
+@pytest.mark.parametrize('value', [None, '', ' ', ','])
+def test__parse_chains__default_if_empty(value):
+    assert parse_chains(value) == ['osmosis']
+
+def test__parse_chains__list():
+    assert parse_chains('osmosis, cosmoshub,') == ['osmosis', 'cosmoshub']
+
+def test__chain_object_key__default_chain_unchanged():
+    assert chain_object_key('osmosis', 'data/manifest.json') == 'data/manifest.json'
+
+def test__chain_object_key__other_chain():
+    assert chain_object_key('cosmoshub', 'data/snapshots/votes-0123.json.gz') == 'chains/cosmoshub/data/snapshots/votes-0123.json.gz'
+
+def test__chain_object_key__distinct_prefixes():
+    prefixes = [c['data_prefix'] for c in CHAINS.values()]
+    assert len(prefixes) == len(set(prefixes))
+
+@pytest.mark.parametrize('sql_file', sorted(glob.glob('src/sql/*.sql')))
+@pytest.mark.parametrize('chain', sorted(CHAINS))
+def test__render_sql__all_placeholders_filled(sql_file, chain):
+    with open(sql_file, 'r') as file:
+        stmt = render_sql(file.read(), chain, from_block_id=0)
+    assert '{' not in stmt and f"{get_chain(chain)['schema']}.core." in stmt
+
+def test__render_sql__osmosis_exclusions_only_on_osmosis():
+    with open('src/sql/proposals.sql', 'r') as file:
+        sql_template = file.read()
+    assert "'osmosis' != 'osmosis'" in render_sql(sql_template, 'osmosis')
+    assert "'cosmoshub' != 'osmosis'" in render_sql(sql_template, 'cosmoshub')
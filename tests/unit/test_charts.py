@@ -0,0 +1,105 @@
+import pytest
+import json
+import numpy as np
+import pandas as pd
+from src.utils.cache import LRUCache
+from src.utils.charts import heatmap_mode
+from src.utils.charts import downsample
+from src.utils.charts import colorize
+from src.utils.charts import build_similarity_heatmap
+from src.utils.charts import get_similarity_heatmap
+from src.utils.charts import ANNOTATION_LIMIT, RASTER_LIMIT, RASTER_MAX_PIXELS
+from src.utils.data import create_similarity_matrix
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+
+def random_similarity_matrix(n: int) -> pd.DataFrame:
+    names = [f'Validator {i}' for i in range(n)]
+    similarity = np.random.default_rng(0).uniform(0, 100, (n, n)).round(2)
+    similarity[np.triu_indices(n, k=1)] = np.nan
+    return pd.DataFrame(similarity, index=names, columns=names)
+
+
+def test__heatmap_mode__thresholds():
+    assert heatmap_mode(2) == 'annotated'
+    assert heatmap_mode(ANNOTATION_LIMIT) == 'annotated'
+    assert heatmap_mode(ANNOTATION_LIMIT + 1) == 'heatmap'
+    assert heatmap_mode(RASTER_LIMIT + 1) == 'raster'
+
+
+def test__downsample__block_means_ignore_nans():
+    values = np.array([[1.0, np.nan, 3.0],
+                       [3.0, 5.0, np.nan],
+                       [np.nan, np.nan, np.nan]])
+
+    assert downsample(values, 3) is values
+    np.testing.assert_array_equal(downsample(values, 2), [[3.0, 3.0], [np.nan, np.nan]])
+
+
+def test__colorize__transparent_nans():
+    pixels = colorize(np.array([[0.0, np.nan], [50.0, 100.0]]))
+
+    assert pixels.shape == (2, 2, 4) and pixels.dtype == np.uint8
+    assert pixels[0,1,3] == 0 and (pixels[[0,1,1],[0,0,1],3] == 255).all()
+    # Greens goes from light to dark
+    assert pixels[0,0,:3].sum() > pixels[1,0,:3].sum() > pixels[1,1,:3].sum()
+
+
+def test__build_similarity_heatmap__annotated(vote_matrix, validators):
+    voting_history_df = vote_matrix.compile_voting_history(validators[:5])
+    fig = build_similarity_heatmap(create_similarity_matrix(validators[:5], voting_history_df))
+
+    assert fig.data[0].texttemplate is not None
+    assert list(fig.data[0].x) == [x['name'] for x in validators[:5]]
+
+
+def test__build_similarity_heatmap__hover_without_annotations():
+    fig = build_similarity_heatmap(random_similarity_matrix(ANNOTATION_LIMIT + 10))
+
+    assert fig.data[0].type == 'heatmap'
+    assert fig.data[0].texttemplate is None
+    assert '%{z' in fig.data[0].hovertemplate
+
+
+def test__build_similarity_heatmap__raster_payload_bounded():
+    large_json = build_similarity_heatmap(random_similarity_matrix(3 * RASTER_MAX_PIXELS)).to_json()
+
+    fig = json.loads(large_json)
+    assert fig['data'][0]['type'] == 'image'
+    assert fig['data'][0]['source'].startswith('data:image/png;base64,')
+    assert fig['data'][0]['dx'] == 3
+
+    # At most the base64 of the uncompressed RGBA pixel budget, whatever the selection size
+    assert len(large_json) < 4 * RASTER_MAX_PIXELS**2 * 4 // 3
+
+
+def test__get_similarity_heatmap__cached_per_selection_order(vote_matrix, validators):
+    cache = LRUCache(max_bytes=2**20)
+    selection = validators[:3]
+    similarity_df = create_similarity_matrix(selection, vote_matrix.compile_voting_history(selection))
+
+    fig_json = get_similarity_heatmap(cache, vote_matrix.version, selection, 'ALL_PROPOSALS', similarity_df)
+    assert get_similarity_heatmap(cache, vote_matrix.version, selection, 'ALL_PROPOSALS', None) == fig_json
+    assert cache.stats()['hits'] == 1
+
+    # The axes follow the selection order, so a permutation is another figure
+    reversed_df = similarity_df.iloc[::-1, ::-1]
+    get_similarity_heatmap(cache, vote_matrix.version, selection[::-1], 'ALL_PROPOSALS', reversed_df)
+    assert len(cache) == 2
@@ -2,7 +2,9 @@ import pytest
 import pandas as pd
 from src.utils.data import prepare_complete_votes_df
 from src.utils.data import compile_voting_history
+from src.utils.data import filter_voting_history
 from src.utils.data import format_voting_history
+from src.utils.data import build_display_labels
 from src.utils.data import create_similarity_matrix
 
 
@@ -117,6 +119,19 @@ def test__voting_history__is_valid_votes(voting_history_df, valid_votes):
         vote_labels += list(voting_history_df.iloc[:,idx].value_counts().to_dict().keys())
 
     assert set(vote_labels).issubset(set(valid_votes))
+
+
+
+def test__filtered_voting_history__all_proposals(voting_history_df):
+    assert filter_voting_history(voting_history_df, 'ALL_PROPOSALS').shape == voting_history_df.shape
+
+def test__filtered_voting_history__at_least_1_voted(voting_history_df):
+    filtered_df = filter_voting_history(voting_history_df, 'AT_LEAST_1_VOTED')
+    assert filtered_df.notnull().any(axis=1).all()
+
+def test__filtered_voting_history__all_voted(voting_history_df):
+    filtered_df = filter_voting_history(voting_history_df, 'ALL_VOTED')
+    assert filtered_df.notnull().all(axis=1).all()
         
         
 def test__formatted_voting_history__row_count(proposals, formatted_voting_history_df):
@@ -149,6 +164,21 @@ def test__formatted_voting_history__is_valid_votes(formatted_voting_history_df,
 
     assert set(vote_labels).issubset(set(valid_votes+['-']))
 
+def test__formatted_voting_history__labels_match_formatting(proposals, validators, voting_history_df, validator_selection):
+    labels = build_display_labels([p['id'] for p in proposals], [p['title'] for p in proposals], [v['name'] for v in validators])
+
+    for proposals_filter in ['ALL_PROPOSALS', 'AT_LEAST_1_VOTED']:
+        filtered_df = filter_voting_history(voting_history_df, proposals_filter)
+        expected_df = format_voting_history(filtered_df, validator_selection)
+        pd.testing.assert_frame_equal(format_voting_history(filtered_df, validator_selection, labels), expected_df)
+
+def test__formatted_voting_history__labels_follow_selection_order(proposals, validators, voting_history_df, validator_selection):
+    labels = build_display_labels([p['id'] for p in proposals], [p['title'] for p in proposals], [v['name'] for v in validators])
+    selection = validator_selection[::-1]
+
+    pd.testing.assert_frame_equal(format_voting_history(voting_history_df.iloc[::-1], selection, labels),
+                                  format_voting_history(voting_history_df, selection))
+
     
 def test__similarity__row_count(similarity_df, validator_selection):
     assert similarity_df.shape[0] == len(validator_selection)
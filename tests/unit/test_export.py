@@ -0,0 +1,110 @@
+import io
+import os
+import pytest
+import numpy as np
+import pandas as pd
+from src.utils.data import filter_voting_history
+from src.utils.data import create_similarity_matrix
+from src.utils.vote_matrix import encode_vote_matrix
+from src.utils.export import export_chunks
+from src.utils.export import export_stream
+from src.utils.export import write_stream
+from src.utils.export import open_export
+from src.utils.export import prepare_export
+from src.utils.export import export_key
+from src.utils.export import ExportTooLargeError
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, votes):
+    proposals = pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def validator_selection(validators):
+    return validators[:6]
+
+
+def read_export(chunks, export_format):
+    file = io.BytesIO()
+    write_stream(export_stream(chunks, export_format), file)
+    file.seek(0)
+    return pd.read_csv(file) if export_format == 'csv' else pd.read_parquet(file)
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'parquet'])
+def test__export__raw_votes_row_count(vote_matrix, votes, export_format):
+    exported_df = read_export(export_chunks(vote_matrix, 'raw_votes', chunk_size=7), export_format)
+    assert exported_df.shape[0] == len(votes)
+
+@pytest.mark.parametrize('export_format', ['csv', 'parquet'])
+def test__export__full_voting_history_shape(vote_matrix, export_format):
+    exported_df = read_export(export_chunks(vote_matrix, 'voting_history', chunk_size=7), export_format)
+    assert exported_df.shape == (vote_matrix.shape[1], vote_matrix.shape[0] + 2)
+
+@pytest.mark.parametrize('proposals_filter', ['AT_LEAST_1_VOTED', 'ALL_VOTED', 'ALL_PROPOSALS'])
+def test__export__voting_history_matches_table(vote_matrix, validator_selection, proposals_filter):
+    expected_df = filter_voting_history(vote_matrix.compile_voting_history(validator_selection), proposals_filter)
+    expected_df = expected_df.loc[:, [x['name'] for x in validator_selection]]
+    exported_df = pd.concat(export_chunks(vote_matrix, 'voting_history', validator_selection, proposals_filter, chunk_size=7))
+    pd.testing.assert_frame_equal(exported_df.set_index(['id','title']), expected_df, check_dtype=False, check_index_type=False)
+
+@pytest.mark.parametrize('proposals_filter', ['AT_LEAST_1_VOTED', 'ALL_PROPOSALS'])
+def test__export__similarity_matches_matrix(vote_matrix, validator_selection, proposals_filter):
+    voting_history_df = filter_voting_history(vote_matrix.compile_voting_history(validator_selection), proposals_filter)
+    expected_df = create_similarity_matrix(validator_selection, voting_history_df)
+    exported_df = pd.concat(export_chunks(vote_matrix, 'similarity', validator_selection, proposals_filter, chunk_size=4))
+    assert np.allclose(exported_df.set_index('validator').to_numpy(), expected_df.to_numpy(), equal_nan=True)
+
+def test__export__parquet_row_groups(vote_matrix):
+    file = io.BytesIO()
+    write_stream(export_stream(export_chunks(vote_matrix, 'raw_votes', chunk_size=10), 'parquet'), file)
+    import pyarrow.parquet as pq
+    assert pq.ParquetFile(io.BytesIO(file.getvalue())).num_row_groups == 5
+
+@pytest.mark.parametrize('export_format', ['csv', 'parquet'])
+def test__open_export__download_file(vote_matrix, votes, export_format):
+    with open_export(export_stream(export_chunks(vote_matrix, 'raw_votes', chunk_size=7), export_format)) as file:
+        # The binary data types accepted by st.download_button (1.23)
+        assert isinstance(file, (io.BytesIO, io.TextIOWrapper, io.BufferedReader, io.RawIOBase))
+        path = file.name
+        exported_df = pd.read_csv(file) if export_format == 'csv' else pd.read_parquet(file)
+
+    assert exported_df.shape[0] == len(votes)
+    assert not os.path.exists(path)
+
+def test__open_export__removed_on_error(vote_matrix):
+    with pytest.raises(ValueError):
+        with open_export(export_stream(export_chunks(vote_matrix, 'raw_votes'), 'csv')) as file:
+            path = file.name
+            raise ValueError
+
+    assert not os.path.exists(path)
+
+def test__prepare_export__payload(vote_matrix, votes):
+    data = prepare_export(export_stream(export_chunks(vote_matrix, 'raw_votes', chunk_size=7), 'csv'))
+    assert isinstance(data, bytes) and pd.read_csv(io.BytesIO(data)).shape[0] == len(votes)
+
+def test__prepare_export__size_cap(vote_matrix):
+    with pytest.raises(ExportTooLargeError):
+        prepare_export(export_stream(export_chunks(vote_matrix, 'raw_votes', chunk_size=7), 'csv'), max_bytes=1000)
+
+def test__export_key__inputs_of_export(validator_selection):
+    dataset = {'id': 'voting_history', 'all': False}
+    key = export_key('v1', dataset, 'csv', validator_selection, 'ALL_PROPOSALS')
+    assert key == export_key('v1', dataset, 'csv', list(validator_selection), 'ALL_PROPOSALS')
+    assert key != export_key('v2', dataset, 'csv', validator_selection, 'ALL_PROPOSALS')
+    assert key != export_key('v1', dataset, 'csv', validator_selection[:3], 'ALL_PROPOSALS')
+    assert key != export_key('v1', dataset, 'csv', validator_selection, 'ALL_VOTED')
+
+    # Exports of all validators do not depend on the selection
+    dataset = {'id': 'raw_votes', 'all': True}
+    assert export_key('v1', dataset, 'csv', validator_selection, 'ALL_PROPOSALS') == export_key('v1', dataset, 'csv', [], 'ALL_VOTED')
@@ -0,0 +1,86 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.utils.cache import LRUCache
+from src.utils.metrics import weighted_tallies
+from src.utils.metrics import proposal_outcomes
+from src.utils.metrics import compute_validator_metrics
+from src.utils.metrics import get_validator_metrics
+from src.utils.chains import get_chain
+from src.utils.vote_matrix import encode_vote_matrix, VOTE_CODES
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def small_vote_matrix():
+    # 3 validators with 50%, 30% and 20% of the voting power, on 4 proposals
+    validators = [{'address': f'val{i}', 'name': f'Validator {i}', 'voting_power': vp} for i, vp in enumerate([50.0, 30.0, 20.0])]
+    proposals = [{'id': i, 'title': f'Proposal {i}'} for i in range(1, 5)]
+    votes = [{'validator_address': 'val0', 'proposal_id': 1, 'vote': 'YES'},
+             {'validator_address': 'val1', 'proposal_id': 1, 'vote': 'NO'},
+             {'validator_address': 'val2', 'proposal_id': 1, 'vote': 'YES'},
+             {'validator_address': 'val0', 'proposal_id': 2, 'vote': 'NO'},
+             {'validator_address': 'val1', 'proposal_id': 2, 'vote': 'YES'},
+             {'validator_address': 'val1', 'proposal_id': 3, 'vote': 'NO WITH VETO'},
+             {'validator_address': 'val2', 'proposal_id': 3, 'vote': 'YES'},
+             {'validator_address': 'val2', 'proposal_id': 4, 'vote': 'YES'}]
+    return encode_vote_matrix(validators, proposals, votes)
+
+
+def test__weighted_tallies__matches_groupby(vote_matrix, validators, votes):
+    votes_df = pd.DataFrame(votes).merge(pd.DataFrame(validators), left_on='validator_address', right_on='address')
+    expected = votes_df.groupby(['vote','proposal_id'])['voting_power'].sum()
+    tallies = weighted_tallies(vote_matrix)
+    columns = {pid: idx for idx, pid in enumerate(vote_matrix.proposal_ids)}
+    assert all(np.isclose(tallies[VOTE_CODES[vote], columns[pid]], vp) for (vote, pid), vp in expected.items())
+
+def test__weighted_tallies__total_voting_power(vote_matrix):
+    assert np.allclose(weighted_tallies(vote_matrix).sum(axis=0), vote_matrix.voting_power.sum())
+
+def test__proposal_outcomes(small_vote_matrix):
+    outcomes = proposal_outcomes(weighted_tallies(small_vote_matrix), **get_chain('osmosis')['tally_params'])
+    assert outcomes.tolist() == ['PASSED', 'REJECTED', 'VETOED', 'PASSED']
+
+def test__proposal_outcomes__no_quorum(small_vote_matrix):
+    outcomes = proposal_outcomes(weighted_tallies(small_vote_matrix), **{**get_chain('osmosis')['tally_params'], 'quorum': 0.25})
+    assert outcomes[3] == 'NO QUORUM'
+
+def test__compute_validator_metrics(small_vote_matrix):
+    metrics_df = compute_validator_metrics(small_vote_matrix).set_index('address')
+    assert metrics_df['num_votes'].tolist() == [2, 3, 3]
+    assert metrics_df['outcome_alignment'].tolist() == [1.0, 1/3, 2/3]
+    assert metrics_df['majority_alignment'].tolist() == [1.0, 1/3, 2/3]
+
+def test__compute_validator_metrics__tally_params_of_chain(small_vote_matrix):
+    # 20% of the voting power reaches the quorum of Osmosis, not that of the Cosmos Hub
+    osmosis_df = compute_validator_metrics(small_vote_matrix, 'osmosis').set_index('address')
+    cosmoshub_df = compute_validator_metrics(small_vote_matrix, 'cosmoshub').set_index('address')
+    assert osmosis_df.loc['val2', 'outcome_alignment'] == 2/3 and cosmoshub_df.loc['val2', 'outcome_alignment'] == 1/2
+
+def test__compute_validator_metrics__no_votes(vote_matrix):
+    metrics_df = compute_validator_metrics(vote_matrix)
+    assert metrics_df.loc[metrics_df['num_votes'] == 0, 'outcome_alignment'].isnull().all()
+
+def test__get_validator_metrics__cached_per_version(vote_matrix):
+    cache = LRUCache(max_bytes=2**20)
+    metrics_df = get_validator_metrics(cache, vote_matrix)
+    assert get_validator_metrics(cache, vote_matrix) is metrics_df and cache.stats()['hits'] == 1
+
+def test__get_validator_metrics__cached_per_chain(small_vote_matrix):
+    cache = LRUCache(max_bytes=2**20)
+    assert get_validator_metrics(cache, small_vote_matrix, 'osmosis') is not get_validator_metrics(cache, small_vote_matrix, 'cosmoshub')
@@ -0,0 +1,110 @@
+import pytest
+import datetime
+import numpy as np
+import pandas as pd
+from src.utils.cache import LRUCache
+from src.utils.search import tokenize
+from src.utils.search import ProposalIndex
+from src.utils.search import get_proposal_index
+from src.utils.search import filter_by_proposals
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def index():
+    return ProposalIndex(proposal_ids=[12, 3, 7, 25],
+                         titles=['Upgrade to v12', 'Set Initial Liquidity Mining Incentives', 'Liquidity incentive adjustments', 'Community pool spend'],
+                         submitted_at=['2022-03-01 10:00:00', '2021-06-20 08:00:00', None, '2022-03-05 23:59:00'])
+
+
+def test__tokenize__lowercase_alphanumeric():
+    assert tokenize("We're on the side of the little girl.") == ['we','re','on','the','side','of','the','little','girl']
+    assert tokenize(None) == []
+
+
+def test__match_title__all_tokens_as_prefixes(index):
+    assert index.match_title('liquidity').tolist() == [False, True, True, False]
+    assert index.match_title('LIQUID incent').tolist() == [False, True, True, False]
+    assert index.match_title('liquidity mining').tolist() == [False, True, False, False]
+    assert index.match_title('governance').tolist() == [False, False, False, False]
+
+
+def test__match_title__empty_query_matches_all(index):
+    assert index.match_title('').all()
+    assert index.match_title(' .,').all()
+
+
+def test__match_title__proposal_id(index):
+    # 12 is both a proposal ID and a title token, 25 is only an ID
+    assert index.match_title('12').tolist() == [True, False, False, False]
+    assert index.match_title('25').tolist() == [False, False, False, True]
+
+
+def test__match_id_range__inclusive(index):
+    assert index.match_id_range(7, 12).tolist() == [True, False, True, False]
+    assert index.match_id_range(None, 7).tolist() == [False, True, True, False]
+    assert index.match_id_range(13, None).tolist() == [False, False, False, True]
+    assert not index.match_id_range(26, 30).any()
+
+
+def test__match_date_range__inclusive_days(index):
+    # The end date includes the whole day, proposals without a timestamp never match
+    assert index.match_date_range(datetime.date(2022,3,1), datetime.date(2022,3,5)).tolist() == [True, False, False, True]
+    assert index.match_date_range(None, '2022-03-01').tolist() == [True, True, False, False]
+    assert index.match_date_range(pd.Timestamp('2022-03-02', tz='UTC'), None).tolist() == [False, False, False, True]
+
+
+def test__search__combines_criteria(index):
+    mask = index.search('liquidity', id_range=(1, 5), date_range=(None, None))
+    assert mask.tolist() == [False, True, False, False]
+    assert index.matching_ids(index.search('pool', date_range=('2022-01-01', None))).tolist() == [25]
+    assert index.search().all()
+
+
+def test__search__matches_scan(vote_matrix):
+    index = ProposalIndex(vote_matrix.proposal_ids, vote_matrix.proposal_titles, vote_matrix.proposal_submitted_at)
+
+    for query in ['pool', 'incentives', 'upgrade osmosis', 'fee']:
+        expected = [all(any(t.startswith(q) for t in tokenize(title)) for q in tokenize(query)) for title in vote_matrix.proposal_titles]
+        assert index.match_title(query).tolist() == expected
+
+
+def test__date_bounds(index):
+    assert index.date_bounds() == (pd.Timestamp('2021-06-20 08:00:00', tz='UTC'), pd.Timestamp('2022-03-05 23:59:00', tz='UTC'))
+    assert ProposalIndex([1], ['A'], [None]).date_bounds() is None
+
+
+def test__get_proposal_index__cached_per_version(vote_matrix):
+    cache = LRUCache(max_bytes=2**20)
+
+    index = get_proposal_index(cache, vote_matrix)
+    assert get_proposal_index(cache, vote_matrix) is index
+    assert cache.stats()['hits'] == 1
+    assert 0 < cache.stats()['bytes'] <= 2**20
+
+
+def test__filter_by_proposals(vote_matrix, validators):
+    voting_history_df = vote_matrix.compile_voting_history(validators[:2])
+    index = ProposalIndex(vote_matrix.proposal_ids, vote_matrix.proposal_titles, vote_matrix.proposal_submitted_at)
+
+    mask = index.search(id_range=(1, 10))
+    filtered_df = filter_by_proposals(voting_history_df, index.matching_ids(mask))
+
+    assert filtered_df.index.get_level_values('id').tolist() == [i for i in vote_matrix.proposal_ids if 1 <= i <= 10]
+    assert list(filtered_df.columns) == list(voting_history_df.columns)
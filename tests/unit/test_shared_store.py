@@ -0,0 +1,125 @@
+import pytest
+import os
+import subprocess
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from src.utils.vote_matrix import encode_vote_matrix
+from src.utils.shared_store import publish_vote_matrix
+from src.utils.shared_store import attach_vote_matrix
+from src.utils.shared_store import get_current_version
+from src.utils.shared_store import materialize_once
+from src.utils.shared_store import prune_versions
+from src.utils.shared_store import SharedVoteMatrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def updated_vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes[:-10])
+
+@pytest.fixture
+def store_dir(tmp_path):
+    return str(tmp_path / 'store')
+
+
+def test__publish_vote_matrix__sets_current_version(vote_matrix, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    assert get_current_version(store_dir) == vote_matrix.version
+
+def test__attach_vote_matrix__same_votes(vote_matrix, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    attached = attach_vote_matrix(store_dir)
+    assert np.array_equal(attached.votes, vote_matrix.votes) and attached.names == vote_matrix.names
+
+def test__attach_vote_matrix__read_only_memory_map(vote_matrix, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    attached = attach_vote_matrix(store_dir)
+    assert isinstance(attached.votes, np.memmap) and not attached.votes.flags.writeable
+
+def test__attach_vote_matrix__same_voting_history(vote_matrix, validators, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    attached = attach_vote_matrix(store_dir)
+    pd.testing.assert_frame_equal(attached.compile_voting_history(validators[:8]), vote_matrix.compile_voting_history(validators[:8]))
+
+def test__materialize_once__builds_once(vote_matrix, store_dir):
+    builds = []
+    build = lambda: builds.append(1) or vote_matrix
+    materialize_once(store_dir, build)
+    SharedVoteMatrix(store_dir, build=build)
+    assert len(builds) == 1
+
+def test__materialize_once__waiter_builds_after_failure(vote_matrix, store_dir):
+    building = threading.Event()
+    waiting = threading.Event()
+
+    def failing_build():
+        building.set()
+        waiting.wait(5)
+        raise RuntimeError('Download failed')
+
+    def build_first():
+        with pytest.raises(RuntimeError):
+            materialize_once(store_dir, failing_build)
+
+    builder = threading.Thread(target=build_first)
+    builder.start()
+    building.wait(5)
+
+    builds = []
+    waiter = threading.Thread(target=lambda: builds.append(materialize_once(store_dir, lambda: vote_matrix, timeout=10, poll_interval=0.01)))
+    waiter.start()
+    waiting.set()
+    builder.join(5)
+    waiter.join(10)
+
+    assert builds == [vote_matrix.version]
+    assert get_current_version(store_dir) == vote_matrix.version
+    assert not os.path.exists(os.path.join(store_dir, 'LOCK'))
+
+def test__materialize_once__breaks_stale_lock(vote_matrix, store_dir):
+    # The lock of a builder that was killed before it could remove it
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    os.makedirs(store_dir)
+    with open(os.path.join(store_dir, 'LOCK'), 'w') as file:
+        file.write(str(dead.pid))
+
+    assert materialize_once(store_dir, lambda: vote_matrix, timeout=5, poll_interval=0.01) == vote_matrix.version
+    assert not os.path.exists(os.path.join(store_dir, 'LOCK'))
+
+def test__materialize_once__waits_for_live_lock(vote_matrix, store_dir):
+    os.makedirs(store_dir)
+    with open(os.path.join(store_dir, 'LOCK'), 'w') as file:
+        file.write(str(os.getpid()))
+
+    with pytest.raises(TimeoutError):
+        materialize_once(store_dir, lambda: vote_matrix, timeout=0.05, poll_interval=0.01)
+
+def test__shared_vote_matrix__follows_version_swap(vote_matrix, updated_vote_matrix, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    shared = SharedVoteMatrix(store_dir, check_interval=0)
+    publish_vote_matrix(updated_vote_matrix, store_dir)
+    assert shared.get().version == updated_vote_matrix.version
+
+def test__prune_versions__keeps_current(vote_matrix, updated_vote_matrix, store_dir):
+    publish_vote_matrix(vote_matrix, store_dir)
+    publish_vote_matrix(updated_vote_matrix, store_dir)
+    prune_versions(store_dir, keep=0)
+    assert attach_vote_matrix(store_dir).version == updated_vote_matrix.version
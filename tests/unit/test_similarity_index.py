@@ -0,0 +1,178 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.utils import similarity_index
+from src.utils.cache import LRUCache
+from src.utils.data import create_similarity_matrix
+from src.utils.similarity_index import vote_tokens
+from src.utils.similarity_index import candidate_probability
+from src.utils.similarity_index import MinHashLSH
+from src.utils.similarity_index import index_vote_matrix
+from src.utils.similarity_index import agreement
+from src.utils.similarity_index import find_similar_validators
+from src.utils.similarity_index import get_similarity_index
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def voters(vote_matrix):
+    return [a for a, has_votes in zip(vote_matrix.addresses, vote_matrix.has_votes) if has_votes]
+
+
+def test__vote_tokens__distinct_per_proposal_and_option():
+    tokens = vote_tokens([1, 1, 2], [1, 2, 1])
+    assert len(set(tokens.tolist())) == 3
+
+
+def test__candidate_probability__more_bands_more_recall():
+    assert candidate_probability(0.5, 32, 4) > candidate_probability(0.5, 16, 4) > candidate_probability(0.5, 16, 8)
+    assert candidate_probability(1.0, 8, 8) == 1.0
+
+
+def test__minhash__estimates_jaccard():
+    index = MinHashLSH(bands=64, rows=4)
+    index.replace('a', np.arange(0, 1000))
+    index.replace('b', np.arange(500, 1500))
+
+    # Jaccard similarity of 1/3
+    assert abs(index.estimate_similarity('a', 'b') - 1/3) < 0.1
+
+
+def test__add__merges_new_tokens():
+    index = MinHashLSH(bands=8, rows=2)
+    index.add('a', np.arange(0, 50))
+    index.add('a', np.arange(50, 100))
+
+    assert np.array_equal(index.signatures['a'], index.minhash(np.arange(0, 100)))
+
+
+def test__replace__updates_buckets():
+    index = MinHashLSH(bands=8, rows=2)
+    index.replace('a', np.arange(0, 100))
+    index.replace('b', np.arange(0, 100))
+    assert index.candidates('a') == {'b'}
+
+    index.replace('b', np.arange(1000, 1100))
+    assert index.candidates('a') == set()
+
+    index.remove('b')
+    assert 'b' not in index and len(index) == 1
+    assert all(len(bucket) == 1 for band in index._buckets for bucket in band.values())
+
+
+def test__candidates__empty_sets_similar_to_nobody():
+    index = MinHashLSH(bands=8, rows=2)
+    index.replace('a', np.array([], dtype=np.int64))
+    index.replace('b', np.array([], dtype=np.int64))
+
+    assert index.candidates('a') == set()
+    assert index.most_similar('a') == []
+
+
+def test__most_similar__ranked_by_estimate():
+    index = MinHashLSH(bands=32, rows=2)
+    index.replace('a', np.arange(0, 100))
+    index.replace('near', np.arange(5, 105))
+    index.replace('far', np.arange(60, 160))
+
+    assert [key for key, _ in index.most_similar('a', k=2)] == ['near', 'far']
+
+
+def test__agreement__matches_similarity_matrix(vote_matrix, validators, voters):
+    selection = [v for v in validators if v['address'] in voters[:4]]
+    similarity_df = create_similarity_matrix(selection, vote_matrix.compile_voting_history(selection))
+
+    scores = agreement(vote_matrix, selection[0]['address'], [v['address'] for v in selection[1:]])
+    np.testing.assert_allclose(scores, similarity_df.iloc[1:, 0].to_numpy())
+
+
+def test__find_similar_validators__recall_with_many_bands(vote_matrix, voters):
+    index = index_vote_matrix(MinHashLSH(bands=64, rows=1), vote_matrix)
+    address = voters[0]
+
+    similar = find_similar_validators(index, vote_matrix, address, k=5)
+    exact = agreement(vote_matrix, address, [a for a in voters if a != address])
+
+    assert len(similar) == 5
+    assert [s['similarity'] for s in similar] == sorted(np.sort(exact)[::-1][:5].tolist())[::-1]
+    assert similar[0]['name'] == vote_matrix.names[vote_matrix.position(similar[0]['address'])]
+
+
+def test__index_vote_matrix__incremental_by_address(vote_matrix, voters):
+    full_index = index_vote_matrix(MinHashLSH(bands=8, rows=2), vote_matrix)
+    partial_index = index_vote_matrix(MinHashLSH(bands=8, rows=2), vote_matrix, addresses=voters[:3])
+    partial_index = index_vote_matrix(partial_index, vote_matrix, addresses=vote_matrix.addresses[::-1])
+
+    assert partial_index.signatures.keys() == full_index.signatures.keys()
+    assert all(np.array_equal(partial_index.signatures[k], full_index.signatures[k]) for k in full_index.signatures)
+
+    # Validators no longer in the vote matrix are removed
+    partial_index.replace('osmovaloper1gone', np.arange(10))
+    index_vote_matrix(partial_index, vote_matrix, addresses=['osmovaloper1gone'])
+    assert 'osmovaloper1gone' not in partial_index
+
+
+def test__replace__skips_unchanged_sets():
+    index = MinHashLSH(bands=8, rows=2)
+    index.replace('a', np.arange(0, 100))
+    signature = index.signatures['a']
+
+    index.replace('a', np.arange(99, -1, -1))
+    assert index.signatures['a'] is signature
+
+
+def test__copy__independent_of_original():
+    index = MinHashLSH(bands=8, rows=2)
+    index.replace('a', np.arange(0, 100))
+    index.replace('b', np.arange(0, 100))
+
+    copied = index.copy()
+    copied.replace('b', np.arange(1000, 1100))
+
+    assert index.candidates('a') == {'b'}
+    assert copied.candidates('a') == set()
+
+
+def test__find_similar_validators__exact_scan(vote_matrix, voters):
+    address = voters[0]
+    similar = find_similar_validators(None, vote_matrix, address, k=5)
+    exact = agreement(vote_matrix, address, [a for a in voters if a != address])
+    assert [s['similarity'] for s in similar] == np.sort(exact)[::-1][:5].tolist()
+
+def test__get_similarity_index__exact_scan_for_small_chains(vote_matrix):
+    assert get_similarity_index(LRUCache(max_bytes=2**24), vote_matrix) is None
+
+def test__get_similarity_index__updated_per_version(validators, proposals, votes, monkeypatch):
+    monkeypatch.setattr(similarity_index, 'EXACT_SCAN_MAX_VALIDATORS', 0)
+    cache = LRUCache(max_bytes=2**24)
+    vote_matrix = encode_vote_matrix(validators, proposals, votes)
+
+    index = get_similarity_index(cache, vote_matrix, bands=8, rows=2)
+    assert get_similarity_index(cache, vote_matrix, bands=8, rows=2) is index
+    assert len(index) == vote_matrix.shape[0]
+
+    # A new version with one validator fewer and one changed vote
+    changed_votes = [dict(v, vote='NO') if i == 0 else v for i, v in enumerate(votes) if v['validator_address'] != validators[-1]['address']]
+    new_vote_matrix = encode_vote_matrix(validators[:-1], proposals, changed_votes)
+    new_index = get_similarity_index(cache, new_vote_matrix, bands=8, rows=2)
+
+    rebuilt_index = index_vote_matrix(MinHashLSH(bands=8, rows=2), new_vote_matrix)
+    assert new_index is not index and len(index) == vote_matrix.shape[0]
+    assert new_index.signatures.keys() == rebuilt_index.signatures.keys()
+    assert all(np.array_equal(new_index.signatures[k], rebuilt_index.signatures[k]) for k in rebuilt_index.signatures)
@@ -0,0 +1,88 @@
+import os
+import json
+import gzip
+from functools import partial
+import pytest
+import pandas as pd
+from src.utils import data
+from src.utils.local_storage import copy_file_to_local_storage
+from src.etl.snapshot import publish_snapshot
+from src.etl.snapshot import strip_volatile_fields
+
+
+@pytest.fixture
+def storage_dir(tmp_path):
+    return str(tmp_path / 'bucket')
+
+@pytest.fixture
+def uploads(storage_dir):
+    # Records the order of uploads to the local stand-in for the bucket
+    uploaded = []
+    def upload(file, object_key, cache_control=None):
+        copy_file_to_local_storage(file, storage_dir, object_key, cache_control)
+        uploaded.append(object_key)
+    upload.uploaded = uploaded
+    return upload
+
+@pytest.fixture
+def datasets(tmp_path):
+    validators = pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+    proposals = pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+    votes = {}
+    for v in pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records'):
+        votes.setdefault(v['validator_address'], {})[str(v['proposal_id'])] = v['vote']
+    votes = [{'validator_address': k, 'votes': v} for k,v in votes.items()]
+
+    files = {}
+    for name, records in (('validators', validators), ('proposals', proposals), ('votes', votes)):
+        file = str(tmp_path / f'{name}.json.gz')
+        with gzip.open(file, 'wt') as f:
+            json.dump(records, f)
+        files[name] = {'file': file, 'row_count': len(records)}
+    return files
+
+@pytest.fixture
+def manifest(datasets, uploads, tmp_path):
+    return publish_snapshot(datasets, uploads, str(tmp_path / 'manifest.json'), extracted_at='2024-01-01T00:00:00')
+
+@pytest.fixture
+def local_data_url(storage_dir):
+    data_url, data.DATA_URL = data.DATA_URL, storage_dir
+    yield storage_dir
+    data.DATA_URL = data_url
+
+
+def test__publish_snapshot__manifest_uploaded_last(manifest, uploads):
+    assert uploads.uploaded[-1] == data.MANIFEST_KEY and len(uploads.uploaded) == 4
+
+def test__publish_snapshot__content_addressed_keys(manifest):
+    invalid_list = [e['object_key'] for e in manifest['datasets'].values() if e['sha256'][:16] not in e['object_key']]
+    assert len(invalid_list) == 0
+
+def test__publish_snapshot__row_counts(manifest, datasets):
+    assert {k: e['row_count'] for k,e in manifest['datasets'].items()} == {k: d['row_count'] for k,d in datasets.items()}
+
+def test__publish_snapshot__skips_unchanged_objects(manifest, datasets, uploads, tmp_path):
+    republished = publish_snapshot(datasets, uploads, str(tmp_path / 'manifest.json'), previous_manifest=manifest)
+    assert republished['version'] == manifest['version'] and len(uploads.uploaded) == 5
+
+def test__get_manifest__local_storage(manifest, local_data_url):
+    assert data.get_manifest()['version'] == manifest['version']
+
+def test__get_manifest__missing(local_data_url):
+    assert data.get_manifest() is None
+
+def test__get_changed_datasets(manifest):
+    updated_manifest = json.loads(json.dumps(manifest))
+    updated_manifest['datasets']['votes']['object_key'] = 'data/snapshots/votes-0000.json.gz'
+    assert data.get_changed_datasets(manifest, updated_manifest) == ['votes']
+    assert data.get_changed_datasets(data.get_dataset_keys(manifest), updated_manifest, datasets=('validators', 'proposals')) == []
+
+def test__get_datasets__reads_snapshot(manifest, local_data_url, datasets):
+    validators, proposals, votes = data.get_datasets()
+    assert (len(validators), len(proposals)) == (datasets['validators']['row_count'], datasets['proposals']['row_count'])
+
+def test__strip_volatile_fields():
+    records, extracted_at = strip_volatile_fields([{'id': 1, '_extracted_at': '2024-01-02', '__row_index': 0},
+                                                   {'id': 2, '_extracted_at': '2024-01-01', '__row_index': 1}])
+    assert records == [{'id': 1}, {'id': 2}] and extracted_at == '2024-01-02'
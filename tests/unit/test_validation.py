@@ -0,0 +1,69 @@
+import pytest
+import pandas as pd
+from src.etl.validation import validate_datasets
+from src.etl.validation import assert_valid_datasets
+from src.etl.validation import DataValidationError
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def extracted_votes(votes):
+    # Votes in the shape returned by the SQL extraction
+    extracted = {}
+    for v in votes:
+        extracted.setdefault(v['validator_address'], {})[str(v['proposal_id'])] = v['vote']
+    return [{'validator_address': k, 'votes': v} for k,v in extracted.items()]
+
+
+def failed_rules(failures):
+    return [(f['dataset'], f['rule']) for f in failures]
+
+
+def test__validate_datasets__valid(validators, proposals, votes):
+    assert validate_datasets(validators, proposals, votes) == []
+
+def test__validate_datasets__valid_extracted_votes(validators, proposals, extracted_votes):
+    assert validate_datasets(validators, proposals, extracted_votes) == []
+
+def test__validate_datasets__invalid_address(validators, proposals, votes):
+    validators[3]['address'] = 'cosmosvaloper' + validators[3]['address'][13:]
+    assert failed_rules(validate_datasets(validators, proposals, votes)) == [('validators', 'valid addresses')]
+
+def test__validate_datasets__other_chain_prefix(validators, proposals, votes):
+    # Operator addresses of another chain, with the same payload under a longer prefix
+    for v in validators: v['address'] = 'cosmosvaloper' + v['address'][len('osmovaloper'):]
+    for v in votes: v['validator_address'] = 'cosmosvaloper' + v['validator_address'][len('osmovaloper'):]
+    assert validate_datasets(validators, proposals, votes, address_prefix='cosmosvaloper') == []
+
+def test__validate_datasets__duplicate_names(validators, proposals, votes):
+    validators[4]['name'] = validators[3]['name']
+    assert failed_rules(validate_datasets(validators, proposals, votes)) == [('validators', 'unique names')]
+
+def test__validate_datasets__unsorted_validators(validators, proposals, votes):
+    validators[0], validators[1] = validators[1], validators[0]
+    assert failed_rules(validate_datasets(validators, proposals, votes)) == [('validators', 'sorted by descending voting power')]
+
+def test__validate_datasets__blank_title(validators, proposals, votes):
+    proposals[2]['title'] = None
+    assert failed_rules(validate_datasets(validators, proposals, votes)) == [('proposals', 'non-empty titles')]
+
+def test__validate_datasets__invalid_vote(validators, proposals, votes):
+    votes[5]['vote'] = 'MAYBE'
+    failures = validate_datasets(validators, proposals, votes)
+    assert failed_rules(failures) == [('votes', 'valid votes')] and failures[0]['examples'] == ['MAYBE']
+
+def test__assert_valid_datasets__raises(validators, proposals, votes):
+    proposals[1]['id'] = proposals[0]['id']
+    with pytest.raises(DataValidationError):
+        assert_valid_datasets(validators, proposals, votes)
@@ -0,0 +1,60 @@
+import pytest
+import pandas as pd
+from src.utils.cache import LRUCache
+from src.utils.views import build_views
+from src.utils.views import build_leaderboard
+from src.utils.metrics import compute_validator_metrics
+from src.utils.search import get_proposal_index
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def result_cache():
+    return LRUCache(max_bytes=2**26)
+
+
+def test__build_views__no_selection(result_cache, vote_matrix):
+    views = build_views(result_cache, vote_matrix, [], 'AT_LEAST_1_VOTED')
+    assert views['voting_history_df'] is None and views['similarity_figure'] is None and views['similar_validators'] is None
+    assert len(views['leaderboard_df']) == vote_matrix.shape[0]
+
+def test__build_views__one_validator(result_cache, vote_matrix, validators):
+    views = build_views(result_cache, vote_matrix, validators[:1], 'AT_LEAST_1_VOTED')
+    assert views['voting_history_df'] is not None and views['similar_validators'] is not None
+    assert views['summary'] is None and views['similarity_figure'] is None
+
+def test__build_views__several_validators(result_cache, vote_matrix, validators):
+    views = build_views(result_cache, vote_matrix, validators[:3], 'ALL_PROPOSALS')
+    assert views['voting_history_df'].shape == (vote_matrix.shape[1], 3)
+    assert views['summary']['num_proposals'] == vote_matrix.shape[1]
+    assert isinstance(views['similarity_figure'], str)
+
+def test__build_views__proposal_search(result_cache, vote_matrix, validators):
+    views = build_views(result_cache, vote_matrix, validators[:3], 'ALL_PROPOSALS', proposal_query='upgrade')
+    expected = get_proposal_index(result_cache, vote_matrix).search('upgrade')
+    assert 0 < len(views['voting_history_df']) == expected.sum() < vote_matrix.shape[1]
+
+def test__build_views__reference_falls_back_to_selection(result_cache, vote_matrix, validators):
+    views = build_views(result_cache, vote_matrix, validators[:3], 'ALL_PROPOSALS', reference=validators[5])
+    expected = build_views(result_cache, vote_matrix, validators[:3], 'ALL_PROPOSALS', reference=validators[0])
+    assert views['similar_validators'] == expected['similar_validators']
+
+def test__build_leaderboard__ranked(vote_matrix):
+    leaderboard_df = build_leaderboard(compute_validator_metrics(vote_matrix), 'voting_power')
+    assert leaderboard_df['Voting Power'].is_monotonic_decreasing and list(leaderboard_df.index[:2]) == [1, 2]
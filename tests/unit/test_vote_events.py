@@ -0,0 +1,126 @@
+import re
+import pytest
+import pandas as pd
+from src.utils.vote_events import encode_vote_events
+from src.utils.vote_events import concat_vote_events
+from src.utils.vote_events import write_vote_events
+from src.utils.vote_events import read_vote_events
+from src.utils.vote_events import latest_votes
+from src.utils.vote_events import vote_flips
+from src.etl.vote_events import refresh_vote_events
+
+
+@pytest.fixture
+def sql_template():
+    with open('src/sql/vote_events.sql', 'r') as file:
+        return file.read()
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def records(votes):
+    # Every test vote as an event, then a changed vote for every 10th of them
+    events = [{**v, 'block_id': 1000 + i, 'tx_index': 0,
+               'block_timestamp': (pd.Timestamp('2023-01-01') + pd.Timedelta(minutes=i)).isoformat() + 'Z',
+               'tx_id': f'tx{i:05d}'} for i, v in enumerate(votes)]
+    flips = [{**e, 'vote': 'NO' if e['vote'] == 'YES' else 'YES',
+              'block_id': e['block_id'] + len(events),
+              'tx_id': e['tx_id'] + 'f'} for e in events[::10]]
+    return events + flips
+
+class FakeQuery:
+    """Stands in for Flipside, returning the vote events after the block in the statement."""
+
+    def __init__(self, records):
+        self.records = records
+        self.statements = []
+
+    def __call__(self, stmt):
+        self.statements.append(stmt)
+        from_block_id = int(re.search(r'block_id > (\d+)', stmt).group(1))
+        return [r for r in self.records if r['block_id'] > from_block_id]
+
+
+def test__encode_vote_events__column_types(records):
+    events_df = encode_vote_events(records)
+    assert events_df.dtypes.astype(str).to_dict() == {'validator_address': 'category',
+                                                      'proposal_id': 'int32',
+                                                      'option': 'int8',
+                                                      'block_id': 'int64',
+                                                      'tx_index': 'int32',
+                                                      'block_timestamp': 'datetime64[ns, UTC]',
+                                                      'tx_id': 'object'}
+
+def test__encode_vote_events__unknown_vote(records):
+    records[0]['vote'] = 'MAYBE'
+    with pytest.raises(AssertionError):
+        encode_vote_events(records)
+
+def test__encode_vote_events__ordered_by_position_in_block(records):
+    # Transaction IDs of the same block in reverse order of execution
+    records = [{**records[0], 'vote': 'NO', 'tx_index': 1, 'tx_id': 'tx-a'},
+               {**records[0], 'vote': 'YES', 'tx_index': 0, 'tx_id': 'tx-b'}]
+    assert [v['vote'] for v in latest_votes(encode_vote_events(records))] == ['NO']
+
+def test__write_vote_events__round_trip(records, tmp_path):
+    events_df = encode_vote_events(records)
+    write_vote_events(events_df, str(tmp_path / 'segment.parquet'))
+    pd.testing.assert_frame_equal(read_vote_events(str(tmp_path / 'segment.parquet')), events_df)
+
+def test__latest_votes__without_flips(records, votes):
+    latest = latest_votes(encode_vote_events(records[:len(votes)]))
+    assert sorted(latest, key=lambda x: (x['validator_address'], x['proposal_id'])) == \
+           sorted(votes, key=lambda x: (x['validator_address'], x['proposal_id']))
+
+def test__latest_votes__last_event_wins(records, votes):
+    latest = {(v['validator_address'], v['proposal_id']): v['vote'] for v in latest_votes(encode_vote_events(records))}
+    assert all(latest[(r['validator_address'], r['proposal_id'])] == r['vote'] for r in records[len(votes):])
+
+def test__vote_flips(records, votes):
+    flips_df = vote_flips(encode_vote_events(records))
+    assert len(flips_df) == len(records) - len(votes) and (flips_df['from_vote'] != flips_df['to_vote']).all()
+
+def test__refresh_vote_events__incremental_equals_full(records, sql_template):
+    full_index, _, full_votes = refresh_vote_events(FakeQuery(records), sql_template)
+
+    index, first_segment_df, votes = refresh_vote_events(FakeQuery(records[:300]), sql_template)
+    index, second_segment_df, votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+
+    assert votes == full_votes and len(second_segment_df) == len(records) - 300 and index['last_block_id'] == full_index['last_block_id']
+
+def test__refresh_vote_events__segments_concat_to_full_log(records, sql_template):
+    _, full_log_df, _ = refresh_vote_events(FakeQuery(records), sql_template)
+
+    index, first_segment_df, votes = refresh_vote_events(FakeQuery(records[:300]), sql_template)
+    index, second_segment_df, votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+
+    assert len(index['segments']) == 2
+    pd.testing.assert_frame_equal(concat_vote_events([first_segment_df, second_segment_df]), full_log_df)
+
+def test__refresh_vote_events__no_new_events(records, sql_template):
+    index, _, votes = refresh_vote_events(FakeQuery(records), sql_template)
+    new_index, segment_df, new_votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+    assert (new_index, new_votes, len(segment_df)) == (index, votes, 0)
+
+def test__refresh_vote_events__late_event_logged_once(records, sql_template):
+    full_index, full_log_df, full_votes = refresh_vote_events(FakeQuery(records), sql_template)
+
+    # An event of an already processed block is ingested after the first refresh
+    late = 150
+    index, first_segment_df, votes = refresh_vote_events(FakeQuery(records[:late] + records[late + 1:300]), sql_template)
+    index, second_segment_df, votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+    index, third_segment_df, votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+
+    assert votes == full_votes and len(third_segment_df) == 0 and index['last_block_id'] == full_index['last_block_id']
+    pd.testing.assert_frame_equal(concat_vote_events([first_segment_df, second_segment_df]), full_log_df)
+
+def test__refresh_vote_events__late_event_overtaken(records, sql_template):
+    # The late event is an earlier vote than its flip, logged by the first refresh
+    index, _, votes = refresh_vote_events(FakeQuery(records[1:]), sql_template)
+    index, segment_df, votes = refresh_vote_events(FakeQuery(records), sql_template, index, votes)
+
+    flip = next(r for r in records if r['tx_id'] == records[0]['tx_id'] + 'f')
+    vote = next(v for v in votes if (v['validator_address'], v['proposal_id']) == (flip['validator_address'], flip['proposal_id']))
+    assert len(segment_df) == 1 and vote['vote'] == flip['vote'] != records[0]['vote']
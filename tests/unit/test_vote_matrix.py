@@ -0,0 +1,47 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.utils.data import prepare_complete_votes_df
+from src.utils.data import compile_voting_history
+from src.utils.vote_matrix import encode_vote_matrix
+from src.utils.vote_matrix import VOTE_CODES
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def vote_matrix(validators, proposals, votes):
+    return encode_vote_matrix(validators, proposals, votes)
+
+@pytest.fixture
+def complete_votes_df(validators, proposals, votes):
+    return prepare_complete_votes_df(validators, proposals, votes)
+
+
+def test__vote_matrix__shape(vote_matrix, validators, proposals):
+    assert vote_matrix.shape == (len(validators), len(proposals))
+
+def test__vote_matrix__vote_count(vote_matrix, votes):
+    assert (vote_matrix.votes > 0).sum() == len(votes)
+
+def test__vote_matrix__valid_codes(vote_matrix):
+    assert set(np.unique(vote_matrix.votes)).issubset({0} | set(VOTE_CODES.values()))
+
+def test__vote_matrix__stable_version(vote_matrix, validators, proposals, votes):
+    assert encode_vote_matrix(validators, proposals, votes[::-1]).version == vote_matrix.version
+
+@pytest.mark.parametrize('start,stop,step', [(0,5,1), (10,30,1), (None,None,-3)])
+def test__vote_matrix__voting_history_matches_pivot(vote_matrix, complete_votes_df, proposals, validators, start, stop, step):
+    validator_selection = validators[start:stop:step]
+    expected_df = compile_voting_history(complete_votes_df, pd.DataFrame(proposals), validator_selection)
+    pd.testing.assert_frame_equal(vote_matrix.compile_voting_history(validator_selection), expected_df)
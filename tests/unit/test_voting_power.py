@@ -0,0 +1,131 @@
+import re
+import pytest
+import numpy as np
+import pandas as pd
+from src.etl.voting_power import refresh_voting_power
+from src.etl.voting_power import apply_staking_deltas
+from src.etl.voting_power import new_checkpoint
+from src.etl.voting_power import apply_voting_power
+from src.etl import voting_power
+
+
+@pytest.fixture
+def sql_template():
+    with open('src/sql/staking_deltas.sql', 'r') as file:
+        return file.read()
+
+@pytest.fixture
+def deltas():
+    # Staking deltas of the test validators, a few blocks per day over 30 days
+    addresses = pd.read_csv('tests/_test_data/validators.csv')['address'].tolist()[:20]
+    rng = np.random.default_rng(7)
+    return [{'validator_address': addresses[int(rng.integers(len(addresses)))],
+             'block_id': 1000 + 10*i,
+             'block_timestamp': (pd.Timestamp('2024-01-01') + pd.Timedelta(hours=6*i)).isoformat() + 'Z',
+             'delta': round(float(rng.normal(1000, 2000)), 6),
+             '_extracted_at': '2024-02-01T00:00:00Z'}
+            for i in range(120)]
+
+class FakeQuery:
+    """Stands in for Flipside, returning the deltas after the block in the statement."""
+
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.statements = []
+
+    def __call__(self, stmt):
+        self.statements.append(stmt)
+        from_block_id = int(re.search(r'block_id > (\d+)', stmt).group(1))
+        return [d for d in self.deltas if d['block_id'] > from_block_id]
+
+
+def full_recompute(deltas):
+    balances = {}
+    for d in deltas:
+        balances[d['validator_address']] = balances.get(d['validator_address'], 0) + d['delta']
+    return balances
+
+
+def test__render_sql__no_placeholders_left(sql_template):
+    fake_query = FakeQuery([])
+    refresh_voting_power(fake_query, sql_template)
+    assert '{' not in fake_query.statements[0] and 'block_id > 0' in fake_query.statements[0]
+
+def test__refresh_voting_power__matches_full_recompute(deltas, sql_template):
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas), sql_template)
+    expected = full_recompute(deltas)
+    assert all(abs(checkpoint['balances'][k] - v) < 1e-6 for k,v in expected.items())
+
+def test__refresh_voting_power__incremental_equals_full(deltas, sql_template):
+    full_checkpoint, full_history = refresh_voting_power(FakeQuery(deltas), sql_template)
+
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas[:50]), sql_template)
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas), sql_template, checkpoint, history)
+
+    assert checkpoint == full_checkpoint and history == full_history
+
+def test__refresh_voting_power__queries_overlap_window(deltas, sql_template, monkeypatch):
+    monkeypatch.setattr(voting_power, 'OVERLAP_BLOCKS', 100)
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas[:50]), sql_template)
+    fake_query = FakeQuery(deltas)
+    refresh_voting_power(fake_query, sql_template, checkpoint, history)
+    assert f"block_id > {deltas[49]['block_id'] - 100}" in fake_query.statements[0]
+
+def test__refresh_voting_power__late_rows_applied_once(deltas, sql_template):
+    # A row of the last processed block, ingested by the source after the first refresh
+    late_deltas = deltas[:49] + [{**deltas[49], 'delta': round(deltas[49]['delta'] + 500.0, 6)}] + deltas[50:]
+
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas[:50]), sql_template)
+    checkpoint, history = refresh_voting_power(FakeQuery(late_deltas), sql_template, checkpoint, history)
+    checkpoint, history = refresh_voting_power(FakeQuery(late_deltas), sql_template, checkpoint, history)
+
+    expected = full_recompute(late_deltas)
+    assert all(abs(checkpoint['balances'][k] - v) < 1e-6 for k,v in expected.items())
+    assert checkpoint['last_block_id'] == deltas[-1]['block_id']
+
+def test__refresh_voting_power__late_row_shifts_history(sql_template):
+    address = 'osmovaloper1late'
+    row = lambda block_id, day, delta: {'validator_address': address, 'block_id': block_id, 'block_timestamp': f'2024-01-0{day}T12:00:00Z',
+                                        'delta': delta, '_extracted_at': '2024-01-03T00:00:00Z'}
+
+    # day 1 = 100, day 2 = 150, then a +10 row of block 10 (day 1) is ingested late
+    checkpoint, history = refresh_voting_power(FakeQuery([row(10, 1, 100.0), row(20, 2, 50.0)]), sql_template)
+    checkpoint, history = refresh_voting_power(FakeQuery([row(10, 1, 110.0), row(20, 2, 50.0)]), sql_template, checkpoint, history)
+
+    assert [(h['date'], h['voting_power']) for h in history] == [('2024-01-01', 110.0), ('2024-01-02', 160.0)]
+    assert checkpoint['balances'][address] == 160.0 and checkpoint['last_block_id'] == 20
+
+def test__refresh_voting_power__checkpoint_without_recent_deltas(deltas, sql_template):
+    # Checkpoints of earlier refreshes do not know which deltas of the overlap window were applied
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas[:50]), sql_template)
+    checkpoint = {k: v for k,v in checkpoint.items() if k not in ('recent_from_block_id', 'recent_deltas')}
+
+    fake_query = FakeQuery(deltas)
+    checkpoint, history = refresh_voting_power(fake_query, sql_template, checkpoint, history)
+    checkpoint, history = refresh_voting_power(fake_query, sql_template, checkpoint, history)
+
+    assert f"block_id > {deltas[49]['block_id']}" in fake_query.statements[0]
+    expected = full_recompute(deltas)
+    assert all(abs(checkpoint['balances'][k] - v) < 1e-6 for k,v in expected.items())
+
+def test__refresh_voting_power__no_new_events(deltas, sql_template):
+    checkpoint, history = refresh_voting_power(FakeQuery(deltas), sql_template)
+    assert refresh_voting_power(FakeQuery(deltas), sql_template, checkpoint, history) == (checkpoint, history)
+
+def test__apply_staking_deltas__end_of_day_points(deltas):
+    checkpoint, points = apply_staking_deltas(new_checkpoint(), deltas)
+    keys = [(p['date'], p['validator_address']) for p in points]
+    assert len(keys) == len(set(keys)) and min(p['voting_power'] for p in points) >= 0
+
+def test__apply_staking_deltas__input_checkpoint_unchanged(deltas):
+    checkpoint = new_checkpoint()
+    apply_staking_deltas(checkpoint, deltas)
+    assert checkpoint == new_checkpoint()
+
+def test__apply_voting_power__from_checkpoint(deltas):
+    validators = pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+    checkpoint, _ = apply_staking_deltas(new_checkpoint(), deltas)
+    validators = apply_voting_power(validators, checkpoint)
+
+    assert all(v['voting_power'] == max(0.0, checkpoint['balances'].get(v['address'], 0.0)) for v in validators)
+    assert [v['voting_power'] for v in validators] == sorted([v['voting_power'] for v in validators], reverse=True)
@@ -0,0 +1,162 @@
+import pytest
+import gzip
+import json
+import os
+import urllib.error
+import urllib.request
+import pandas as pd
+from src.utils import data
+from src.utils import warmup
+from src.utils.warmup import fetch_datasets
+from src.utils.warmup import build_vote_matrix
+from src.utils.warmup import get_chain_store
+from src.utils.warmup import get_result_cache
+from src.utils.warmup import warm_up
+from src.utils.warmup import readiness
+from src.utils.warmup import served_chains
+from src.utils.warmup import start_readiness_server
+from src.utils.vote_matrix import encode_vote_matrix
+
+
+@pytest.fixture
+def validators():
+    return pd.read_csv('tests/_test_data/validators.csv').to_dict(orient='records')
+
+@pytest.fixture
+def proposals():
+    return pd.read_csv('tests/_test_data/proposals.csv').to_dict(orient='records')
+
+@pytest.fixture
+def votes():
+    return pd.read_csv('tests/_test_data/votes.csv').to_dict(orient='records')
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch, validators, proposals, votes):
+    # The test datasets in the published layout (legacy fixed names, no manifest)
+    nested_votes = {}
+    for v in votes:
+        nested_votes.setdefault(v['validator_address'], {})[str(v['proposal_id'])] = v['vote']
+
+    datasets = {'validators': validators,
+                'proposals': proposals,
+                'votes': [{'validator_address': k, 'votes': v} for k, v in nested_votes.items()]}
+
+    os.makedirs(tmp_path / 'data')
+    for name, records in datasets.items():
+        with gzip.open(tmp_path / data.DATASET_KEYS[name], 'wt') as file:
+            json.dump(records, file)
+
+    monkeypatch.setattr(data, 'DATA_URL', str(tmp_path))
+    return tmp_path
+
+@pytest.fixture(autouse=True)
+def fresh_process_state(monkeypatch):
+    monkeypatch.setattr(warmup, '_stores', {})
+    monkeypatch.setattr(warmup, '_status', {'state': 'cold', 'chains': {}, 'started_at': None, 'ready_at': None, 'error': None, 'failed_attempts': 0})
+    monkeypatch.delenv('SHARED_DATA_DIR', raising=False)
+    monkeypatch.delenv('CHAINS', raising=False)
+
+
+def get_status(port: int, path: str) -> tuple:
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test__fetch_datasets__same_as_sequential(data_dir):
+    validators, proposals, votes = fetch_datasets(data.DATASET_KEYS)
+
+    assert validators == data.get_validators()
+    assert proposals == data.get_proposals(fields=('id','title','submitted_at'))
+    assert votes == data.get_validator_votes()
+
+
+def test__build_vote_matrix__same_version(data_dir):
+    vote_matrix = build_vote_matrix('osmosis', data.DATASET_KEYS)
+    assert vote_matrix.version == encode_vote_matrix(*fetch_datasets(data.DATASET_KEYS)).version
+
+
+def test__stores__process_wide():
+    assert get_chain_store() is get_chain_store()
+    assert get_result_cache() is get_result_cache()
+
+
+def test__warm_up__fills_stores(data_dir):
+    assert not readiness()['ready']
+
+    status = warm_up(['osmosis'])
+
+    assert status['ready'] and status['state'] == 'ready'
+    assert get_chain_store().chains() == ['osmosis']
+    version = status['chains']['osmosis']['version']
+
+    # The per-version structures of the interactive path are cached
+    assert ('display_labels', version) in get_result_cache()
+    assert ('validator_metrics', 'osmosis', version) in get_result_cache()
+    assert ('proposal_index', version) in get_result_cache()
+
+
+def test__warm_up__empty_chains_default_chain(data_dir, monkeypatch):
+    monkeypatch.setenv('CHAINS', '')
+    assert served_chains() == ['osmosis']
+    assert list(warm_up()['chains']) == ['osmosis']
+
+
+def test__warm_up__failure_not_ready(data_dir, monkeypatch):
+    monkeypatch.setattr(data, 'DATA_URL', str(data_dir / 'missing'))
+
+    with pytest.raises(FileNotFoundError):
+        warm_up(['osmosis'], attempts=3, backoff_seconds=0)
+
+    status = readiness()
+    assert not status['ready'] and status['state'] == 'failed' and status['failed_attempts'] == 3
+    assert 'FileNotFoundError' in status['error']
+
+
+def test__warm_up__retries_transient_failure(data_dir, monkeypatch):
+    warm_chain = warmup.warm_chain
+    calls = []
+
+    def flaky_warm_chain(chain):
+        calls.append(chain)
+        if len(calls) == 1:
+            raise ConnectionError('Bucket unreachable')
+        return warm_chain(chain)
+
+    monkeypatch.setattr(warmup, 'warm_chain', flaky_warm_chain)
+
+    assert warm_up(['osmosis'], attempts=2, backoff_seconds=0)['ready'] and len(calls) == 2
+
+
+def test__readiness_server__ready_only_when_warm(data_dir):
+    server = start_readiness_server(0, host='127.0.0.1')
+    port = server.server_address[1]
+
+    try:
+        assert get_status(port, '/health') == (200, {'alive': True, 'warm_up_failed': False})
+        assert get_status(port, '/ready')[0] == 503
+
+        warm_up(['osmosis'])
+
+        code, status = get_status(port, '/ready')
+        assert code == 200 and status['ready']
+        assert get_status(port, '/other')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test__readiness_server__unhealthy_once_warm_up_failed(data_dir, monkeypatch):
+    monkeypatch.setattr(data, 'DATA_URL', str(data_dir / 'missing'))
+    server = start_readiness_server(0, host='127.0.0.1')
+    port = server.server_address[1]
+
+    try:
+        with pytest.raises(FileNotFoundError):
+            warm_up(['osmosis'], attempts=1)
+        assert get_status(port, '/health') == (503, {'alive': True, 'warm_up_failed': True})
+    finally:
+        server.shutdown()
+        server.server_close()